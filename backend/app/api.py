@@ -1,19 +1,39 @@
-from fastapi import FastAPI, BackgroundTasks, HTTPException
+from fastapi import FastAPI, BackgroundTasks, HTTPException, Request, Query, Depends
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, StreamingResponse, Response
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from typing import Optional, List, Tuple
 from .core.orchestrator import orchestrator
-from .core.archive_manager import archive_manager
+from .core.events import graph_events, sse_events
+from .core.jobs import job_manager
+from .core.control import control_store, ControlFollower, runner_status
+from .core.archive_manager import archive_manager, ARCHIVE_VIEW_FILES, ARCHIVE_ANALYSIS_FILES
 from .db.vector_store import vector_store_client
-from .db.data_models import Node, GraphData, StartRequest, StopRequest, ArchiveResponse
+from .db.vector_backends import metadata_matches
+from .db.data_models import Node, GraphData, NodeQuery, StartRequest, StopRequest, ArchiveResponse
+from .response_cache import response_cache, gzip_etag
+from . import config
 import logging
+import asyncio
+import functools
+import hashlib
+import json
 import os
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-app = FastAPI(title="GOT-AI Backend", description="Backend for the GOT-AI reasoning framework")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Warm up the vector store on startup and release the executors on shutdown"""
+    await warm_up_vector_store()
+    yield
+    await shut_down_executors()
+
+app = FastAPI(title="GOT-AI Backend", description="Backend for the GOT-AI reasoning framework", lifespan=lifespan)
 
 # Add CORS middleware
 app.add_middleware(
@@ -28,6 +48,196 @@ app.add_middleware(
 frontend_path = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), "frontend")
 app.mount("/static", StaticFiles(directory=frontend_path), name="static")
 
+# Store, file-system and orchestrator calls block, so handlers hand them to these pools.
+# Slow run-level work has its own pool, so an archive in progress never delays status polls.
+io_executor = ThreadPoolExecutor(max_workers=config.API_IO_WORKERS, thread_name_prefix="api-io")
+archive_executor = ThreadPoolExecutor(max_workers=config.API_ARCHIVE_WORKERS, thread_name_prefix="api-archive")
+
+async def run_blocking(func, *args, executor: Optional[ThreadPoolExecutor] = None, **kwargs):
+    """Run a blocking call on an API pool without holding up the event loop"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(executor or io_executor, functools.partial(func, *args, **kwargs))
+
+def coordinated() -> bool:
+    """In coordinated mode the orchestrator runs in its own process (app.runner); this worker only reads the
+    shared stores and queues commands for it"""
+    return config.SERVER_MODE == "coordinated"
+
+def active_archive_job() -> Optional[dict]:
+    return control_store.active_job("archive") if coordinated() else job_manager.active("archive")
+
+def run_state() -> dict:
+    """Whether a run is going, why it stopped, its budget and best result, from wherever the orchestrator runs"""
+    if coordinated():
+        return runner_status(control_store)
+    return orchestrator.get_best_result()
+
+async def reject_while_archiving():
+    """Refuse to touch the current run while an archive job is still reading or clearing it"""
+    job = await run_blocking(active_archive_job)
+    if job:
+        raise HTTPException(status_code=409, detail=f"Archive job {job['id']} still running")
+
+def graph_etag(*parts) -> str:
+    """Strong ETag for a response derived from the graph; the graph version changes with every write"""
+    return '"' + "-".join(str(p) for p in parts if p is not None) + '"'
+
+def not_modified(request: Request, etag: Optional[str]) -> bool:
+    """Whether the copy the client names in If-None-Match is still current"""
+    header = request.headers.get("if-none-match")
+    if etag is None or not header:
+        return False
+    tags = [tag.strip() for tag in header.split(",")]
+    return "*" in tags or any(tag in tags or f"W/{tag}" in tags for tag in (etag, gzip_etag(etag)))
+
+def not_modified_response(etag: str) -> Response:
+    return Response(status_code=304, headers={"ETag": etag})
+
+# Fields a client can ask for with fields=; embeddings are never sent
+NODE_FIELDS = [name for name in Node.model_fields if name != "embedding"]
+
+def parse_fields(fields: Optional[str]) -> Optional[List[str]]:
+    """Node fields named in a comma-separated fields= parameter, id first; None for all of them"""
+    if not fields:
+        return None
+    names = list(dict.fromkeys(name.strip() for name in fields.split(",") if name.strip()))
+    unknown = [name for name in names if name not in NODE_FIELDS]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown node fields: {', '.join(unknown)}")
+    return ["id"] + [name for name in names if name != "id"]
+
+def node_query(fields: Optional[str] = None, min_depth: Optional[int] = None, max_depth: Optional[int] = None,
+               min_score: Optional[float] = None, max_score: Optional[float] = None, cursor: Optional[str] = None,
+               limit: Optional[int] = Query(None, ge=1, le=config.NODE_PAGE_MAX_LIMIT)) -> NodeQuery:
+    """Projection, filter and paging parameters shared by the graph and archive endpoints"""
+    if cursor is not None and not cursor.isdigit():
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return NodeQuery(fields=parse_fields(fields), min_depth=min_depth, max_depth=max_depth,
+                     min_score=min_score, max_score=max_score, cursor=cursor, limit=limit)
+
+def project_node(node: dict, fields: Optional[List[str]]) -> dict:
+    """Only the requested fields of a node"""
+    if fields is None:
+        return node
+    return {name: node.get(name) for name in fields}
+
+def graph_links(nodes: List[dict]) -> List[dict]:
+    """Links between parent and child nodes"""
+    links = []
+    for node in nodes:
+        # Merged thoughts have one link per parent
+        for parent_id in [node.get("parent_id")] + node.get("extra_parent_ids", []):
+            if parent_id:
+                links.append({
+                    "source": parent_id,
+                    "target": node["id"],
+                    "value": node.get("score", 0.0)  # Use score for link strength
+                })
+    return links
+
+def current_graph_version() -> Tuple[str, int]:
+    """Current run and graph version. Polls never wait for the orchestrator's buffered writes, which are
+    stored (and answered) with a later version."""
+    return vector_store_client.run, vector_store_client.get_version()
+
+def read_graph_data(run: str, version: int, since: Optional[int], query: NodeQuery) -> Tuple[dict, Optional[str]]:
+    """Graph data for /api/graph_data, and its ETag unless the graph moved past version while it was read"""
+    where = query.where()
+    next_cursor = None
+    if since is not None:
+        changes = vector_store_client.changes_since(since)
+        nodes = [n for n in changes["inserted"] + changes["updated"] if not where or metadata_matches(n.dict(), where)]
+        current = changes["version"] == version
+    else:
+        if query.cursor is None and query.limit is None:
+            # Stored nodes only, so the response matches the version its ETag names
+            nodes = vector_store_client.graph.get_nodes(run, where=where)
+        else:
+            nodes, last_rowid = vector_store_client.get_nodes_page(
+                where=where, after=int(query.cursor) if query.cursor else None,
+                limit=query.limit or config.NODE_PAGE_MAX_LIMIT
+            )
+            next_cursor = str(last_rowid) if last_rowid is not None else None
+        current = vector_store_client.get_version() == version
+    # Links are drawn from the whole node, so they survive a fields= projection
+    node_dicts = [n.dict(exclude={"embedding"}) for n in nodes]
+    # Nodes come straight from the store, so the response model's validation is skipped
+    payload = {
+        "nodes": [project_node(n, query.fields) for n in node_dicts],
+        "links": graph_links(node_dicts),
+        "run": run,
+        "version": version,
+        "next_cursor": next_cursor
+    }
+    return payload, graph_etag(run, version, since, query.key()) if current else None
+
+def select_archive_nodes(archive_data: dict, query: NodeQuery) -> dict:
+    """The archived nodes a request asks for, with their links. The cursor is the index of the next node."""
+    where = query.where()
+    nodes = [n for n in archive_data["nodes"] if not where or metadata_matches(n, where)]
+    next_cursor = None
+    if query.cursor is not None or query.limit is not None:
+        start = int(query.cursor or 0)
+        end = start + (query.limit or config.NODE_PAGE_MAX_LIMIT)
+        next_cursor = str(end) if end < len(nodes) else None
+        page = nodes[start:end]
+    else:
+        page = nodes
+    return {
+        **archive_data,
+        "nodes": [project_node(n, query.fields) for n in page],
+        "links": graph_links(page),
+        "total_nodes": len(nodes),
+        "next_cursor": next_cursor
+    }
+
+def read_analysis(run: str, version: int) -> Tuple[dict, Optional[str]]:
+    """Analysis of the current run, and its ETag unless the graph moved past version while it was read.
+    Like the graph data it is read from the stored nodes, which the version describes."""
+    graph = vector_store_client.graph
+    top_nodes = graph.get_nodes(run, order_by="cumulative_score DESC", limit=1)
+
+    if not top_nodes:
+        analysis = {"message": "No analysis data available"}
+        return analysis, graph_etag("analysis", run, version) if vector_store_client.get_version() == version else None
+
+    # Find the highest scoring trajectory
+    best_node = top_nodes[0]
+
+    # Get path to best node
+    path = graph.get_path(run, best_node.id)
+
+    # Calculate statistics
+    stats = graph.get_stats(run)
+
+    return {
+        "total_nodes": stats["total_nodes"],
+        "average_score": stats["average_score"],
+        "pruned_nodes": stats["pruned_nodes"],
+        "best_trajectory": {
+            "cumulative_score": best_node.cumulative_score,
+            "path_length": len(path),
+            "final_insight": best_node.text,
+            "path": [{"id": n.id, "text": n.text, "score": n.score} for n in path]
+        }
+    }, graph_etag("analysis", run, version) if vector_store_client.get_version() == version else None
+
+async def warm_up_vector_store():
+    """Open the vector database and load the embedding model in the background"""
+    if coordinated():
+        # The runner owns ChromaDB and the model; this worker reads its run from the graph store
+        app.state.control_follower = ControlFollower(control_store, graph_events, vector_store_client)
+        await run_blocking(app.state.control_follower.start)
+    elif config.VECTOR_STORE_WARMUP_ENABLED:
+        vector_store_client.warm_up_async()
+
+async def shut_down_executors():
+    """Let running calls finish without accepting new ones"""
+    io_executor.shutdown(wait=False)
+    archive_executor.shutdown(wait=False)
+    if getattr(app.state, "control_follower", None):
+        app.state.control_follower.stop()
+
 @app.get("/")
 async def serve_frontend():
     """Serve the main frontend page"""
@@ -59,88 +269,94 @@ async def serve_debug_page():
 async def start_process(request: StartRequest, background_tasks: BackgroundTasks):
     """Start the GOT-AI analysis process"""
     try:
+        await reject_while_archiving()
         logger.info(f"Starting analysis for hypothesis: {request.hypothesis}")
         logger.info(f"Max depth: {request.max_depth}, Max nodes: {request.max_nodes}")
-        background_tasks.add_task(orchestrator.start_analysis, request.hypothesis, request.max_depth, request.max_nodes)
+        job = None
+        if coordinated():
+            job = await run_blocking(control_store.submit_job, "start", request.dict())
+        else:
+            background_tasks.add_task(
+                orchestrator.start_analysis,
+                request.hypothesis,
+                request.max_depth,
+                request.max_nodes,
+                request.seed,
+                request.max_seconds,
+                request.max_tokens,
+                request.max_llm_calls
+            )
         return {
             "message": "GOT-AI analysis started.", 
             "hypothesis": request.hypothesis,
             "max_depth": request.max_depth,
-            "max_nodes": request.max_nodes
+            "max_nodes": request.max_nodes,
+            "max_seconds": request.max_seconds,
+            "max_tokens": request.max_tokens,
+            "max_llm_calls": request.max_llm_calls,
+            "job_id": job["id"] if job else None
         }
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error starting analysis: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.post("/api/resume")
+async def resume_process(background_tasks: BackgroundTasks):
+    """Resume an interrupted GOT-AI analysis from its latest checkpoint"""
+    try:
+        state = await run_blocking(run_state)
+        if state.get("is_running"):
+            raise HTTPException(status_code=409, detail="Analysis already running")
+        await reject_while_archiving()
+        
+        # In coordinated mode the checkpoint belongs to the runner, which publishes it with its status
+        if coordinated():
+            checkpoint = state.get("resumable_checkpoint")
+        else:
+            checkpoint = await run_blocking(orchestrator.get_resumable_checkpoint)
+        if not checkpoint:
+            raise HTTPException(status_code=404, detail="No resumable checkpoint found")
+        
+        logger.info(f"Resuming run {checkpoint['run_id']} from cycle {checkpoint['cycle_count']}")
+        job = None
+        if coordinated():
+            job = await run_blocking(control_store.submit_job, "resume", {})
+        else:
+            background_tasks.add_task(orchestrator.resume_analysis)
+        return {
+            "message": "GOT-AI analysis resumed.",
+            "run_id": checkpoint["run_id"],
+            "hypothesis": checkpoint["hypothesis"],
+            "cycle_count": checkpoint["cycle_count"],
+            "max_depth": checkpoint["max_depth"],
+            "max_nodes": checkpoint["max_nodes"],
+            "job_id": job["id"] if job else None
+        }
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error resuming analysis: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
 @app.post("/api/stop")
 async def stop_process(request: StopRequest):
-    """Stop the GOT-AI analysis process and archive the results"""
+    """Stop the GOT-AI analysis process and archive the results in a background job.
+    Returns the job at once; follow it with /api/jobs/{job_id} or job events on /api/events."""
     try:
-        # Stop the analysis
-        orchestrator.stop_analysis()
-        
-        # Archive the current run if we have data
-        nodes = vector_store_client.get_all_nodes_for_graph()
-        if nodes and request.run_name.strip():
-            # Get the current hypothesis from the root node
-            root_nodes = [n for n in nodes if n.parent_id is None]
-            hypothesis = root_nodes[0].text if root_nodes else "Unknown hypothesis"
-            
-            # Generate analysis for archiving
-            analysis_data = None
-            try:
-                # Get the analysis data for the best trajectory
-                best_node = max(nodes, key=lambda n: n.cumulative_score)
-                path = []
-                current = best_node
-                while current:
-                    path.insert(0, current)
-                    if current.parent_id:
-                        current = vector_store_client.get_node_by_id(current.parent_id)
-                    else:
-                        break
-                
-                total_nodes = len(nodes)
-                avg_score = sum(n.score for n in nodes) / total_nodes if total_nodes > 0 else 0
-                pruned_nodes = sum(1 for n in nodes if n.is_pruned)
-                
-                analysis_data = {
-                    "total_nodes": total_nodes,
-                    "average_score": avg_score,
-                    "pruned_nodes": pruned_nodes,
-                    "best_trajectory": {
-                        "cumulative_score": best_node.cumulative_score,
-                        "path_length": len(path),
-                        "final_insight": best_node.text,
-                        "path": [{"id": n.id, "text": n.text, "score": n.score} for n in path]
-                    }
-                }
-            except Exception as e:
-                logger.warning(f"Could not generate analysis data: {e}")
-            
-            # Archive the run with analysis data
-            archive_result = archive_manager.archive_current_run(request.run_name, hypothesis, analysis_data)
-            
-            if archive_result["success"]:
-                # Clear current data for fresh start
-                archive_manager.clear_current_run()
-                
-                return {
-                    "message": f"Analysis stopped and archived as '{request.run_name}'",
-                    "archive_name": archive_result["archive_name"],
-                    "nodes_archived": archive_result["nodes_count"],
-                    "analysis_generated": analysis_data is not None
-                }
-            else:
-                return {
-                    "message": "Analysis stopped but archiving failed",
-                    "error": archive_result.get("error", "Unknown error")
-                }
+        # Joining the analysis thread and copying the database take seconds, so a stop that's already
+        # archiving hands back the job in progress rather than queuing a second one
+        if coordinated():
+            job = await run_blocking(control_store.submit_unique, "archive", {"run_name": request.run_name})
         else:
-            # Just stop without archiving if no data or no name
-            archive_manager.clear_current_run()
-            return {"message": "Analysis stopped. No data to archive or no run name provided."}
-            
+            job = job_manager.submit_unique("archive", archive_manager.stop_and_archive, request.run_name)
+        return {
+            "message": "Stopping analysis and archiving the run",
+            "job_id": job["id"],
+            "status_url": f"/api/jobs/{job['id']}",
+            "job": job
+        }
     except Exception as e:
         logger.error(f"Error stopping and archiving analysis: {e}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -148,37 +364,109 @@ async def stop_process(request: StopRequest):
 @app.get("/api/status")
 async def get_status():
     """Get the current status of the analysis"""
-    return {
-        "is_running": orchestrator.is_running,
-        "total_nodes": len(vector_store_client.get_all_nodes_for_graph())
+    total_nodes = await run_blocking(vector_store_client.count_nodes)
+    state = await run_blocking(run_state)
+    status = {
+        "is_running": state.get("is_running", False),
+        "total_nodes": total_nodes,
+        "stop_reason": state.get("stop_reason"),
+        "budget": state.get("budget"),
+        "archive_job": await run_blocking(active_archive_job)
     }
+    if coordinated():
+        status["runner_alive"] = state["runner_alive"]
+    return status
+
+@app.get("/api/jobs/{job_id}")
+async def get_job(job_id: str):
+    """Status, stage and progress of a background job; its result once done"""
+    job = await run_blocking(control_store.get_job, job_id) if coordinated() else job_manager.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+@app.get("/api/best")
+async def get_best_result():
+    """Get the best trajectory found so far, available at any point during a run"""
+    try:
+        state = await run_blocking(run_state)
+        return {key: state.get(key) for key in ["run_id", "is_running", "stop_reason", "cycle_count", "budget",
+                                                "best_trajectory"]}
+    except Exception as e:
+        logger.error(f"Error getting best result: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/api/graph_data", response_model=GraphData)
-async def get_graph_data():
-    """Get the current graph data for visualization"""
+async def get_graph_data(request: Request, since: Optional[int] = None, query: NodeQuery = Depends(node_query)):
+    """Get the current graph data for visualization.
+    With since=<version> only the nodes added or changed after that version are returned, with their links.
+    fields= picks node fields, min_depth/max_depth/min_score/max_score filter nodes, and limit= pages
+    through them; pass next_cursor back as cursor= for the next page."""
     try:
-        nodes = vector_store_client.get_all_nodes_for_graph()
+        if since is not None and (query.cursor is not None or query.limit is not None):
+            raise HTTPException(status_code=400, detail="since can't be combined with cursor or limit")
+        run, version = await run_blocking(current_graph_version)
+        etag = graph_etag(run, version, since, query.key())
+        # An unchanged graph is answered without reading or serializing any node
+        if not_modified(request, etag):
+            return not_modified_response(etag)
         
-        # Create links between parent and child nodes
-        links = []
-        for node in nodes:
-            if node.parent_id:
-                links.append({
-                    "source": node.parent_id,
-                    "target": node.id,
-                    "value": node.score  # Use score for link strength
-                })
-        
-        return GraphData(nodes=nodes, links=links)
+        # Read and encoded once per graph version and query, however many clients ask
+        cached = await run_blocking(
+            response_cache.get_or_build, ("graph", run, version, since, query.key()),
+            functools.partial(read_graph_data, run, version, since, query)
+        )
+        return cached.response(request)
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error getting graph data: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.get("/api/events")
+async def stream_events(request: Request, cursor: Optional[str] = None):
+    """Push node-added, node-updated, pruned, cycle and run-finished events as Server-Sent Events.
+    A reconnecting client resumes after its Last-Event-ID (or cursor); otherwise it gets a reset first."""
+    try:
+        # Opening the store can take a moment on the first request. In coordinated mode the stream
+        # mirrors the runner's events instead.
+        if not coordinated():
+            await run_blocking(graph_events.attach)
+    except Exception as e:
+        logger.error(f"Error opening event stream: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+    cursor = request.headers.get("last-event-id") or cursor
+    return StreamingResponse(
+        sse_events(graph_events, cursor, request.is_disconnected),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@app.get("/api/nodes")
+async def get_nodes_batch(ids: str, fields: Optional[str] = None):
+    """Look up several nodes at once. ids and fields are comma-separated; ids not found are listed as missing."""
+    try:
+        node_ids = list(dict.fromkeys(node_id.strip() for node_id in ids.split(",") if node_id.strip()))
+        if len(node_ids) > config.NODE_BATCH_MAX_IDS:
+            raise HTTPException(status_code=400, detail=f"At most {config.NODE_BATCH_MAX_IDS} ids per request")
+        names = parse_fields(fields)
+        nodes = await run_blocking(vector_store_client.get_nodes, ids=node_ids) if node_ids else []
+        found = {n.id: n.dict(exclude={"embedding"}) for n in nodes}
+        return {
+            "nodes": [project_node(found[node_id], names) for node_id in node_ids if node_id in found],
+            "missing": [node_id for node_id in node_ids if node_id not in found]
+        }
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error getting nodes: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
 @app.get("/api/node/{node_id}", response_model=Node)
 async def get_node_details(node_id: str):
     """Get detailed information about a specific node"""
     try:
-        node = vector_store_client.get_node_by_id(node_id)
+        node = await run_blocking(vector_store_client.get_node_by_id, node_id)
         if node:
             return node
         else:
@@ -188,53 +476,32 @@ async def get_node_details(node_id: str):
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/api/analysis")
-async def get_analysis():
+async def get_analysis(request: Request):
     """Get analysis results - highest scoring paths, insights, etc."""
     try:
-        nodes = vector_store_client.get_all_nodes_for_graph()
-        
-        if not nodes:
-            return {"message": "No analysis data available"}
-        
-        # Find the highest scoring trajectory
-        best_node = max(nodes, key=lambda n: n.cumulative_score)
-        
-        # Get path to best node
-        path = []
-        current = best_node
-        while current:
-            path.insert(0, current)
-            if current.parent_id:
-                current = vector_store_client.get_node_by_id(current.parent_id)
-            else:
-                break
-        
-        # Calculate statistics
-        total_nodes = len(nodes)
-        avg_score = sum(n.score for n in nodes) / total_nodes if total_nodes > 0 else 0
-        pruned_nodes = sum(1 for n in nodes if n.is_pruned)
-        
-        return {
-            "total_nodes": total_nodes,
-            "average_score": avg_score,
-            "pruned_nodes": pruned_nodes,
-            "best_trajectory": {
-                "cumulative_score": best_node.cumulative_score,
-                "path_length": len(path),
-                "final_insight": best_node.text,
-                "path": [{"id": n.id, "text": n.text, "score": n.score} for n in path]
-            }
-        }
+        run, version = await run_blocking(current_graph_version)
+        etag = graph_etag("analysis", run, version)
+        if not_modified(request, etag):
+            return not_modified_response(etag)
+
+        cached = await run_blocking(
+            response_cache.get_or_build, ("analysis", run, version), functools.partial(read_analysis, run, version)
+        )
+        return cached.response(request)
     except Exception as e:
         logger.error(f"Error getting analysis: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/api/archive/{archive_name}/analysis")
-async def get_archive_analysis(archive_name: str):
+async def get_archive_analysis(archive_name: str, request: Request, response: Response):
     """Get analysis data for a specific archived run"""
     try:
-        analysis_data = archive_manager.load_archive_analysis(archive_name)
+        etag = await run_blocking(archive_manager.archive_etag, archive_name, ARCHIVE_ANALYSIS_FILES)
+        if not_modified(request, etag):
+            return not_modified_response(etag)
+        analysis_data = await run_blocking(archive_manager.load_archive_analysis, archive_name)
         if analysis_data:
+            response.headers["ETag"] = etag
             return analysis_data
         else:
             raise HTTPException(status_code=404, detail="Archive analysis not found")
@@ -246,34 +513,54 @@ async def get_archive_analysis(archive_name: str):
 async def clear_data():
     """Clear all current data for a fresh start"""
     try:
-        success = archive_manager.clear_current_run()
+        await reject_while_archiving()
+        if coordinated():
+            job = await run_blocking(control_store.submit_job, "clear", {})
+            return {"message": "Clearing all data for a fresh start.", "job_id": job["id"]}
+        success = await run_blocking(archive_manager.clear_current_run, executor=archive_executor)
         if success:
             return {"message": "All data cleared successfully. Ready for new analysis."}
         else:
             return {"message": "Failed to clear data completely."}
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error clearing data: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/api/archives")
-async def list_archives():
+async def list_archives(request: Request, response: Response):
     """List all archived runs"""
     try:
-        archives = archive_manager.list_archived_runs()
+        archives = await run_blocking(archive_manager.list_archived_runs)
+        # The listing itself is cheap to hash; the client is spared downloading it again
+        etag = '"' + hashlib.sha1(json.dumps(archives, sort_keys=True).encode('utf-8')).hexdigest() + '"'
+        if not_modified(request, etag):
+            return not_modified_response(etag)
+        response.headers["ETag"] = etag
         return {"archives": archives}
     except Exception as e:
         logger.error(f"Error listing archives: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/api/archive/{archive_name}")
-async def load_archive(archive_name: str):
-    """Load a specific archived run for viewing"""
+async def load_archive(archive_name: str, request: Request, response: Response, query: NodeQuery = Depends(node_query)):
+    """Load a specific archived run for viewing. Takes the same fields, filter and paging parameters as
+    /api/graph_data; the nodes come with their links."""
     try:
-        archive_data = archive_manager.load_archived_run(archive_name)
+        etag = await run_blocking(archive_manager.archive_etag, archive_name, ARCHIVE_VIEW_FILES)
+        if etag and query.key():
+            etag = etag[:-1] + f'-{query.key()}"'
+        if not_modified(request, etag):
+            return not_modified_response(etag)
+        archive_data = await run_blocking(archive_manager.load_archived_run, archive_name)
         if archive_data["success"]:
-            return archive_data
+            response.headers["ETag"] = etag
+            return select_archive_nodes(archive_data, query)
         else:
             raise HTTPException(status_code=404, detail=archive_data["error"])
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error loading archive {archive_name}: {e}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -283,7 +570,7 @@ async def delete_archive(archive_name: str):
     """Delete an archived run"""
     try:
         logger.info(f"Deleting archive: {archive_name}")
-        result = archive_manager.delete_archive(archive_name)
+        result = await run_blocking(archive_manager.delete_archive, archive_name, executor=archive_executor)
         if result["success"]:
             return {"message": f"Archive '{archive_name}' deleted successfully"}
         else:
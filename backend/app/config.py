@@ -3,11 +3,90 @@ import os
 
 LOCAL_LLM_MODEL = "qwen3:0.6b"
 VECTOR_DB_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), "db_data")
-COLLECTION_NAME = "got_ai_knowledge"
+COLLECTION_NAME = "got_ai_knowledge"  # Used until the first run creates its own collection
+GRAPH_DB_FILENAME = "graph.sqlite3"  # Node and edge tables, stored next to the ChromaDB files
+RUN_COLLECTION_PREFIX = "run_"  # Each run gets the collection run_<run_id>; earlier ones are reaped in the background
+EMBEDDING_MODEL_NAME = "all-MiniLM-L6-v2"  # Small, fast, local
+EMBEDDING_BACKEND = "torch"  # "torch" runs SentenceTransformer, "onnx" runs an ONNX Runtime export of the same model
+EMBEDDING_ONNX_QUANTIZE = False  # Use the int8 dynamically quantized ONNX graph
+EMBEDDING_ONNX_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), "onnx_models")
+VECTOR_STORE_WARMUP_ENABLED = True  # Load the embedding model in the background when the server starts
+EMBEDDING_BATCH_SIZE = 32  # Texts per SentenceTransformer forward pass when embedding nodes in bulk
+WRITE_BUFFER_MAX_PENDING = 256  # Buffered node writes that force a flush before the next cycle boundary
+WRITE_QUEUE_MAX_BATCHES = 8  # Flushed batches waiting for the writer thread before flushing blocks
+# "chroma" writes every flush through to ChromaDB on disk. "memory" keeps the run in a NumPy matrix
+# and writes it to ChromaDB only every MEMORY_BACKEND_PERSIST_INTERVAL_CYCLES cycles, when the run stops
+# or when it is archived.
+VECTOR_BACKEND = "chroma"
+MEMORY_BACKEND_HNSW_THRESHOLD = 20000  # Nodes above which the memory backend searches an HNSW index; None disables it
+MEMORY_BACKEND_PERSIST_BATCH_SIZE = 1000
+MEMORY_BACKEND_PERSIST_INTERVAL_CYCLES = 10  # Checkpoints between them only flush; runs are persisted when they stop
+
+# Embedding cache: vectors keyed by a hash of model name and text, kept in a memory-mapped file across runs
+EMBEDDING_CACHE_ENABLED = True
+EMBEDDING_CACHE_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), "embedding_cache")
+EMBEDDING_CACHE_MAX_ENTRIES = 50000  # Least recently used vectors are evicted beyond this
+EMBEDDING_CACHE_DTYPE = "float32"  # "float32" keeps vectors exact, "float16" halves the file size
+
+# Semantic deduplication: new thoughts this similar to an existing node are merged into it
+DEDUP_ENABLED = True
+DEDUP_SIMILARITY_THRESHOLD = 0.92  # Cosine similarity of the sentence embeddings
 
 # Archive settings
 ARCHIVE_BASE_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), "archive")
 
+# Checkpoint settings
+CHECKPOINT_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), "checkpoints")
+CHECKPOINT_INTERVAL_CYCLES = 1  # Save orchestrator state every N completed cycles
+
+# Run journal: record every LLM and embedding call of a run so it can be replayed offline (python -m app.replay)
+JOURNAL_RECORDING_ENABLED = False
+JOURNAL_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), "journals")
+
+CYCLE_PAUSE_SECONDS = 3  # Pause between local expansion cycles
+
+# Retrieval-augmented expansion: show the agent the stored thoughts closest to the node it expands
+RETRIEVAL_CONTEXT_ENABLED = False
+RETRIEVAL_CONTEXT_K = 3  # Related thoughts per prompt
+
+# API handlers run blocking work on bounded thread pools so the event loop stays free
+API_IO_WORKERS = 8  # Store reads and archive file reads
+API_ARCHIVE_WORKERS = 2  # Clearing runs and deleting archives; kept apart so they never hold up reads
+
+# Graph and analysis responses are encoded once per graph version and served to every client from memory
+RESPONSE_CACHE_MAX_ENTRIES = 64
+RESPONSE_GZIP_MIN_BYTES = 1024  # Smaller bodies are sent uncompressed; None disables the gzip variant
+RESPONSE_GZIP_LEVEL = 6
+
+# Node queries: fields= projection, depth/score filters and cursor pagination on graph and archive endpoints
+NODE_PAGE_MAX_LIMIT = 5000  # Largest limit= a page may ask for; a cursor without a limit gets pages this size
+NODE_BATCH_MAX_IDS = 500  # Ids one /api/nodes request may look up
+
+# Event stream: graph changes and run progress pushed to browsers over Server-Sent Events (/api/events)
+EVENT_STREAM_BUFFER_SIZE = 1000  # Recent events kept for reconnecting clients; older cursors get a reset
+EVENT_STREAM_HEARTBEAT_SECONDS = 15  # Keep-alive comment sent on an idle stream
+
+# Background jobs (archiving a stopped run), followed with /api/jobs/{id} and job events
+JOBS_MAX_FINISHED = 100  # Finished jobs kept for status requests; older ones are forgotten
+
+# Server processes. "embedded" runs the orchestrator inside a single API process. "coordinated" keeps run state,
+# commands and events in a shared SQLite control store: any number of API workers serve viewers and one
+# orchestration process (python -m app.runner) runs the analysis. Set from the environment so every worker sees it.
+SERVER_MODE = os.environ.get("GOTAI_SERVER_MODE", "embedded")
+SERVER_WORKERS = 4  # API worker processes started by main.py --production
+CONTROL_DB_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), "control", "control.sqlite3")
+CONTROL_POLL_SECONDS = 0.5  # How often API workers read run state and events, and the runner reads commands
+RUNNER_STALE_SECONDS = 30  # A runner whose last status is older than this is reported as down
+
+# Expansion workers
+EXPANSION_MODE = "local"  # "local" expands nodes in the orchestrator thread, "queue" hands them to app.worker processes
+TASK_QUEUE_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), "task_queue", "tasks.sqlite3")
+TASK_QUEUE_MAX_IN_FLIGHT = 4  # Nodes expanded concurrently in queue mode
+TASK_QUEUE_POLL_SECONDS = 1.0
+TASK_LEASE_SECONDS = 120  # Workers renew the lease while working; an expired lease is claimed by another worker
+TASK_MAX_ATTEMPTS = 3
+TASK_QUEUE_CLAIM_TIMEOUT_SECONDS = 60  # A queue-mode run stops if no worker claims any of its tasks for this long
+
 # The Interrogative Battery
 INTERROGATIVE_BATTERY = [
     "Why is this the case?", 
@@ -26,6 +105,19 @@ Statement: "{statement_text}"
 Your one-sentence outcome:
 """
 
+AGENT_CONTEXT_PROMPT_TEMPLATE = """
+You are a creative and logical thinker. Given the following statement, generate a concise, one-sentence outcome for the question: "{question}"
+
+Statement: "{statement_text}"
+
+Related thoughts already explored:
+{context}
+
+Build on the related thoughts where useful, but do not repeat them.
+
+Your one-sentence outcome:
+"""
+
 LOGIC_SCORING_PROMPT_TEMPLATE = """
 On a scale from 0.0 to 1.0, how logically sound and internally consistent is the following statement? Output ONLY the number.
 
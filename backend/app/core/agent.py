@@ -2,24 +2,27 @@ from ..llm.llm_interface import llm_client
 from .. import config
 from .scoring import scorer
 from ..db.data_models import Node
-from typing import List
+from typing import List, Optional
 import logging
 
 logger = logging.getLogger(__name__)
 
 class Agent:
-    def investigate(self, source_node: Node) -> List[Node]:
-        """Generate new nodes by investigating the source node with the interrogative battery"""
+    def investigate(self, source_node: Node, related: Optional[List[str]] = None) -> List[Node]:
+        """Generate new nodes by investigating the source node with the interrogative battery.
+        related are texts of similar stored thoughts, given to the LLM as context."""
         new_nodes = []
         
         logger.info(f"Agent investigating node: {source_node.id}")
         
         for question in config.INTERROGATIVE_BATTERY:
+            # Each new node needs one generation and one scoring call
+            if llm_client.budget is not None and not llm_client.budget.can_afford(calls=2):
+                logger.info("Run budget exhausted - stopping investigation early")
+                break
+
             try:
-                prompt = config.AGENT_PROMPT_TEMPLATE.format(
-                    question=question, 
-                    statement_text=source_node.text
-                )
+                prompt = self._build_prompt(question, source_node, related)
                 new_text = llm_client.generate(prompt)
 
                 if "Error:" not in new_text and len(new_text.strip()) > 0:
@@ -45,5 +48,17 @@ class Agent:
         logger.info(f"Generated {len(new_nodes)} new nodes from source node")
         return new_nodes
 
+    def _build_prompt(self, question: str, source_node: Node, related: Optional[List[str]] = None) -> str:
+        if related:
+            return config.AGENT_CONTEXT_PROMPT_TEMPLATE.format(
+                question=question,
+                statement_text=source_node.text,
+                context="\n".join(f"- {text}" for text in related)
+            )
+        return config.AGENT_PROMPT_TEMPLATE.format(
+            question=question,
+            statement_text=source_node.text
+        )
+
 # Global instance
 agent = Agent()
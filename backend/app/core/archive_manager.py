@@ -1,15 +1,22 @@
 import os
 import json
 import shutil
+import hashlib
 from datetime import datetime
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, Callable
 from ..db.vector_store import vector_store_client
+from .checkpoint import checkpoint_manager
+from .orchestrator import orchestrator
 from ..db.data_models import Node
 from .. import config
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Files behind each archive endpoint, so their ETags change exactly when a response would
+ARCHIVE_VIEW_FILES = ["metadata.json", "nodes.json", "graph_data.json", "analysis_summary.json"]
+ARCHIVE_ANALYSIS_FILES = ["analysis.json"]
+
 class ArchiveManager:
     def __init__(self):
         self.archive_base_path = config.ARCHIVE_BASE_PATH
@@ -37,9 +44,76 @@ class ArchiveManager:
             sanitized = "unnamed_run"
             
         return sanitized
+
+    def stop_and_archive(self, progress, run_name: str) -> Dict[str, Any]:
+        """Stop the analysis, archive the run under run_name if there is data, and start over.
+        Runs as an archive job; progress(stage, fraction) reports how far it got."""
+        # Stop the analysis
+        progress("stopping analysis", 0.0)
+        orchestrator.stop_analysis()
+
+        # Archive the current run if we have data
+        top_nodes = vector_store_client.get_top_nodes(1)
+        if top_nodes and run_name.strip():
+            # Get the current hypothesis from the root node
+            progress("reading results", 0.05)
+            root_nodes = vector_store_client.get_nodes(where={"depth": 0}, limit=1)
+            hypothesis = root_nodes[0].text if root_nodes else "Unknown hypothesis"
+
+            # Generate analysis for archiving
+            analysis_data = None
+            try:
+                # Get the analysis data for the best trajectory
+                best_node = top_nodes[0]
+                path = vector_store_client.get_path(best_node.id)
+                stats = vector_store_client.get_graph_stats()
+
+                analysis_data = {
+                    "total_nodes": stats["total_nodes"],
+                    "average_score": stats["average_score"],
+                    "pruned_nodes": stats["pruned_nodes"],
+                    "best_trajectory": {
+                        "cumulative_score": best_node.cumulative_score,
+                        "path_length": len(path),
+                        "final_insight": best_node.text,
+                        "path": [{"id": n.id, "text": n.text, "score": n.score} for n in path]
+                    }
+                }
+            except Exception as e:
+                logger.warning(f"Could not generate analysis data: {e}")
+
+            # Archive the run with analysis data
+            archive_result = self.archive_current_run(
+                run_name, hypothesis, analysis_data,
+                progress=lambda stage, fraction=None: progress(stage, None if fraction is None else 0.1 + 0.8 * fraction)
+            )
+
+            if archive_result["success"]:
+                # Clear current data for fresh start
+                progress("clearing run", 0.9)
+                self.clear_current_run()
+
+                return {
+                    "message": f"Analysis stopped and archived as '{run_name}'",
+                    "archive_name": archive_result["archive_name"],
+                    "nodes_archived": archive_result["nodes_count"],
+                    "analysis_generated": analysis_data is not None
+                }
+            else:
+                return {
+                    "message": "Analysis stopped but archiving failed",
+                    "error": archive_result.get("error", "Unknown error")
+                }
+        else:
+            # Just stop without archiving if no data or no name
+            progress("clearing run", 0.9)
+            self.clear_current_run()
+            return {"message": "Analysis stopped. No data to archive or no run name provided."}
     
-    def archive_current_run(self, run_name: str, hypothesis: str, analysis_data: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
-        """Archive the current run data"""
+    def archive_current_run(self, run_name: str, hypothesis: str, analysis_data: Optional[Dict[str, Any]] = None,
+                            progress: Optional[Callable] = None) -> Dict[str, Any]:
+        """Archive the current run data. progress(stage, fraction) is told how far the archive got."""
+        progress = progress or (lambda stage, fraction=None: None)
         try:
             timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
             sanitized_name = self._sanitize_run_name(run_name)
@@ -49,20 +123,25 @@ class ArchiveManager:
             # Create archive directory
             os.makedirs(archive_path)
             
-            # Get all current nodes
-            nodes = vector_store_client.get_all_nodes_for_graph()
+            # A compaction left over from the run would rewrite the files under the copy, so it goes first
+            with vector_store_client.hold_files():
+                # Get all current nodes, written to disk first so the archived database files are complete
+                progress("saving nodes", 0.0)
+                vector_store_client.persist()
+                nodes = vector_store_client.get_all_nodes_for_graph()
             
-            # Use provided analysis data or generate it
-            if analysis_data is None:
-                analysis_data = self._generate_analysis_data(nodes, hypothesis)
+                # Use provided analysis data or generate it
+                if analysis_data is None:
+                    analysis_data = self._generate_analysis_data(nodes, hypothesis)
             
-            # Save data files
-            self._save_nodes_data(nodes, archive_path)
-            self._save_analysis_data(analysis_data, archive_path)
-            self._save_metadata(run_name, hypothesis, timestamp, archive_path)
+                # Save data files
+                self._save_nodes_data(nodes, archive_path)
+                self._save_analysis_data(analysis_data, archive_path)
+                self._save_metadata(run_name, hypothesis, timestamp, archive_path)
             
-            # Copy database files if they exist
-            self._archive_database_files(archive_path)
+                # Copy database files if they exist; this is most of the time an archive takes
+                progress("copying database", 0.2)
+                self._archive_database_files(archive_path, progress=lambda copied: progress("copying database", 0.2 + 0.8 * copied))
             
             logger.info(f"Successfully archived run '{run_name}' to {archive_path}")
             
@@ -122,13 +201,23 @@ class ArchiveManager:
         
         logger.info(f"Saved metadata to {metadata_file}")
     
-    def _archive_database_files(self, archive_path: str):
-        """Copy database files to archive"""
+    def _archive_database_files(self, archive_path: str, progress: Optional[Callable[[float], None]] = None):
+        """Copy database files to archive, calling progress with the fraction of bytes copied after each file"""
         db_path = config.VECTOR_DB_PATH
         if os.path.exists(db_path):
             archive_db_path = os.path.join(archive_path, "database")
+            total = sum(os.path.getsize(os.path.join(root, name)) for root, _, names in os.walk(db_path) for name in names)
+            copied = 0
+
+            def copy_file(src, dst):
+                nonlocal copied
+                shutil.copy2(src, dst)
+                copied += os.path.getsize(src)
+                if progress and total:
+                    progress(min(copied / total, 1.0))
+
             try:
-                shutil.copytree(db_path, archive_db_path)
+                shutil.copytree(db_path, archive_db_path, copy_function=copy_file)
                 logger.info(f"Archived database files to {archive_db_path}")
             except Exception as e:
                 logger.warning(f"Could not archive database files: {e}")
@@ -205,8 +294,9 @@ class ArchiveManager:
         children_count = {}
         
         for node in nodes:
-            if node.parent_id:
-                children_count[node.parent_id] = children_count.get(node.parent_id, 0) + 1
+            for parent_id in [node.parent_id] + node.extra_parent_ids:
+                if parent_id:
+                    children_count[parent_id] = children_count.get(parent_id, 0) + 1
         
         leaf_nodes = [n for n in nodes if n.id not in children_count]
         
@@ -252,6 +342,9 @@ class ArchiveManager:
             vector_store_client.clear_collection()
             logger.info("Successfully cleared vector database collection")
             
+            # The checkpoint refers to the data we just removed
+            checkpoint_manager.clear_checkpoint()
+            
             logger.info("Successfully cleared current run data")
             return True
             
@@ -332,16 +425,11 @@ class ArchiveManager:
                     else:
                         nodes = []
             
-            # Load graph data
+            # Archives without nodes.json only have the nodes saved with their graph data
             graph_file = os.path.join(archive_path, "graph_data.json")
-            graph_data = {"nodes": [], "links": []}
-            if os.path.exists(graph_file):
+            if not nodes and os.path.exists(graph_file):
                 with open(graph_file, 'r', encoding='utf-8') as f:
-                    graph_data = json.load(f)
-            
-            # If graph data is empty but we have nodes, generate graph data
-            if (not graph_data.get('nodes') or len(graph_data.get('nodes', [])) == 0) and nodes:
-                graph_data = self._generate_graph_data_from_nodes(nodes)
+                    nodes = json.load(f).get('nodes', [])
             
             # Load analysis summary
             summary_file = os.path.join(archive_path, "analysis_summary.json")
@@ -354,7 +442,6 @@ class ArchiveManager:
                 "success": True,
                 "metadata": metadata,
                 "nodes": nodes,
-                "graph_data": graph_data,
                 "summary": summary
             }
             
@@ -382,41 +469,21 @@ class ArchiveManager:
             logger.error(f"Error loading archive analysis {archive_name}: {e}")
             return None
     
-    def _generate_graph_data_from_nodes(self, nodes):
-        """Generate graph visualization data from node list"""
-        try:
-            graph_nodes = []
-            links = []
-            
-            for node in nodes:
-                # Create graph node
-                graph_node = {
-                    "id": node.get('id'),
-                    "text": node.get('text', '')[:100] + ('...' if len(node.get('text', '')) > 100 else ''),
-                    "score": node.get('score', 0.0),
-                    "is_pruned": node.get('is_pruned', False),
-                    "x": None,  # Let D3 position
-                    "y": None
-                }
-                graph_nodes.append(graph_node)
-                
-                # Create link if node has parent
-                if node.get('parent_id'):
-                    link = {
-                        "source": node.get('parent_id'),
-                        "target": node.get('id')
-                    }
-                    links.append(link)
-            
-            return {
-                "nodes": graph_nodes,
-                "links": links
-            }
-            
-        except Exception as e:
-            logger.error(f"Error generating graph data from nodes: {e}")
-            return {"nodes": [], "links": []}
-    
+    def archive_etag(self, archive_name: str, filenames: List[str]) -> Optional[str]:
+        """Strong ETag of an archive's files from their sizes and modification times, without reading them.
+        None if the archive doesn't exist."""
+        archive_path = os.path.join(self.archive_base_path, archive_name)
+        if not os.path.isdir(archive_path):
+            return None
+        signature = [archive_name]
+        for filename in filenames:
+            try:
+                stat = os.stat(os.path.join(archive_path, filename))
+                signature.append(f"{filename}:{stat.st_size}:{stat.st_mtime_ns}")
+            except FileNotFoundError:
+                signature.append(f"{filename}:-")
+        return '"' + hashlib.sha1("|".join(signature).encode('utf-8')).hexdigest() + '"'
+
     def delete_archive(self, archive_name: str) -> Dict[str, Any]:
         """Delete an archived run"""
         try:
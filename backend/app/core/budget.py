@@ -0,0 +1,158 @@
+import time
+import threading
+from typing import Optional, Dict, Any, Tuple
+import logging
+
+logger = logging.getLogger(__name__)
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count of a prompt before it is sent; Ollama reports the exact count afterwards"""
+    return len(text) // 4 + 1
+
+class RunBudget:
+    """Per-run limits on wall-clock time, LLM tokens and LLM calls.
+
+    Calls are refused once a limit is reached. The token limit counts prompt and generated tokens; a call
+    is only made if its estimated prompt and at least one generated token fit, so usage can pass the limit
+    by no more than the error of the prompt estimate. A call in progress when the time limit ends is cut off.
+    """
+
+    def __init__(self, max_seconds: Optional[float] = None, max_tokens: Optional[int] = None,
+                 max_llm_calls: Optional[int] = None):
+        self.max_seconds = max_seconds
+        self.max_tokens = max_tokens
+        self.max_llm_calls = max_llm_calls
+        self.used_tokens = 0
+        self.used_llm_calls = 0
+        self._elapsed_before_start = 0.0
+        self._started_at = None
+        self._token_shortfall = False  # Set once the remaining tokens can't cover even the cheapest call
+        self.reserved_tokens = 0  # Set aside for queued expansions until their usage is recorded
+        self.reserved_llm_calls = 0
+        self._lock = threading.Lock()
+
+    def start(self):
+        """Start (or restart after a resume) the wall clock"""
+        self._started_at = time.monotonic()
+
+    def stop(self):
+        """Freeze the wall clock when the run ends"""
+        self._elapsed_before_start = self.elapsed_seconds()
+        self._started_at = None
+
+    def elapsed_seconds(self) -> float:
+        """Wall-clock seconds spent on this run, including time before a resume"""
+        if self._started_at is None:
+            return self._elapsed_before_start
+        return self._elapsed_before_start + (time.monotonic() - self._started_at)
+
+    def remaining_seconds(self) -> Optional[float]:
+        if self.max_seconds is None:
+            return None
+        return max(0.0, self.max_seconds - self.elapsed_seconds())
+
+    def remaining_tokens(self) -> Optional[int]:
+        if self.max_tokens is None:
+            return None
+        return max(0, self.max_tokens - self.used_tokens)
+
+    def remaining_llm_calls(self) -> Optional[int]:
+        if self.max_llm_calls is None:
+            return None
+        return max(0, self.max_llm_calls - self.used_llm_calls)
+
+    def exhausted_reason(self) -> Optional[str]:
+        """Name of the first exhausted budget, or None while all budgets have room"""
+        if self.remaining_seconds() == 0:
+            return "max_seconds"
+        if self.remaining_tokens() == 0 or self._token_shortfall:
+            return "max_tokens"
+        if self.remaining_llm_calls() == 0:
+            return "max_llm_calls"
+        return None
+
+    def can_afford(self, calls: int = 1, tokens: int = 0, min_tokens: Optional[int] = None) -> bool:
+        """Check whether the next `calls` LLM calls, using `tokens` tokens, fit inside every budget.
+        min_tokens is what the cheapest call would use; once even that doesn't fit, the token budget is spent."""
+        if self.exhausted_reason():
+            return False
+        remaining_calls = self.remaining_llm_calls()
+        remaining_tokens = self.remaining_tokens()
+        if remaining_tokens is not None and remaining_tokens < tokens:
+            # Only this call is refused while a shorter prompt, such as a scoring one, still fits
+            if min_tokens is not None and remaining_tokens < min_tokens:
+                self._token_shortfall = True
+            return False
+        return remaining_calls is None or remaining_calls >= calls
+
+    def clamp_tokens(self, max_tokens: int, prompt_tokens: int = 0) -> int:
+        """Limit a generation length to the tokens the prompt leaves in the budget"""
+        remaining = self.remaining_tokens()
+        if remaining is None:
+            return max_tokens
+        return max(1, min(max_tokens, remaining - prompt_tokens))
+
+    def reserve(self, shares: int, min_calls: int = 1) -> Optional[Tuple[Optional[int], Optional[int]]]:
+        """Set aside one of `shares` equal parts of the unreserved tokens and calls for a queued expansion.
+        Fewer, larger parts are used when an equal split would leave less than min_calls each.
+        Returns the (tokens, calls) set aside, None for an unlimited budget, or None when nothing is left."""
+        with self._lock:
+            if self.exhausted_reason():
+                return None
+            tokens = self.remaining_tokens()
+            calls = self.remaining_llm_calls()
+            if tokens is not None:
+                tokens -= self.reserved_tokens
+                shares = min(shares, tokens)
+            if calls is not None:
+                calls -= self.reserved_llm_calls
+                shares = min(shares, calls // min_calls)
+            if shares <= 0:
+                return None
+            if tokens is not None:
+                tokens //= shares
+                self.reserved_tokens += tokens
+            if calls is not None:
+                calls //= shares
+                self.reserved_llm_calls += calls
+            return tokens, calls
+
+    def release(self, tokens: Optional[int], calls: Optional[int]):
+        """Give back a reservation once the expansion's own usage is recorded or it was cancelled"""
+        with self._lock:
+            self.reserved_tokens = max(0, self.reserved_tokens - (tokens or 0))
+            self.reserved_llm_calls = max(0, self.reserved_llm_calls - (calls or 0))
+
+    def clear_reservations(self):
+        with self._lock:
+            self.reserved_tokens = 0
+            self.reserved_llm_calls = 0
+
+    def record_call(self, tokens: int, calls: int = 1):
+        """Account for completed LLM calls"""
+        with self._lock:
+            self.used_llm_calls += calls
+            self.used_tokens += tokens
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "max_seconds": self.max_seconds,
+            "max_tokens": self.max_tokens,
+            "max_llm_calls": self.max_llm_calls,
+            "elapsed_seconds": self.elapsed_seconds(),
+            "used_tokens": self.used_tokens,
+            "used_llm_calls": self.used_llm_calls,
+            "reserved_tokens": self.reserved_tokens,
+            "reserved_llm_calls": self.reserved_llm_calls
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "RunBudget":
+        """Rebuild a budget from a checkpoint, keeping the usage recorded so far"""
+        budget = cls(data.get("max_seconds"), data.get("max_tokens"), data.get("max_llm_calls"))
+        budget.used_tokens = data.get("used_tokens", 0)
+        budget.used_llm_calls = data.get("used_llm_calls", 0)
+        budget.reserved_tokens = data.get("reserved_tokens", 0)
+        budget.reserved_llm_calls = data.get("reserved_llm_calls", 0)
+        budget._elapsed_before_start = data.get("elapsed_seconds", 0.0)
+        return budget
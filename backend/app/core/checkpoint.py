@@ -0,0 +1,65 @@
+import os
+import json
+from datetime import datetime
+from typing import Optional, Dict, Any
+from .. import config
+import logging
+
+logger = logging.getLogger(__name__)
+
+class CheckpointManager:
+    def __init__(self, checkpoint_path: Optional[str] = None):
+        self.checkpoint_path = checkpoint_path or config.CHECKPOINT_PATH
+        self.checkpoint_file = os.path.join(self.checkpoint_path, "latest.json")
+
+    def _ensure_checkpoint_directory(self):
+        """Ensure the checkpoint directory exists; created on the first save so importing never touches the disk"""
+        if not os.path.exists(self.checkpoint_path):
+            os.makedirs(self.checkpoint_path)
+            logger.info(f"Created checkpoint directory: {self.checkpoint_path}")
+
+    def save_checkpoint(self, state: Dict[str, Any]) -> bool:
+        """Atomically write the orchestrator state to the latest checkpoint"""
+        try:
+            self._ensure_checkpoint_directory()
+            state = dict(state)
+            state["saved_at"] = datetime.now().isoformat()
+
+            # Write to a temporary file first so a crash never leaves a torn checkpoint
+            tmp_file = self.checkpoint_file + ".tmp"
+            with open(tmp_file, 'w', encoding='utf-8') as f:
+                json.dump(state, f, indent=2, ensure_ascii=False)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_file, self.checkpoint_file)
+
+            logger.debug(f"Saved checkpoint for run {state.get('run_id')} at cycle {state.get('cycle_count')}")
+            return True
+        except Exception as e:
+            logger.error(f"Error saving checkpoint: {e}")
+            return False
+
+    def load_checkpoint(self) -> Optional[Dict[str, Any]]:
+        """Load the latest checkpoint, if any"""
+        try:
+            if not os.path.exists(self.checkpoint_file):
+                return None
+            with open(self.checkpoint_file, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except Exception as e:
+            logger.error(f"Error loading checkpoint: {e}")
+            return None
+
+    def clear_checkpoint(self) -> bool:
+        """Remove the latest checkpoint"""
+        try:
+            if os.path.exists(self.checkpoint_file):
+                os.remove(self.checkpoint_file)
+                logger.info("Cleared run checkpoint")
+            return True
+        except Exception as e:
+            logger.error(f"Error clearing checkpoint: {e}")
+            return False
+
+# Global instance
+checkpoint_manager = CheckpointManager()
@@ -0,0 +1,290 @@
+import os
+import json
+import time
+import uuid
+import sqlite3
+import threading
+from typing import Optional, List, Dict, Any, Tuple
+from .events import graph_events
+from ..db.vector_store import vector_store_client
+from .. import config
+import logging
+
+logger = logging.getLogger(__name__)
+
+JOB_COLUMNS = ["id", "kind", "status", "stage", "progress", "result", "error", "created_at", "started_at", "finished_at"]
+
+class ControlStore:
+    """SQLite-backed run state shared by the API workers and the orchestration process in coordinated mode.
+
+    API workers queue commands (start, resume, archive, clear) as jobs; the runner claims them in order and
+    reports their progress. The runner also publishes its status and every event, which API workers read
+    to answer status requests and feed their event streams.
+    """
+
+    def __init__(self, path: str = config.CONTROL_DB_PATH):
+        self.path = os.path.abspath(path)
+        self._schema_ready = False  # Created on first use, so an embedded server never creates the file
+
+    def _connect(self) -> sqlite3.Connection:
+        """Open a connection in autocommit mode; transactions are started explicitly"""
+        if not self._schema_ready:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            self._create_schema()
+        conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def _create_schema(self):
+        conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        try:
+            # WAL lets API workers read while the runner writes
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS jobs (
+                    id TEXT PRIMARY KEY,
+                    kind TEXT NOT NULL,
+                    payload TEXT NOT NULL,
+                    status TEXT NOT NULL,
+                    stage TEXT,
+                    progress REAL NOT NULL DEFAULT 0,
+                    result TEXT,
+                    error TEXT,
+                    runner_id TEXT,
+                    created_at REAL NOT NULL,
+                    started_at REAL,
+                    finished_at REAL
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs(status, created_at)")
+            conn.execute("CREATE TABLE IF NOT EXISTS state (key TEXT PRIMARY KEY, value TEXT NOT NULL, updated_at REAL NOT NULL)")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS events (
+                    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                    type TEXT NOT NULL,
+                    data TEXT NOT NULL,
+                    created_at REAL NOT NULL
+                )
+            """)
+            # Event cursors carry this id, so they stay valid across API workers but not across control stores
+            conn.execute("INSERT OR IGNORE INTO state (key, value, updated_at) VALUES ('stream_id', ?, ?)",
+                         (json.dumps(uuid.uuid4().hex[:8]), time.time()))
+        finally:
+            conn.close()
+        self._schema_ready = True
+
+    def submit_job(self, kind: str, payload: Dict[str, Any]) -> Dict[str, Any]:
+        """Queue a command for the runner and return it as a job"""
+        job_id = str(uuid.uuid4())
+        conn = self._connect()
+        try:
+            conn.execute(
+                "INSERT INTO jobs (id, kind, payload, status, created_at) VALUES (?, ?, ?, 'queued', ?)",
+                (job_id, kind, json.dumps(payload), time.time())
+            )
+        finally:
+            conn.close()
+        logger.info(f"Queued {kind} job {job_id}")
+        return self.get_job(job_id)
+
+    def submit_unique(self, kind: str, payload: Dict[str, Any]) -> Dict[str, Any]:
+        """Queue a command unless a job of its kind is already queued or running, in which case that job is
+        returned. The check and the insert share one transaction, so concurrent API workers queue one job."""
+        job_id = str(uuid.uuid4())
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            row = conn.execute(
+                "SELECT id FROM jobs WHERE status IN ('queued', 'running') AND kind = ? ORDER BY created_at LIMIT 1",
+                (kind,)
+            ).fetchone()
+            if row is None:
+                conn.execute(
+                    "INSERT INTO jobs (id, kind, payload, status, created_at) VALUES (?, ?, ?, 'queued', ?)",
+                    (job_id, kind, json.dumps(payload), time.time())
+                )
+            conn.execute("COMMIT")
+        except Exception:
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
+        if row is not None:
+            return self.get_job(row["id"])
+        logger.info(f"Queued {kind} job {job_id}")
+        return self.get_job(job_id)
+
+    def claim_job(self, runner_id: str) -> Optional[Tuple[Dict[str, Any], Dict[str, Any]]]:
+        """Mark the oldest queued job as running. Returns the job and its payload."""
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            row = conn.execute("SELECT * FROM jobs WHERE status = 'queued' ORDER BY created_at LIMIT 1").fetchone()
+            if row is None:
+                conn.execute("COMMIT")
+                return None
+            conn.execute(
+                "UPDATE jobs SET status = 'running', runner_id = ?, started_at = ? WHERE id = ?",
+                (runner_id, time.time(), row["id"])
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
+        return self.get_job(row["id"]), json.loads(row["payload"])
+
+    def update_job(self, job_id: str, **fields) -> Optional[Dict[str, Any]]:
+        """Set job fields (status, stage, progress, result, error, finished_at) and return the job"""
+        if "result" in fields:
+            fields["result"] = json.dumps(fields["result"])
+        conn = self._connect()
+        try:
+            conn.execute(
+                f"UPDATE jobs SET {', '.join(f'{name} = ?' for name in fields)} WHERE id = ?",
+                list(fields.values()) + [job_id]
+            )
+        finally:
+            conn.close()
+        return self.get_job(job_id)
+
+    def get_job(self, job_id: str) -> Optional[Dict[str, Any]]:
+        conn = self._connect()
+        try:
+            row = conn.execute(f"SELECT {', '.join(JOB_COLUMNS)} FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        finally:
+            conn.close()
+        return self._row_to_job(row) if row else None
+
+    def active_job(self, kind: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """The oldest queued or running job of a kind, if any"""
+        conn = self._connect()
+        try:
+            row = conn.execute(
+                f"SELECT {', '.join(JOB_COLUMNS)} FROM jobs WHERE status IN ('queued', 'running') "
+                "AND (? IS NULL OR kind = ?) ORDER BY created_at LIMIT 1",
+                (kind, kind)
+            ).fetchone()
+        finally:
+            conn.close()
+        return self._row_to_job(row) if row else None
+
+    def fail_interrupted_jobs(self, runner_id: str):
+        """Fail jobs left running by an earlier runner that died; they may have stopped halfway"""
+        conn = self._connect()
+        try:
+            cursor = conn.execute(
+                "UPDATE jobs SET status = 'failed', error = 'Runner stopped before the job finished', finished_at = ? "
+                "WHERE status = 'running' AND runner_id != ?",
+                (time.time(), runner_id)
+            )
+            if cursor.rowcount:
+                logger.warning(f"Failed {cursor.rowcount} jobs interrupted by a runner restart")
+        finally:
+            conn.close()
+
+    def set_state(self, key: str, value: Any):
+        conn = self._connect()
+        try:
+            conn.execute(
+                "INSERT INTO state (key, value, updated_at) VALUES (?, ?, ?) "
+                "ON CONFLICT(key) DO UPDATE SET value = excluded.value, updated_at = excluded.updated_at",
+                (key, json.dumps(value), time.time())
+            )
+        finally:
+            conn.close()
+
+    def get_state(self, key: str) -> Optional[Any]:
+        conn = self._connect()
+        try:
+            row = conn.execute("SELECT value FROM state WHERE key = ?", (key,)).fetchone()
+        finally:
+            conn.close()
+        return json.loads(row["value"]) if row else None
+
+    def stream_id(self) -> str:
+        return self.get_state("stream_id")
+
+    def append_event(self, event_type: str, data: Dict[str, Any]) -> int:
+        """Store an event for the API workers; only the latest EVENT_STREAM_BUFFER_SIZE are kept"""
+        conn = self._connect()
+        try:
+            seq = conn.execute(
+                "INSERT INTO events (type, data, created_at) VALUES (?, ?, ?)",
+                (event_type, json.dumps(data), time.time())
+            ).lastrowid
+            conn.execute("DELETE FROM events WHERE seq <= ?", (seq - config.EVENT_STREAM_BUFFER_SIZE,))
+        finally:
+            conn.close()
+        return seq
+
+    def events_since(self, seq: int, limit: int = config.EVENT_STREAM_BUFFER_SIZE) -> List[Tuple[int, str, Dict[str, Any]]]:
+        """Events numbered after seq, oldest first, as (number, type, data)"""
+        conn = self._connect()
+        try:
+            rows = conn.execute(
+                "SELECT seq, type, data FROM events WHERE seq > ? ORDER BY seq LIMIT ?", (seq, limit)
+            ).fetchall()
+        finally:
+            conn.close()
+        return [(row["seq"], row["type"], json.loads(row["data"])) for row in rows]
+
+    def _row_to_job(self, row: sqlite3.Row) -> Dict[str, Any]:
+        job = dict(row)
+        job["result"] = json.loads(job["result"]) if job["result"] else None
+        return job
+
+class ControlFollower:
+    """Keeps an API worker in step with the orchestration process: the vector store reads the runner's
+    current run, and the runner's events are mirrored into the worker's event stream."""
+
+    def __init__(self, store: ControlStore, events=graph_events, vector_store=vector_store_client,
+                 poll_seconds: float = config.CONTROL_POLL_SECONDS):
+        self.store = store
+        self.events = events
+        self.vector_store = vector_store
+        self.poll_seconds = poll_seconds
+        self._seq = 0
+        self._thread = None
+        self._stop = threading.Event()
+
+    def start(self) -> threading.Thread:
+        """Catch up once, then keep following in a daemon thread"""
+        self.poll()
+        self._thread = threading.Thread(target=self._follow_loop, daemon=True, name="control-follower")
+        self._thread.start()
+        return self._thread
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def poll(self):
+        """Follow the runner's run and mirror the events it published since the last poll"""
+        status = self.store.get_state("status")
+        # Before the runner first reports, the store reads the empty shared collection
+        self.vector_store.follow_run(status["run"] if status else config.COLLECTION_NAME)
+        stream_id = self.store.stream_id()
+        for seq, event_type, data in self.store.events_since(self._seq):
+            self.events.mirror(stream_id, seq, event_type, data)
+            self._seq = seq
+
+    def _follow_loop(self):
+        while not self._stop.wait(self.poll_seconds):
+            try:
+                self.poll()
+            except Exception as e:
+                logger.error(f"Error following control store: {e}")
+
+def runner_status(store: ControlStore) -> Dict[str, Any]:
+    """The orchestration process's latest status, with whether it is still reporting"""
+    status = store.get_state("status") or {}
+    status["runner_alive"] = time.time() - status.get("updated_at", 0) < config.RUNNER_STALE_SECONDS
+    return status
+
+# Global instance
+control_store = ControlStore()
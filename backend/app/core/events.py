@@ -0,0 +1,179 @@
+# Graph and run events pushed to browsers over Server-Sent Events.
+import asyncio
+import json
+import threading
+import uuid
+from collections import deque
+from typing import Optional, List, Dict, Any, Tuple
+from ..db.vector_store import vector_store_client
+from .. import config
+import logging
+
+logger = logging.getLogger(__name__)
+
+class GraphEventStream:
+    """Recent graph and run events, numbered so a reconnecting client resumes where it left off.
+
+    Node events come from the graph store's change feed, read once per written batch and shared by every
+    connected client, so the work follows the rate of change rather than viewers times graph size.
+    A cursor is the stream id and an event number; a cursor from another server process, or one older than
+    the buffered events, gets a reset event telling the client to reload the graph.
+    """
+
+    def __init__(self, store=None, max_events: int = config.EVENT_STREAM_BUFFER_SIZE):
+        self.store = store
+        self.stream_id = uuid.uuid4().hex[:8]
+        self._events = deque(maxlen=max_events)  # (number, type, data)
+        self._seq = 0
+        self._run = None
+        self._graph_version = None  # Set once the stream follows the graph store
+        self._lock = threading.RLock()
+        self._waiters = set()  # (event loop, asyncio.Event) of clients waiting for the next event
+        self._listeners = []  # Called with the type and data of every published event
+
+    @property
+    def run(self) -> Optional[str]:
+        """Run whose node changes the stream publishes"""
+        return self._run
+
+    def attach(self):
+        """Start following the graph store's change feed. Changes from before are left to the graph snapshot."""
+        with self._lock:
+            if self._graph_version is not None:
+                return
+            self._run = self.store.run
+            # Batches still in the write queue get later versions, so none of them is missed
+            self._graph_version = self.store.graph.get_version()
+            self.store.add_change_listener(self._on_graph_change)
+            logger.info(f"Event stream following run {self._run} from graph version {self._graph_version}")
+
+    def add_listener(self, listener):
+        """Call listener(type, data) for every published event, e.g. to hand it to other processes"""
+        self._listeners.append(listener)
+
+    def publish(self, event_type: str, data: Dict[str, Any]) -> str:
+        """Add an event for every connected client. Returns its cursor."""
+        with self._lock:
+            self._seq += 1
+            self._events.append((self._seq, event_type, data))
+            waiters = list(self._waiters)
+            cursor = self._cursor(self._seq)
+        self._wake(waiters)
+        for listener in self._listeners:
+            try:
+                listener(event_type, data)
+            except Exception as e:
+                logger.error(f"Error in event listener: {e}")
+        return cursor
+
+    def mirror(self, stream_id: str, seq: int, event_type: str, data: Dict[str, Any]):
+        """Add an event numbered by another process's stream. API workers mirror the orchestration process's
+        events this way, so a cursor from one worker is valid on all of them."""
+        with self._lock:
+            if stream_id != self.stream_id:
+                self.stream_id = stream_id
+                self._events.clear()
+            elif seq <= self._seq:
+                return
+            self._seq = seq
+            self._events.append((seq, event_type, data))
+            waiters = list(self._waiters)
+        self._wake(waiters)
+
+    def cursor(self) -> str:
+        """Cursor of the latest event"""
+        with self._lock:
+            return self._cursor(self._seq)
+
+    def events_since(self, cursor: Optional[str]) -> Tuple[List[Dict[str, Any]], bool]:
+        """Events after cursor, and whether the client has to reload the graph instead"""
+        seq = self._parse_cursor(cursor)
+        with self._lock:
+            oldest = self._events[0][0] if self._events else self._seq + 1
+            if seq is None or seq > self._seq or seq < oldest - 1:
+                return [], True
+            return [
+                {"cursor": self._cursor(number), "type": event_type, "data": data}
+                for number, event_type, data in self._events if number > seq
+            ], False
+
+    async def wait_async(self, cursor: str, timeout: float):
+        """Wait until there are events after cursor, or timeout seconds have passed"""
+        waiter = (asyncio.get_running_loop(), asyncio.Event())
+        with self._lock:
+            seq = self._parse_cursor(cursor)
+            if seq is None or seq != self._seq:
+                return
+            self._waiters.add(waiter)
+        try:
+            await asyncio.wait_for(waiter[1].wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+        finally:
+            with self._lock:
+                self._waiters.discard(waiter)
+
+    def _on_graph_change(self, run: str):
+        """Publish the nodes the writer thread just stored, or a reset when the store switched runs"""
+        with self._lock:
+            if run != self.store.collection_name:
+                return  # A batch of a run that was replaced while it waited in the queue
+            if run != self._run:
+                self._run = run
+                self.publish("reset", {"run": run})
+            changes = self.store.graph.changes_since(run, self._graph_version)
+            self._graph_version = changes["version"]
+            pruned = [n for n in changes["updated"] if n.is_pruned]
+            updated = [n for n in changes["updated"] if not n.is_pruned]
+            for event_type, nodes in (("node-added", changes["inserted"]), ("node-updated", updated),
+                                      ("pruned", pruned)):
+                if nodes:
+                    self.publish(event_type, {
+                        "run": run,
+                        "version": changes["version"],
+                        "nodes": [n.dict(exclude={'embedding'}) for n in nodes]
+                    })
+
+    def _wake(self, waiters):
+        for loop, event in waiters:
+            loop.call_soon_threadsafe(event.set)
+
+    def _cursor(self, seq: int) -> str:
+        return f"{self.stream_id}-{seq}"
+
+    def _parse_cursor(self, cursor: Optional[str]) -> Optional[int]:
+        if not cursor:
+            return None
+        stream_id, _, seq = cursor.rpartition("-")
+        if stream_id != self.stream_id or not seq.isdigit():
+            return None
+        return int(seq)
+
+def sse_message(event: Dict[str, Any]) -> str:
+    """One Server-Sent Events message; the browser sends the id back as Last-Event-ID when it reconnects"""
+    return f"id: {event['cursor']}\nevent: {event['type']}\ndata: {json.dumps(event['data'])}\n\n"
+
+async def sse_events(stream: GraphEventStream, cursor: Optional[str], is_disconnected):
+    """Yield the events after cursor as SSE messages until the client disconnects.
+    A client without a usable cursor first gets a reset event carrying the current cursor."""
+    _, reset = stream.events_since(cursor)
+    if reset:
+        cursor = stream.cursor()
+        yield sse_message({"cursor": cursor, "type": "reset", "data": {"run": stream.run}})
+    while not await is_disconnected():
+        events, reset = stream.events_since(cursor)
+        if reset:
+            # Fell behind the buffer while the stream was open
+            cursor = stream.cursor()
+            yield sse_message({"cursor": cursor, "type": "reset", "data": {"run": stream.run}})
+            continue
+        for event in events:
+            cursor = event["cursor"]
+            yield sse_message(event)
+        if not events:
+            await stream.wait_async(cursor, config.EVENT_STREAM_HEARTBEAT_SECONDS)
+            if stream.cursor() == cursor:
+                yield ": keep-alive\n\n"
+
+# Global instance
+graph_events = GraphEventStream(vector_store_client)
@@ -0,0 +1,129 @@
+# Background jobs for work too slow to finish inside an HTTP request, such as archiving a run.
+import functools
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, List, Dict, Any, Callable
+from .events import graph_events
+from .. import config
+import logging
+
+logger = logging.getLogger(__name__)
+
+class JobManager:
+    """Runs jobs one at a time on a worker thread and keeps their status and progress.
+
+    A job function is called as func(progress, *args) and reports with progress(stage, fraction).
+    Every change is published on the event stream as a job event; /api/jobs/{id} returns the same dict.
+    """
+
+    def __init__(self, max_finished: int = config.JOBS_MAX_FINISHED):
+        self.max_finished = max_finished
+        self._jobs: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        # One worker, so archives of consecutive runs never overlap
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="jobs")
+
+    def submit(self, kind: str, func: Callable, *args) -> Dict[str, Any]:
+        """Queue a job and return its status without waiting for it"""
+        with self._lock:
+            job = self._add(kind)
+        return self._start(job, func, args)
+
+    def submit_unique(self, kind: str, func: Callable, *args) -> Dict[str, Any]:
+        """Queue a job unless a job of its kind is already queued or running, in which case that job is
+        returned. The check and the insert hold one lock, so concurrent requests queue one job."""
+        with self._lock:
+            job = self._active(kind)
+            if job is not None:
+                return job
+            job = self._add(kind)
+        return self._start(job, func, args)
+
+    def _add(self, kind: str) -> Dict[str, Any]:
+        """Record a new queued job; called with the lock held"""
+        job = {
+            "id": str(uuid.uuid4()),
+            "kind": kind,
+            "status": "queued",
+            "stage": None,
+            "progress": 0.0,
+            "result": None,
+            "error": None,
+            "created_at": time.time(),
+            "started_at": None,
+            "finished_at": None
+        }
+        self._jobs[job["id"]] = job
+        self._forget_finished()
+        return dict(job)
+
+    def _start(self, job: Dict[str, Any], func: Callable, args) -> Dict[str, Any]:
+        self._publish(job)
+        self._executor.submit(self._run, job["id"], func, args)
+        logger.info(f"Queued {job['kind']} job {job['id']}")
+        return job
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return dict(job) if job else None
+
+    def list_jobs(self) -> List[Dict[str, Any]]:
+        """All known jobs, oldest first"""
+        with self._lock:
+            return [dict(job) for job in self._jobs.values()]
+
+    def active(self, kind: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """The queued or running job of a kind, if any"""
+        with self._lock:
+            return self._active(kind)
+
+    def _active(self, kind: Optional[str]) -> Optional[Dict[str, Any]]:
+        for job in self._jobs.values():
+            if job["status"] in ("queued", "running") and kind in (None, job["kind"]):
+                return dict(job)
+        return None
+
+    def _run(self, job_id: str, func: Callable, args):
+        self._update(job_id, status="running", started_at=time.time())
+        run_job(job_id, func, args, functools.partial(self._update, job_id))
+
+    def _update(self, job_id: str, **fields):
+        with self._lock:
+            job = self._jobs[job_id]
+            job.update(fields)
+            job = dict(job)
+        self._publish(job)
+
+    def _publish(self, job: Dict[str, Any]):
+        try:
+            graph_events.publish("job", job)
+        except Exception as e:
+            logger.error(f"Error publishing job event: {e}")
+
+    def _forget_finished(self):
+        finished = [job_id for job_id, job in self._jobs.items() if job["status"] in ("done", "failed")]
+        for job_id in finished[:max(0, len(finished) - self.max_finished)]:
+            del self._jobs[job_id]
+
+def run_job(job_id: str, func: Callable, args, update: Callable):
+    """Call func(progress, *args), passing its progress and outcome to update(**fields) as job fields"""
+    def progress(stage: str, fraction: Optional[float] = None):
+        fields = {"stage": stage}
+        if fraction is not None:
+            fields["progress"] = round(min(max(fraction, 0.0), 1.0), 3)
+        update(**fields)
+
+    try:
+        result = func(progress, *args)
+        update(status="done", stage="done", progress=1.0, result=result, finished_at=time.time())
+        logger.info(f"Job {job_id} finished")
+    except Exception as e:
+        logger.error(f"Job {job_id} failed: {e}")
+        update(status="failed", error=str(e), finished_at=time.time())
+
+# Global instance
+job_manager = JobManager()
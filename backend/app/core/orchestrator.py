@@ -1,10 +1,21 @@
 # This is the most complex part. It runs the main loop in a background thread.
+import os
 import time
+import random
 import threading
+import uuid
 import logging
+from typing import Optional, Dict, Any
 from .agent import agent
+from .checkpoint import checkpoint_manager
+from .budget import RunBudget
+from .task_queue import task_queue
+from .events import graph_events
 from ..db.vector_store import vector_store_client
 from ..db.data_models import Node
+from ..llm.llm_interface import llm_client
+from ..llm.journal import run_journal
+from .. import config
 
 logger = logging.getLogger(__name__)
 
@@ -14,23 +25,65 @@ class Orchestrator:
         self.current_thread = None
         self.max_depth = 3  # Limit exploration depth
         self.max_nodes = 50  # Limit total nodes
+        self.run_id = None
+        self.hypothesis = None
+        self.seed = None
+        self.cycle_count = 0
+        self.in_flight_tasks = {}  # task id -> node id, queue mode only
+        self.budget = RunBudget()
+        self.stop_reason = None
+        self.best_result = None
+        self._best_node = None
+        self._best_path = []
+        self._score_total = 0.0  # Sum and count of positive scores, for the pruning threshold
+        self._score_count = 0
+        self._wakeup = threading.Event()
 
-    def start_analysis(self, hypothesis: str, max_depth: int = 3, max_nodes: int = 50):
-        """Start the GOT-AI analysis process"""
+    def start_analysis(self, hypothesis: str, max_depth: int = 3, max_nodes: int = 50, seed: Optional[int] = None,
+                       max_seconds: Optional[float] = None, max_tokens: Optional[int] = None,
+                       max_llm_calls: Optional[int] = None, background: bool = True):
+        """Start the GOT-AI analysis process. With background=False the loop runs in the calling thread."""
         if self.is_running:
             logger.warning("Analysis already running")
             return
+        self._wait_for_loop()
             
         # Update limits for this run
         self.max_depth = max_depth
         self.max_nodes = max_nodes
+        self.run_id = str(uuid.uuid4())
+        self.hypothesis = hypothesis
+        self.seed = seed if seed is not None else random.randrange(2**31)
+        self.cycle_count = 0
+        self.in_flight_tasks = {}
+        self.budget = RunBudget(max_seconds, max_tokens, max_llm_calls)
+        self.stop_reason = None
+        self.best_result = None
+        self._best_node = None
+        self._score_total = 0.0
+        self._score_count = 0
+        llm_client.seed = self.seed
+        llm_client.budget = self.budget
         
         logger.info(f"Starting analysis for hypothesis: {hypothesis}")
-        logger.info(f"Max depth: {max_depth}, Max nodes: {max_nodes}")
+        logger.info(f"Max depth: {max_depth}, Max nodes: {max_nodes}, Seed: {self.seed}")
+        logger.info(f"Budgets: {max_seconds}s, {max_tokens} tokens, {max_llm_calls} LLM calls")
         
-        # Clear previous data from ChromaDB
-        vector_store_client.clear_collection()
+        # Each run gets a fresh collection; earlier ones are dropped in the background
+        vector_store_client.use_run_collection(self.run_id)
         
+        if config.JOURNAL_RECORDING_ENABLED and not run_journal.is_replaying:
+            run_journal.start_recording(os.path.join(config.JOURNAL_PATH, f"{self.run_id}.jsonl.gz"), {
+                "run_id": self.run_id,
+                "hypothesis": hypothesis,
+                "max_depth": max_depth,
+                "max_nodes": max_nodes,
+                "seed": self.seed,
+                "max_seconds": max_seconds,
+                "max_tokens": max_tokens,
+                "max_llm_calls": max_llm_calls
+            })
+
         # Create the root node
         root_node = Node(
             text=hypothesis, 
@@ -40,85 +93,222 @@ class Orchestrator:
             depth=0
         )
         vector_store_client.add_node(root_node)
+        self._record_scores([root_node])
+        self._update_best_result([root_node])
         
         # Start the analysis in a background thread
         self.is_running = True
-        self.current_thread = threading.Thread(target=self._run_analysis_loop)
-        self.current_thread.daemon = True
-        self.current_thread.start()
-        
+        self.budget.start()
+        self._save_checkpoint("running")
+        if not background:
+            self._run_analysis_loop()
+            return
+        self._start_thread()
+
         logger.info("Analysis started in background thread")
 
+    def resume_analysis(self, background: bool = True) -> bool:
+        """Resume the analysis from the latest checkpoint. Returns False if there is nothing to resume.
+        With background=False the loop runs in the calling thread."""
+        if self.is_running:
+            logger.warning("Analysis already running")
+            return False
+        self._wait_for_loop()
+
+        state = self.get_resumable_checkpoint()
+        if state is None:
+            logger.info("No resumable checkpoint found")
+            return False
+
+        self.run_id = state["run_id"]
+        self.hypothesis = state["hypothesis"]
+        self.max_depth = state["max_depth"]
+        self.max_nodes = state["max_nodes"]
+        self.seed = state["seed"]
+        self.cycle_count = state["cycle_count"]
+        # Queued expansions survive a restart; their results are collected by the resumed loop
+        self.in_flight_tasks = state.get("in_flight_tasks", {})
+        self.budget = RunBudget.from_dict(state.get("budget", {}))
+        self.stop_reason = None
+        llm_client.seed = self.seed
+        llm_client.budget = self.budget
+
+        logger.info(f"Resuming run {self.run_id} from cycle {self.cycle_count}")
+        vector_store_client.use_run_collection(self.run_id, create=False)
+        if config.VECTOR_BACKEND == "memory":
+            vector_store_client.restore_missing_vectors()
+
+        # Any expansion that reached the store before the crash counts as done
+        self._reconcile_interrupted_expansions()
+        # Rebuild the running totals once; afterwards each cycle only looks at the nodes it adds
+        all_nodes = vector_store_client.get_all_nodes_for_graph()
+        self._best_node = None
+        self._score_total = 0.0
+        self._score_count = 0
+        self._record_scores(all_nodes)
+        self._update_best_result(all_nodes)
+
+        self.is_running = True
+        self.budget.start()
+        self._save_checkpoint("running")
+        if not background:
+            self._run_analysis_loop()
+            return True
+        self._start_thread()
+
+        logger.info("Analysis resumed in background thread")
+        return True
+
+    def get_resumable_checkpoint(self) -> Optional[Dict[str, Any]]:
+        """Return the latest checkpoint if it describes an unfinished run"""
+        state = checkpoint_manager.load_checkpoint()
+        if not state or state.get("status") == "completed":
+            return None
+        return state
+
     def stop_analysis(self):
-        """Stop the analysis process"""
+        """Stop the analysis process. Returns once the loop thread has exited."""
+        was_running = self.is_running
         self.is_running = False
-        if self.current_thread and self.current_thread.is_alive():
-            self.current_thread.join(timeout=5)
+        self._wakeup.set()
+        if was_running and self.stop_reason is None:
+            self.stop_reason = "stopped"
+        self._wait_for_loop()
+        vector_store_client.close()
+        if was_running:
+            self._save_checkpoint("stopped")
         logger.info("Analysis stopped")
 
+    def _wait_for_loop(self):
+        """Wait for the loop thread to exit, however long the LLM call in progress takes. A loop left running
+        would write into the next run and, on its way out, stop that run's budget."""
+        thread = self.current_thread
+        if thread is None or thread is threading.current_thread():
+            return
+        thread.join(timeout=5)
+        while thread.is_alive():
+            logger.info("Waiting for the analysis cycle in progress to finish")
+            thread.join(timeout=5)
+
+    def _start_thread(self):
+        """Launch the analysis loop in a daemon thread"""
+        self._wakeup.clear()
+        self.current_thread = threading.Thread(target=self._run_analysis_loop)
+        self.current_thread.daemon = True
+        self.current_thread.start()
+        
     def _run_analysis_loop(self):
         """Main analysis loop - runs in background thread"""
-        cycle_count = 0
+        completed = False
         
         while self.is_running:
             try:
-                cycle_count += 1
-                logger.info(f"Starting analysis cycle {cycle_count}")
+                reason = self.budget.exhausted_reason()
+                if reason:
+                    logger.info(f"Run budget {reason} exhausted - stopping analysis")
+                    self.stop_reason = reason
+                    completed = True
+                    break
+
+                self.cycle_count += 1
+                logger.info(f"Starting analysis cycle {self.cycle_count}")
                 
-                if not self._run_cycle():
+                more_work = self._run_cycle()
+                # The cycle's buffered node updates are written in one go while the next cycle starts
+                vector_store_client.flush_async()
+                if not more_work:
                     logger.info("No more nodes to explore - analysis complete")
+                    self.stop_reason = self.budget.exhausted_reason() or "frontier_exhausted"
+                    completed = True
                     break
+
+                if self.cycle_count % config.CHECKPOINT_INTERVAL_CYCLES == 0:
+                    self._save_checkpoint("running")
                     
+                total_nodes = vector_store_client.count_nodes()
+                graph_events.publish("cycle", {
+                    "run_id": self.run_id,
+                    "cycle": self.cycle_count,
+                    "total_nodes": total_nodes,
+                    "best_score": self._best_node.cumulative_score if self._best_node else None,
+                    "budget": self.budget.to_dict()
+                })
+
                 # Check limits
-                all_nodes = vector_store_client.get_all_nodes_for_graph()
-                if len(all_nodes) >= self.max_nodes:
+                if total_nodes >= self.max_nodes:
                     logger.info(f"Reached maximum node limit ({self.max_nodes}) - stopping analysis")
+                    self.stop_reason = "max_nodes"
+                    completed = True
                     break
                 
-                # Pause between cycles
-                time.sleep(3)
+                # Pause between cycles, but never past the wall-clock budget.
+                # In queue mode waiting for worker results already paces the loop.
+                if config.EXPANSION_MODE != "queue":
+                    pause = config.CYCLE_PAUSE_SECONDS
+                    remaining = self.budget.remaining_seconds()
+                    if remaining is not None:
+                        pause = min(pause, remaining)
+                    self._wakeup.wait(pause)
                 
             except Exception as e:
                 logger.error(f"Error in analysis cycle: {e}")
+                self.stop_reason = "error"
                 break
+
+        if self.in_flight_tasks:
+            task_queue.cancel_run(self.run_id)
+            self.in_flight_tasks = {}
+            self.budget.clear_reservations()
+
+        try:
+            vector_store_client.close()
+            # Nothing writes until the next run starts, which waits for the reclaimed space
+            vector_store_client.reap_collections_async(compact=True)
+        except Exception as e:
+            logger.error(f"Error flushing vector store: {e}")
         
+        self.budget.stop()
+        if completed:
+            self._save_checkpoint("completed")
+        if run_journal.is_recording:
+            run_journal.close()
         self.is_running = False
-        logger.info(f"Analysis completed after {cycle_count} cycles")
+        graph_events.publish("run-finished", {
+            "run_id": self.run_id,
+            "stop_reason": self.stop_reason,
+            "cycle_count": self.cycle_count,
+            "best_trajectory": self.best_result
+        })
+        logger.info(f"Analysis completed after {self.cycle_count} cycles")
 
     def _run_cycle(self) -> bool:
         """Run a single analysis cycle. Returns False if no more work to do."""
         try:
-            # Get all nodes from DB to find the best one to expand
-            all_nodes = vector_store_client.get_all_nodes_for_graph()
-            
-            # Filter for open nodes (not fully explored, not pruned, within depth limit)
-            open_nodes = [
-                n for n in all_nodes 
-                if not n.is_fully_explored 
-                and not n.is_pruned 
-                and n.depth < self.max_depth
-            ]
+            # Only open nodes are read (not fully explored, not pruned, within depth limit)
+            open_nodes = vector_store_client.get_open_nodes(self.max_depth)
+
+            if config.EXPANSION_MODE == "queue":
+                return self._run_queue_cycle(open_nodes)
 
             if not open_nodes:
                 return False
 
+            # Budget may have run out while the previous cycle finished
+            if not self.budget.can_afford():
+                return False
+
             # Select node with the highest score to explore next (greedy search)
             node_to_explore = max(open_nodes, key=lambda n: n.cumulative_score)
             logger.info(f"Exploring node: {node_to_explore.id} (score: {node_to_explore.score:.2f})")
 
-            # Use an agent to generate new child nodes
-            new_nodes = agent.investigate(node_to_explore)
-
-            # Save new nodes to the database
-            for node in new_nodes:
-                vector_store_client.add_node(node)
+            related = None
+            if config.RETRIEVAL_CONTEXT_ENABLED:
+                # One kNN query covers every frontier node that wasn't looked up before
+                related = vector_store_client.get_related_context(open_nodes)[node_to_explore.id]
 
-            # Mark the parent node as explored
-            node_to_explore.is_fully_explored = True
-            vector_store_client.add_node(node_to_explore)  # Update in DB
-
-            # Simple pruning: prune trajectories with very low scores
-            self._prune_low_scoring_nodes(all_nodes + new_nodes)
+            # Use an agent to generate new child nodes
+            new_nodes = agent.investigate(node_to_explore, related)
+            new_nodes = self._apply_expansion(node_to_explore, new_nodes)
 
             logger.info(f"Cycle complete: generated {len(new_nodes)} new nodes")
             return True
@@ -127,23 +317,283 @@ class Orchestrator:
             logger.error(f"Error in analysis cycle: {e}")
             return False
 
-    def _prune_low_scoring_nodes(self, all_nodes):
+    def _run_queue_cycle(self, open_nodes) -> bool:
+        """Hand the best open nodes to expansion workers and apply the results that come back"""
+        # Keep up to TASK_QUEUE_MAX_IN_FLIGHT of the highest scoring open nodes queued
+        queued_node_ids = set(self.in_flight_tasks.values())
+        candidates = sorted(
+            (n for n in open_nodes if n.id not in queued_node_ids),
+            key=lambda n: n.cumulative_score,
+            reverse=True
+        )
+        free_slots = config.TASK_QUEUE_MAX_IN_FLIGHT - len(self.in_flight_tasks)
+        candidates = candidates[:max(0, free_slots)]
+        related = {}
+        if config.RETRIEVAL_CONTEXT_ENABLED and candidates:
+            related = vector_store_client.get_related_context(candidates)
+        for index, node in enumerate(candidates):
+            # Each expansion gets its own share of what is left, so the tasks in flight together can't
+            # spend more than the run has. The unused part of a share is given back when the task finishes.
+            share = self.budget.reserve(free_slots - index, min_calls=2)
+            if share is None:
+                break
+            max_tokens, max_llm_calls = share
+            payload = {
+                "node": node.dict(exclude={'embedding'}),
+                "related": related.get(node.id),
+                "seed": self.seed,
+                "max_tokens": max_tokens,
+                "max_llm_calls": max_llm_calls
+            }
+            task_id = task_queue.enqueue(self.run_id, node.id, payload)
+            self.in_flight_tasks[task_id] = node.id
+
+        if not self.in_flight_tasks:
+            return False
+
+        finished = self._wait_for_tasks()
+        if finished is None:
+            # Nobody is expanding nodes; stop now rather than wait out the budget. The run stays resumable.
+            logger.error(f"No expansion worker claimed a task within {config.TASK_QUEUE_CLAIM_TIMEOUT_SECONDS}s "
+                         f"- stopping analysis. Start workers with python -m app.worker and resume the run.")
+            self.stop_reason = "no_workers"
+            self.is_running = False
+            return True
+        open_dict = {n.id: n for n in open_nodes}
+        generated = 0
+
+        for task in finished:
+            node_id = self.in_flight_tasks.pop(task["id"])
+            self.budget.release(task["payload"].get("max_tokens"), task["payload"].get("max_llm_calls"))
+            if task["status"] == "cancelled":
+                # Left over from an earlier stop; the node is still open and will be queued again
+                continue
+
+            node = open_dict.get(node_id) or vector_store_client.get_node_by_id(node_id)
+            if node is None:
+                continue
+
+            if task["status"] == "done":
+                result = task["result"]
+                self.budget.record_call(result["used_tokens"], result["used_llm_calls"])
+                new_nodes = [Node(**data) for data in result["nodes"]]
+            else:
+                # Retries are exhausted; close the node so it isn't queued forever
+                logger.error(f"Expansion of node {node_id} failed: {task['error']}")
+                new_nodes = []
+
+            inserted = self._apply_expansion(node, new_nodes)
+            generated += len(inserted)
+
+        logger.info(f"Cycle complete: {len(finished)} expansions finished, generated {generated} new nodes, "
+                    f"{len(self.in_flight_tasks)} still in flight")
+        return True
+
+    def _wait_for_tasks(self):
+        """Block until at least one in-flight task finishes, the run is stopped or the time budget runs out.
+        Returns None if no worker has claimed any of the tasks within TASK_QUEUE_CLAIM_TIMEOUT_SECONDS."""
+        while self.is_running:
+            task_ids = list(self.in_flight_tasks)
+            finished = task_queue.get_finished(task_ids)
+            if finished:
+                return finished
+            if self.budget.remaining_seconds() == 0:
+                return []
+            waiting_since = task_queue.unclaimed_since(task_ids)
+            if waiting_since is not None and time.time() - waiting_since > config.TASK_QUEUE_CLAIM_TIMEOUT_SECONDS:
+                return None
+            self._wakeup.wait(config.TASK_QUEUE_POLL_SECONDS)
+        return []
+
+    def _apply_expansion(self, node_to_explore, new_nodes):
+        """Store the children of an expanded node and mark it explored. Returns the inserted nodes."""
+        # Save new nodes to the database, merging thoughts that already exist in the graph
+        new_nodes = self._store_new_nodes(new_nodes)
+        self._record_scores(new_nodes)
+
+        # Mark the parent node as explored
+        node_to_explore.is_fully_explored = True
+        vector_store_client.update_node_state([node_to_explore.id], {"is_fully_explored": True})  # Update in DB
+
+        # Simple pruning: prune trajectories with very low scores
+        self._prune_low_scoring_nodes()
+
+        # Publish the best trajectory found so far
+        self._update_best_result(new_nodes)
+        return new_nodes
+
+    def _store_new_nodes(self, new_nodes):
+        """Insert new nodes, merging semantic duplicates into existing nodes. Returns the inserted nodes."""
+        node_dict = {}  # Nodes of this batch and the stored nodes they were merged into
+        inserted = []
+        merged = {}
+        merged_count = 0
+
+        if config.DEDUP_ENABLED:
+            duplicates = vector_store_client.find_duplicates(new_nodes)
+        else:
+            duplicates = [None] * len(new_nodes)
+
+        for node, duplicate in zip(new_nodes, duplicates):
+            if duplicate is None:
+                node_dict[node.id] = node
+                inserted.append(node)
+                continue
+
+            merged_count += 1
+            existing = node_dict.get(duplicate.id, duplicate)
+            if node.parent_id in [existing.id, existing.parent_id] + existing.extra_parent_ids:
+                continue
+            # An edge from a descendant back to its ancestor would turn the DAG into a cycle
+            if self._is_ancestor(existing.id, node.parent_id, node_dict):
+                continue
+
+            existing.extra_parent_ids.append(node.parent_id)
+            node_dict[existing.id] = existing
+            merged[existing.id] = existing
+
+        # One batched embedding pass and one upsert for the new thoughts; merged ones only gain parents
+        vector_store_client.add_nodes(inserted)
+        inserted_ids = {n.id for n in inserted}
+        merged = [n for node_id, n in merged.items() if node_id not in inserted_ids]
+        vector_store_client.update_node_state(
+            [n.id for n in merged],
+            [{"extra_parent_ids": n.extra_parent_ids} for n in merged]
+        )
+
+        if merged_count > 0:
+            logger.info(f"Merged {merged_count} duplicate thoughts into existing nodes")
+        return inserted
+
+    def _is_ancestor(self, candidate_id, node_id, node_dict) -> bool:
+        """Check whether candidate_id can be reached by following parents up from node_id.
+        Nodes missing from node_dict are read from the store."""
+        stack = [node_id]
+        seen = set()
+        while stack:
+            current_id = stack.pop()
+            if current_id == candidate_id:
+                return True
+            if current_id in seen:
+                continue
+            seen.add(current_id)
+            current = node_dict.get(current_id) or vector_store_client.get_node_by_id(current_id)
+            if current is None:
+                continue
+            if current.parent_id:
+                stack.append(current.parent_id)
+            stack.extend(current.extra_parent_ids)
+        return False
+
+    def _reconcile_interrupted_expansions(self):
+        """Mark nodes whose children were persisted before a crash as explored"""
+        try:
+            all_nodes = vector_store_client.get_all_nodes_for_graph()
+            parent_ids = {n.parent_id for n in all_nodes if n.parent_id}
+            parent_ids.update(p for n in all_nodes for p in n.extra_parent_ids)
+
+            reconciled = [n for n in all_nodes if n.id in parent_ids and not n.is_fully_explored]
+            for node in reconciled:
+                node.is_fully_explored = True
+            vector_store_client.update_node_state([n.id for n in reconciled], {"is_fully_explored": True})
+
+            if reconciled:
+                logger.info(f"Marked {len(reconciled)} interrupted expansions as explored")
+        except Exception as e:
+            logger.error(f"Error reconciling interrupted expansions: {e}")
+
+    def _record_scores(self, nodes):
+        """Add the scores of new nodes to the running totals behind the pruning threshold"""
+        for node in nodes:
+            if node.score > 0:
+                self._score_total += node.score
+                self._score_count += 1
+
+    def _update_best_result(self, new_nodes):
+        """Record the highest scoring trajectory so callers can read it at any time.
+        Only the nodes added since the last call need to be passed; scores never change after insertion."""
+        try:
+            candidates = ([self._best_node] if self._best_node else []) + list(new_nodes)
+            if not candidates:
+                return
+            best_node = max(candidates, key=lambda n: n.cumulative_score)
+            if best_node is not self._best_node or self.best_result is None:
+                self._best_node = best_node
+                self._best_path = vector_store_client.get_path(best_node.id) or [best_node]
+            path = self._best_path
+
+            self.best_result = {
+                "cumulative_score": best_node.cumulative_score,
+                "path_length": len(path),
+                "final_insight": best_node.text,
+                "path": [{"id": n.id, "text": n.text, "score": n.score} for n in path],
+                "cycle": self.cycle_count,
+                "elapsed_seconds": self.budget.elapsed_seconds()
+            }
+        except Exception as e:
+            logger.error(f"Error updating best result: {e}")
+
+    def get_best_result(self) -> Dict[str, Any]:
+        """Current best trajectory together with run progress and budget usage"""
+        return {
+            "run_id": self.run_id,
+            "is_running": self.is_running,
+            "stop_reason": self.stop_reason,
+            "cycle_count": self.cycle_count,
+            "budget": self.budget.to_dict(),
+            "best_trajectory": self.best_result
+        }
+
+    def _save_checkpoint(self, status: str):
+        """Persist the orchestrator state so the run can be resumed after a restart.
+        The frontier isn't saved: on resume it is read back from the store, which also holds any
+        expansion that finished after this checkpoint."""
+        try:
+            if (config.VECTOR_BACKEND == "memory" and
+                    (status != "running" or self.cycle_count % config.MEMORY_BACKEND_PERSIST_INTERVAL_CYCLES == 0)):
+                # Writing the run to ChromaDB is what the memory backend saves on, so it is only done now and then.
+                # Vectors added since are restored from the graph store on resume.
+                vector_store_client.persist()
+            else:
+                # Nodes and their state are durable in the graph store once flushed
+                vector_store_client.flush()
+            total_nodes = vector_store_client.count_nodes()
+        except Exception as e:
+            logger.warning(f"Could not persist the run for checkpoint: {e}")
+            total_nodes = 0
+
+        checkpoint_manager.save_checkpoint({
+            "run_id": self.run_id,
+            "status": status,
+            "hypothesis": self.hypothesis,
+            "max_depth": self.max_depth,
+            "max_nodes": self.max_nodes,
+            "seed": self.seed,
+            "cycle_count": self.cycle_count,
+            "in_flight_tasks": self.in_flight_tasks,
+            "total_nodes": total_nodes,
+            "budget": self.budget.to_dict(),
+            "stop_reason": self.stop_reason
+        })
+
+    def _prune_low_scoring_nodes(self):
         """Prune nodes with consistently low scores"""
         try:
-            # Calculate average score
-            scores = [n.score for n in all_nodes if n.score > 0]
-            if not scores:
+            # Average of all positive scores, kept up to date as nodes are added
+            if not self._score_count:
                 return
                 
-            avg_score = sum(scores) / len(scores)
+            avg_score = self._score_total / self._score_count
             threshold = avg_score * 0.5  # Prune nodes scoring less than 50% of average
             
-            pruned_count = 0
-            for node in all_nodes:
-                if not node.is_pruned and node.score < threshold and node.depth > 0:
-                    node.is_pruned = True
-                    vector_store_client.add_node(node)  # Update in DB
-                    pruned_count += 1
+            # Only the nodes that need pruning are read
+            pruned = vector_store_client.get_nodes(where={"$and": [
+                {"is_pruned": False},
+                {"depth": {"$gt": 0}},
+                {"score": {"$lt": threshold}}
+            ]})
+            vector_store_client.update_node_state([n.id for n in pruned], {"is_pruned": True})  # Update in DB
+            pruned_count = len(pruned)
             
             if pruned_count > 0:
                 logger.info(f"Pruned {pruned_count} low-scoring nodes (threshold: {threshold:.2f})")
@@ -0,0 +1,208 @@
+import os
+import json
+import time
+import uuid
+import sqlite3
+from typing import Optional, List, Dict, Any
+from .. import config
+import logging
+
+logger = logging.getLogger(__name__)
+
+class TaskQueue:
+    """Durable SQLite-backed queue of node-expansion tasks shared by the orchestrator and workers"""
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = os.path.abspath(path or config.TASK_QUEUE_PATH)
+        self._schema_ready = False  # Created on first use, so a server in local mode never creates the file
+
+    def _connect(self) -> sqlite3.Connection:
+        """Open a connection in autocommit mode; transactions are started explicitly"""
+        if not self._schema_ready:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            self._create_schema()
+        conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def _create_schema(self):
+        conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        try:
+            # WAL lets workers claim tasks while the orchestrator reads results
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS tasks (
+                    id TEXT PRIMARY KEY,
+                    run_id TEXT NOT NULL,
+                    node_id TEXT NOT NULL,
+                    payload TEXT NOT NULL,
+                    status TEXT NOT NULL,
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    max_attempts INTEGER NOT NULL,
+                    lease_owner TEXT,
+                    lease_expires_at REAL,
+                    result TEXT,
+                    error TEXT,
+                    created_at REAL NOT NULL,
+                    updated_at REAL NOT NULL
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_tasks_status ON tasks(status, created_at)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_tasks_run ON tasks(run_id, status)")
+        finally:
+            conn.close()
+        self._schema_ready = True
+
+    def enqueue(self, run_id: str, node_id: str, payload: Dict[str, Any],
+                max_attempts: int = config.TASK_MAX_ATTEMPTS) -> str:
+        """Add a pending task and return its id"""
+        task_id = str(uuid.uuid4())
+        now = time.time()
+        conn = self._connect()
+        try:
+            conn.execute(
+                "INSERT INTO tasks (id, run_id, node_id, payload, status, max_attempts, created_at, updated_at) "
+                "VALUES (?, ?, ?, ?, 'pending', ?, ?, ?)",
+                (task_id, run_id, node_id, json.dumps(payload), max_attempts, now, now)
+            )
+        finally:
+            conn.close()
+        logger.info(f"Enqueued expansion task {task_id} for node {node_id}")
+        return task_id
+
+    def claim(self, worker_id: str, lease_seconds: float = config.TASK_LEASE_SECONDS) -> Optional[Dict[str, Any]]:
+        """Lease the oldest available task to a worker. Expired leases are handed out again."""
+        now = time.time()
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            # Tasks whose workers died too often are given up on
+            conn.execute(
+                "UPDATE tasks SET status = 'failed', error = 'Lease expired after final attempt', updated_at = ? "
+                "WHERE status = 'leased' AND lease_expires_at < ? AND attempts >= max_attempts",
+                (now, now)
+            )
+            row = conn.execute(
+                "SELECT * FROM tasks WHERE status = 'pending' OR (status = 'leased' AND lease_expires_at < ?) "
+                "ORDER BY created_at LIMIT 1",
+                (now,)
+            ).fetchone()
+            if row is None:
+                conn.execute("COMMIT")
+                return None
+
+            conn.execute(
+                "UPDATE tasks SET status = 'leased', attempts = attempts + 1, lease_owner = ?, "
+                "lease_expires_at = ?, updated_at = ? WHERE id = ?",
+                (worker_id, now + lease_seconds, now, row["id"])
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
+
+        task = self._row_to_task(row)
+        task["attempts"] += 1
+        task["status"] = "leased"
+        task["lease_owner"] = worker_id
+        return task
+
+    def extend_lease(self, task_id: str, worker_id: str, lease_seconds: float = config.TASK_LEASE_SECONDS) -> bool:
+        """Keep a task leased while a worker is still busy with it. Returns False if the lease was lost."""
+        now = time.time()
+        conn = self._connect()
+        try:
+            cursor = conn.execute(
+                "UPDATE tasks SET lease_expires_at = ?, updated_at = ? "
+                "WHERE id = ? AND lease_owner = ? AND status = 'leased'",
+                (now + lease_seconds, now, task_id, worker_id)
+            )
+            return cursor.rowcount > 0
+        finally:
+            conn.close()
+
+    def complete(self, task_id: str, worker_id: str, result: Dict[str, Any]) -> bool:
+        """Store the result of a leased task. Returns False if the worker no longer holds the lease."""
+        conn = self._connect()
+        try:
+            cursor = conn.execute(
+                "UPDATE tasks SET status = 'done', result = ?, error = NULL, updated_at = ? "
+                "WHERE id = ? AND lease_owner = ? AND status = 'leased'",
+                (json.dumps(result), time.time(), task_id, worker_id)
+            )
+            return cursor.rowcount > 0
+        finally:
+            conn.close()
+
+    def fail(self, task_id: str, worker_id: str, error: str) -> bool:
+        """Release a leased task after an error; it is retried until max_attempts is reached"""
+        conn = self._connect()
+        try:
+            cursor = conn.execute(
+                "UPDATE tasks SET status = CASE WHEN attempts < max_attempts THEN 'pending' ELSE 'failed' END, "
+                "lease_owner = NULL, lease_expires_at = NULL, error = ?, updated_at = ? "
+                "WHERE id = ? AND lease_owner = ? AND status = 'leased'",
+                (error, time.time(), task_id, worker_id)
+            )
+            return cursor.rowcount > 0
+        finally:
+            conn.close()
+
+    def get_finished(self, task_ids: List[str]) -> List[Dict[str, Any]]:
+        """Return the tasks among task_ids that are done, failed for good or were cancelled"""
+        if not task_ids:
+            return []
+        conn = self._connect()
+        try:
+            placeholders = ",".join("?" for _ in task_ids)
+            rows = conn.execute(
+                f"SELECT * FROM tasks WHERE id IN ({placeholders}) AND status IN ('done', 'failed', 'cancelled')",
+                list(task_ids)
+            ).fetchall()
+            return [self._row_to_task(row) for row in rows]
+        finally:
+            conn.close()
+
+    def unclaimed_since(self, task_ids: List[str]) -> Optional[float]:
+        """Enqueue time of the oldest of task_ids if no worker has claimed any of them yet, else None"""
+        if not task_ids:
+            return None
+        conn = self._connect()
+        try:
+            placeholders = ",".join("?" for _ in task_ids)
+            row = conn.execute(
+                f"SELECT MIN(created_at) AS oldest, MAX(attempts) AS claims FROM tasks WHERE id IN ({placeholders})",
+                list(task_ids)
+            ).fetchone()
+            if row["oldest"] is None or row["claims"] > 0:
+                return None
+            return row["oldest"]
+        finally:
+            conn.close()
+
+    def cancel_run(self, run_id: str) -> int:
+        """Cancel every unfinished task of a run"""
+        conn = self._connect()
+        try:
+            cursor = conn.execute(
+                "UPDATE tasks SET status = 'cancelled', lease_owner = NULL, lease_expires_at = NULL, updated_at = ? "
+                "WHERE run_id = ? AND status IN ('pending', 'leased')",
+                (time.time(), run_id)
+            )
+            if cursor.rowcount > 0:
+                logger.info(f"Cancelled {cursor.rowcount} unfinished tasks of run {run_id}")
+            return cursor.rowcount
+        finally:
+            conn.close()
+
+    def _row_to_task(self, row: sqlite3.Row) -> Dict[str, Any]:
+        task = dict(row)
+        task["payload"] = json.loads(task["payload"])
+        task["result"] = json.loads(task["result"]) if task["result"] else None
+        return task
+
+# Global instance
+task_queue = TaskQueue()
@@ -1,10 +1,13 @@
 from pydantic import BaseModel, Field
-from typing import Optional, List
+from typing import Optional, List, Dict, Any
 import uuid
+import hashlib
 
 class Node(BaseModel):
     id: str = Field(default_factory=lambda: str(uuid.uuid4()))
     parent_id: Optional[str] = None
+    # Parents of semantically equivalent thoughts merged into this node
+    extra_parent_ids: List[str] = Field(default_factory=list)
     trajectory_id: str
     text: str
     score: float = 0.0
@@ -16,13 +19,53 @@ class Node(BaseModel):
     embedding: Optional[List[float]] = None
 
 class GraphData(BaseModel):
-    nodes: List[Node]
+    # Node fields without the embedding, or only those asked for with fields=
+    nodes: List[Dict[str, Any]]
     links: List[dict]
+    # Run and graph version the nodes belong to; pass the version back as since= to get only later changes
+    run: Optional[str] = None
+    version: Optional[int] = None
+    # Pass back as cursor= for the next page; None on the last page
+    next_cursor: Optional[str] = None
+
+class NodeQuery(BaseModel):
+    """Which nodes, and which of their fields, a graph or archive request asks for"""
+    fields: Optional[List[str]] = None  # Always includes id
+    min_depth: Optional[int] = None
+    max_depth: Optional[int] = None
+    min_score: Optional[float] = None
+    max_score: Optional[float] = None
+    cursor: Optional[str] = None
+    limit: Optional[int] = None
+
+    def where(self) -> Optional[Dict[str, Any]]:
+        """The depth and score filters as a ChromaDB-style where clause"""
+        clauses = []
+        for key, op, value in [("depth", "$gte", self.min_depth), ("depth", "$lte", self.max_depth),
+                               ("score", "$gte", self.min_score), ("score", "$lte", self.max_score)]:
+            if value is not None:
+                clauses.append({key: {op: value}})
+        if not clauses:
+            return None
+        return clauses[0] if len(clauses) == 1 else {"$and": clauses}
+
+    def key(self) -> Optional[str]:
+        """Short digest of the query, for cache keys and ETags; None for a plain request"""
+        parts = [f"{name}={','.join(value) if isinstance(value, list) else value}"
+                 for name, value in self.dict().items() if value is not None]
+        if not parts:
+            return None
+        return hashlib.sha1(";".join(parts).encode('utf-8')).hexdigest()[:12]
 
 class StartRequest(BaseModel):
     hypothesis: str
     max_depth: Optional[int] = 3
     max_nodes: Optional[int] = 50
+    seed: Optional[int] = None
+    # Run budgets; leave out for no limit
+    max_seconds: Optional[float] = Field(None, gt=0)
+    max_tokens: Optional[int] = Field(None, gt=0)
+    max_llm_calls: Optional[int] = Field(None, gt=0)
 
 class StopRequest(BaseModel):
     run_name: str
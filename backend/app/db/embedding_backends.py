@@ -0,0 +1,188 @@
+# Embedding model backends: PyTorch SentenceTransformer, or an exported ONNX Runtime graph for CPU-only servers.
+import os
+import json
+import inspect
+from typing import List, Dict, Union
+import numpy as np
+from .. import config
+import logging
+
+logger = logging.getLogger(__name__)
+
+ONNX_METADATA_FILE = "gotai_onnx.json"
+
+# Used to check an exported graph against the torch model it came from
+ACCURACY_CHECK_SENTENCES = [
+    "Cheap solar power will reshape heavy industry.",
+    "Why is this the case?",
+    "What are the underlying assumptions?",
+    "Electrolysers get cheaper every year, but grid connections take a decade to build.",
+    "A short one.",
+    "Steel makers could move to regions with abundant renewable energy, changing trade flows and jobs."
+]
+
+class OnnxEmbeddingModel:
+    """Sentence embeddings from an ONNX graph exported with export_onnx_model, without torch"""
+
+    def __init__(self, model_dir: str, quantized: bool = False):
+        # Imported here so the torch backend never needs onnxruntime
+        import onnxruntime as ort
+        from tokenizers import Tokenizer
+
+        with open(os.path.join(model_dir, ONNX_METADATA_FILE), 'r', encoding='utf-8') as f:
+            self.metadata = json.load(f)
+        self.model_file = os.path.join(model_dir, "model_int8.onnx" if quantized else "model.onnx")
+
+        self.tokenizer = Tokenizer.from_file(os.path.join(model_dir, "tokenizer.json"))
+        self.tokenizer.enable_truncation(max_length=self.metadata["max_seq_length"])
+        self.tokenizer.enable_padding(pad_id=self.metadata["pad_token_id"], pad_token=self.metadata["pad_token"])
+        self.session = ort.InferenceSession(self.model_file, providers=["CPUExecutionProvider"])
+        logger.info(f"Loaded ONNX embedding model {self.model_file}")
+
+    def get_sentence_embedding_dimension(self) -> int:
+        return self.metadata["dimension"]
+
+    def encode(self, sentences: Union[str, List[str]], batch_size: int = 32, **kwargs) -> np.ndarray:
+        """Embed one sentence or a list of sentences, like SentenceTransformer.encode"""
+        single = isinstance(sentences, str)
+        if single:
+            sentences = [sentences]
+
+        # Batch sentences of similar length together to keep padding small
+        order = np.argsort([-len(s) for s in sentences], kind="stable")
+        embeddings = np.zeros((len(sentences), self.metadata["dimension"]), dtype=np.float32)
+        for start in range(0, len(sentences), batch_size):
+            batch_idx = order[start:start + batch_size]
+            embeddings[batch_idx] = self._encode_batch([sentences[i] for i in batch_idx])
+        return embeddings[0] if single else embeddings
+
+    def _encode_batch(self, sentences: List[str]) -> np.ndarray:
+        encodings = self.tokenizer.encode_batch(sentences)
+        attention_mask = np.array([e.attention_mask for e in encodings], dtype=np.int64)
+        feeds = {
+            "input_ids": np.array([e.ids for e in encodings], dtype=np.int64),
+            "attention_mask": attention_mask
+        }
+        if "token_type_ids" in self.metadata["input_names"]:
+            feeds["token_type_ids"] = np.array([e.type_ids for e in encodings], dtype=np.int64)
+        hidden = self.session.run(None, feeds)[0]
+
+        if self.metadata["pooling"] == "cls":
+            pooled = hidden[:, 0]
+        else:
+            mask = attention_mask[:, :, None].astype(np.float32)
+            pooled = (hidden * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+        if self.metadata["normalize"]:
+            pooled = pooled / np.clip(np.linalg.norm(pooled, axis=1, keepdims=True), 1e-12, None)
+        return pooled
+
+def export_onnx_model(model_name: str, output_dir: str, quantize: bool = True) -> Dict[str, Dict[str, float]]:
+    """Export a SentenceTransformer to ONNX, optionally with an int8 copy, and check both against torch.
+    Returns the accuracy of each exported graph."""
+    import torch
+    from sentence_transformers import SentenceTransformer
+
+    os.makedirs(output_dir, exist_ok=True)
+    st_model = SentenceTransformer(model_name, device="cpu")
+    transformer, pooling = st_model[0], st_model[1]
+    # Newer sentence-transformers releases keep the mode as a string, older ones behind get_pooling_mode_str
+    pooling_mode = getattr(pooling, "pooling_mode", None) or pooling.get_pooling_mode_str()
+    if pooling_mode not in ("mean", "cls"):
+        raise ValueError(f"Unsupported pooling '{pooling_mode}' for ONNX export of {model_name}")
+
+    tokenizer = transformer.tokenizer
+    tokenizer.save_pretrained(output_dir)  # Writes tokenizer.json for the tokenizers library
+    sample = tokenizer(ACCURACY_CHECK_SENTENCES[:2], padding=True, return_tensors="pt")
+    input_names = [name for name in ("input_ids", "attention_mask", "token_type_ids") if name in sample]
+
+    class TransformerOutput(torch.nn.Module):
+        """Expose the token embeddings; pooling happens in numpy"""
+        def __init__(self, model):
+            super().__init__()
+            self.model = model
+
+        def forward(self, *inputs):
+            return self.model(**dict(zip(input_names, inputs)))[0]
+
+    dynamic_axes = {name: {0: "batch", 1: "sequence"} for name in input_names + ["token_embeddings"]}
+    export_kwargs = {}
+    if "dynamo" in inspect.signature(torch.onnx.export).parameters:
+        # The TorchScript exporter is the one that honours dynamic_axes
+        export_kwargs["dynamo"] = False
+    model_file = os.path.join(output_dir, "model.onnx")
+    with torch.no_grad():
+        torch.onnx.export(
+            TransformerOutput(transformer.auto_model.eval()),
+            tuple(sample[name] for name in input_names),
+            model_file,
+            input_names=input_names,
+            output_names=["token_embeddings"],
+            dynamic_axes=dynamic_axes,
+            opset_version=14,
+            **export_kwargs
+        )
+
+    if quantize:
+        from onnxruntime.quantization import quantize_dynamic, QuantType
+        quantize_dynamic(model_file, os.path.join(output_dir, "model_int8.onnx"), weight_type=QuantType.QInt8)
+
+    metadata = {
+        "model_name": model_name,
+        "pooling": pooling_mode,
+        "normalize": any(type(module).__name__ == "Normalize" for module in st_model),
+        "max_seq_length": st_model.max_seq_length,
+        "dimension": st_model.get_sentence_embedding_dimension(),
+        "input_names": input_names,
+        "pad_token": tokenizer.pad_token,
+        "pad_token_id": tokenizer.pad_token_id
+    }
+    with open(os.path.join(output_dir, ONNX_METADATA_FILE), 'w', encoding='utf-8') as f:
+        json.dump(metadata, f, indent=2)
+
+    # Same dimensions and nearly the same vectors as the torch backend, or the export is no good
+    reference = st_model.encode(ACCURACY_CHECK_SENTENCES)
+    accuracy = {}
+    for quantized in ([False, True] if quantize else [False]):
+        onnx_model = OnnxEmbeddingModel(output_dir, quantized=quantized)
+        name = os.path.basename(onnx_model.model_file)
+        accuracy[name] = compare_embeddings(reference, onnx_model.encode(ACCURACY_CHECK_SENTENCES))
+        logger.info(f"Exported {name}: min cosine to torch {accuracy[name]['min_cosine']:.4f}")
+    return accuracy
+
+def compare_embeddings(reference: np.ndarray, candidate: np.ndarray) -> Dict[str, float]:
+    """Cosine similarity between matching rows of two embedding matrices"""
+    reference = np.asarray(reference, dtype=np.float32)
+    candidate = np.asarray(candidate, dtype=np.float32)
+    if reference.shape != candidate.shape:
+        raise ValueError(f"Embedding shapes differ: {reference.shape} vs {candidate.shape}")
+    cosine = (reference * candidate).sum(axis=1) / (
+        np.linalg.norm(reference, axis=1) * np.linalg.norm(candidate, axis=1)
+    )
+    return {"min_cosine": float(cosine.min()), "mean_cosine": float(cosine.mean())}
+
+def onnx_model_dir(model_name: str) -> str:
+    return os.path.join(config.EMBEDDING_ONNX_PATH, model_name.replace("/", "_"))
+
+def embedding_model_id(model_name: str = config.EMBEDDING_MODEL_NAME) -> str:
+    """Name of the model as configured, including backend, for keying cached vectors"""
+    if config.EMBEDDING_BACKEND == "onnx":
+        return f"{model_name}-onnx-int8" if config.EMBEDDING_ONNX_QUANTIZE else f"{model_name}-onnx"
+    return model_name
+
+def load_embedding_model(model_name: str = config.EMBEDDING_MODEL_NAME):
+    """Load the embedding model with the configured backend"""
+    if config.EMBEDDING_BACKEND == "torch":
+        # sentence_transformers pulls in torch, which takes seconds to import
+        from sentence_transformers import SentenceTransformer
+        return SentenceTransformer(model_name)
+
+    if config.EMBEDDING_BACKEND == "onnx":
+        model_dir = onnx_model_dir(model_name)
+        model_file = "model_int8.onnx" if config.EMBEDDING_ONNX_QUANTIZE else "model.onnx"
+        if not os.path.exists(os.path.join(model_dir, model_file)):
+            # Exporting needs torch once; afterwards the server runs without it
+            logger.info(f"No ONNX export of {model_name} found - exporting to {model_dir}")
+            export_onnx_model(model_name, model_dir, quantize=config.EMBEDDING_ONNX_QUANTIZE)
+        return OnnxEmbeddingModel(model_dir, quantized=config.EMBEDDING_ONNX_QUANTIZE)
+
+    raise ValueError(f"Unknown embedding backend: {config.EMBEDDING_BACKEND}")
@@ -0,0 +1,183 @@
+# Persistent cache of text embeddings, shared by everything that embeds node texts.
+import os
+import json
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Optional, List, Dict, Any
+import numpy as np
+from .embedding_backends import embedding_model_id
+from .. import config
+import logging
+
+logger = logging.getLogger(__name__)
+
+INDEX_FORMAT_VERSION = 1
+
+class EmbeddingCache:
+    """Embeddings keyed by a hash of the model name and text.
+
+    Vectors live in a memory-mapped .npy matrix with one row per slot. A second memory-mapped array holds the
+    key stored in each slot, and index.json records which key is in which slot in least-recently-used order.
+    Lookups only reorder the index in memory; the sidecar is rewritten when entries are added or evicted, so a
+    restart may forget the order of recent hits but never loses an entry. Every lookup checks the slot key, so a
+    stale index or another process sharing the directory can only cause misses, never a wrong vector.
+    """
+
+    def __init__(self, path: str = config.EMBEDDING_CACHE_PATH, model_name: str = config.EMBEDDING_MODEL_NAME,
+                 max_entries: int = config.EMBEDDING_CACHE_MAX_ENTRIES, dtype: str = config.EMBEDDING_CACHE_DTYPE):
+        self.model_name = model_name
+        self.max_entries = max_entries
+        self.dtype = np.dtype(dtype)
+        # Each model gets its own files since the vector dimension depends on it
+        self.path = os.path.join(os.path.abspath(path), model_name.replace("/", "_"))
+        self.vectors_file = os.path.join(self.path, "vectors.npy")
+        self.keys_file = os.path.join(self.path, "keys.npy")
+        self.index_file = os.path.join(self.path, "index.json")
+
+        self.hits = 0
+        self.misses = 0
+        self._vectors = None
+        self._keys = None
+        self._index: "OrderedDict[str, int]" = OrderedDict()  # key -> slot, least recently used first
+        self._next_slot = 0
+        self._dirty = False
+        self._loaded = False
+        self._lock = threading.Lock()
+
+    def key_for(self, text: str) -> str:
+        return hashlib.sha1(f"{self.model_name}\0{text}".encode('utf-8')).hexdigest()
+
+    def get_many(self, texts: List[str]) -> List[Optional[np.ndarray]]:
+        """Return the cached vector of each text, or None. float32 rows are zero-copy views of the memmap."""
+        with self._lock:
+            self._load()
+            results = []
+            for text in texts:
+                key = self.key_for(text)
+                slot = self._index.get(key) if self._vectors is not None else None
+                if slot is None or self._keys[slot] != key.encode('ascii'):
+                    self.misses += 1
+                    results.append(None)
+                    continue
+                self._index.move_to_end(key)
+                self.hits += 1
+                row = self._vectors[slot]
+                results.append(row if row.dtype == np.float32 else row.astype(np.float32))
+            return results
+
+    def put_many(self, texts: List[str], embeddings: List[List[float]]):
+        """Store vectors, evicting the least recently used ones when the cache is full"""
+        if not texts:
+            return
+        with self._lock:
+            self._load()
+            if self._vectors is None:
+                self._create(len(embeddings[0]))
+            if self._vectors.shape[1] != len(embeddings[0]):
+                logger.error(f"Embedding cache expects {self._vectors.shape[1]} dimensions, got {len(embeddings[0])}")
+                return
+            for text, embedding in zip(texts, embeddings):
+                key = self.key_for(text)
+                slot = self._index.pop(key, None)
+                if slot is None:
+                    slot = self._free_slot()
+                # Clear the slot key first so a half-written row is never served
+                self._keys[slot] = b""
+                self._vectors[slot] = np.asarray(embedding, dtype=self.dtype)
+                self._keys[slot] = key.encode('ascii')
+                self._index[key] = slot
+            self._dirty = True
+
+    def flush(self):
+        """Write the vectors to disk and save the index sidecar"""
+        with self._lock:
+            if not self._dirty or self._vectors is None:
+                return
+            try:
+                self._vectors.flush()
+                self._keys.flush()
+                index = {
+                    "version": INDEX_FORMAT_VERSION,
+                    "model": self.model_name,
+                    "dtype": self.dtype.name,
+                    "dim": int(self._vectors.shape[1]),
+                    "capacity": int(self._vectors.shape[0]),
+                    "entries": [[key, slot] for key, slot in self._index.items()]
+                }
+                tmp_file = self.index_file + ".tmp"
+                with open(tmp_file, 'w', encoding='utf-8') as f:
+                    json.dump(index, f)
+                os.replace(tmp_file, self.index_file)
+                self._dirty = False
+                logger.debug(f"Saved embedding cache index with {len(self._index)} entries")
+            except Exception as e:
+                logger.error(f"Error saving embedding cache: {e}")
+
+    def clear(self):
+        """Drop every cached vector"""
+        with self._lock:
+            self._vectors = None
+            self._keys = None
+            self._index = OrderedDict()
+            self._next_slot = 0
+            self._dirty = False
+            self._loaded = False
+            for path in (self.vectors_file, self.keys_file, self.index_file):
+                if os.path.exists(path):
+                    os.remove(path)
+            logger.info(f"Cleared embedding cache at {self.path}")
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "entries": len(self._index),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses
+            }
+
+    def _free_slot(self) -> int:
+        if self._next_slot < self._vectors.shape[0]:
+            self._next_slot += 1
+            return self._next_slot - 1
+        _, slot = self._index.popitem(last=False)
+        return slot
+
+    def _load(self):
+        """Open the memory-mapped files of an existing cache"""
+        if self._loaded:
+            return
+        self._loaded = True
+        if not os.path.exists(self.index_file):
+            return
+        try:
+            with open(self.index_file, 'r', encoding='utf-8') as f:
+                index = json.load(f)
+            if (index.get("version") != INDEX_FORMAT_VERSION or index["dtype"] != self.dtype.name
+                    or index["capacity"] != self.max_entries):
+                logger.info("Embedding cache settings changed - starting a new cache")
+                return
+            self._vectors = np.load(self.vectors_file, mmap_mode='r+')
+            self._keys = np.load(self.keys_file, mmap_mode='r+')
+            self._index = OrderedDict((key, slot) for key, slot in index["entries"])
+            self._next_slot = max(self._index.values(), default=-1) + 1
+            logger.info(f"Loaded embedding cache with {len(self._index)} entries from {self.path}")
+        except Exception as e:
+            logger.error(f"Error loading embedding cache, starting a new one: {e}")
+            self._vectors = None
+            self._keys = None
+            self._index = OrderedDict()
+
+    def _create(self, dim: int):
+        """Create the memory-mapped files once the vector dimension is known"""
+        os.makedirs(self.path, exist_ok=True)
+        self._vectors = np.lib.format.open_memmap(self.vectors_file, mode='w+', dtype=self.dtype,
+                                                  shape=(self.max_entries, dim))
+        self._keys = np.lib.format.open_memmap(self.keys_file, mode='w+', dtype='S40', shape=(self.max_entries,))
+        self._index = OrderedDict()
+        self._next_slot = 0
+        logger.info(f"Created embedding cache for {self.max_entries} vectors at {self.path}")
+
+# Global instance; vectors of the ONNX backends differ slightly from torch, so each backend has its own cache
+embedding_cache = EmbeddingCache(model_name=embedding_model_id())
@@ -0,0 +1,411 @@
+# Graph structure of every run in SQLite. ChromaDB only holds the embeddings, keyed by node id.
+import os
+import sqlite3
+from typing import Optional, List, Dict, Any, Tuple
+from .data_models import Node
+import logging
+
+logger = logging.getLogger(__name__)
+
+NODE_COLUMNS = ["id", "parent_id", "trajectory_id", "text", "score", "cumulative_score",
+                "is_pruned", "is_fully_explored", "depth"]
+
+# ChromaDB where operators and their SQL equivalents
+SQL_OPERATORS = {"$eq": "=", "$ne": "!=", "$gt": ">", "$gte": ">=", "$lt": "<", "$lte": "<="}
+
+class GraphStore:
+    """Nodes and parent edges of each run, with indexes for the frontier, children, paths and top scores.
+
+    Every row belongs to a run, named after the run's ChromaDB collection. A node's primary parent is its
+    parent_id column; the edges table holds the parents of duplicates merged into it. Rows are returned in
+    insertion order, like ChromaDB returns them.
+
+    Each write transaction takes the next graph version, and every node it touches records it, so readers
+    can ask for just the nodes inserted or updated after the version they have seen.
+    """
+
+    def __init__(self, path: str):
+        self.path = os.path.abspath(path)
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        self._create_schema()
+
+    def _connect(self) -> sqlite3.Connection:
+        """Open a connection in autocommit mode; transactions are started explicitly"""
+        conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        # Safe with WAL: a crash can lose the last commits but never corrupt the file
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    def _create_schema(self):
+        conn = self._connect()
+        try:
+            # WAL lets API requests read while the orchestrator writes
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS nodes (
+                    run TEXT NOT NULL,
+                    id TEXT NOT NULL,
+                    parent_id TEXT,
+                    trajectory_id TEXT NOT NULL,
+                    text TEXT NOT NULL,
+                    score REAL NOT NULL,
+                    cumulative_score REAL NOT NULL,
+                    is_pruned INTEGER NOT NULL,
+                    is_fully_explored INTEGER NOT NULL,
+                    depth INTEGER NOT NULL,
+                    version INTEGER NOT NULL DEFAULT 0,
+                    created_version INTEGER NOT NULL DEFAULT 0,
+                    UNIQUE (run, id)
+                )
+            """)
+            # Graph stores created before versioning
+            columns = {row["name"] for row in conn.execute("PRAGMA table_info(nodes)")}
+            for column in ("version", "created_version"):
+                if column not in columns:
+                    conn.execute(f"ALTER TABLE nodes ADD COLUMN {column} INTEGER NOT NULL DEFAULT 0")
+            conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value INTEGER NOT NULL)")
+            conn.execute("INSERT OR IGNORE INTO meta (key, value) VALUES ('version', 0)")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS edges (
+                    run TEXT NOT NULL,
+                    parent_id TEXT NOT NULL,
+                    child_id TEXT NOT NULL,
+                    UNIQUE (run, child_id, parent_id)
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_nodes_parent ON nodes(run, parent_id)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_nodes_depth ON nodes(run, depth)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_nodes_score ON nodes(run, score)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_nodes_cumulative ON nodes(run, cumulative_score)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_nodes_frontier ON nodes(run, is_fully_explored, is_pruned, depth)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_edges_parent ON edges(run, parent_id)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_nodes_version ON nodes(run, version)")
+        finally:
+            conn.close()
+
+    def upsert_nodes(self, run: str, nodes: List[Node]):
+        """Insert or replace nodes in one transaction. A replaced node keeps its place in the insertion order."""
+        if not nodes:
+            return
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            version = self._next_version(conn)
+            conn.executemany(
+                f"INSERT INTO nodes (run, {', '.join(NODE_COLUMNS)}, version, created_version) "
+                f"VALUES (?, {', '.join('?' * len(NODE_COLUMNS))}, ?, ?) "
+                f"ON CONFLICT (run, id) DO UPDATE SET "
+                + ", ".join(f"{c} = excluded.{c}" for c in NODE_COLUMNS[1:] + ["version"]),
+                [(run, *[getattr(n, c) for c in NODE_COLUMNS], version, version) for n in nodes]
+            )
+            conn.executemany("DELETE FROM edges WHERE run = ? AND child_id = ?", [(run, n.id) for n in nodes])
+            conn.executemany(
+                "INSERT OR IGNORE INTO edges (run, parent_id, child_id) VALUES (?, ?, ?)",
+                [(run, parent_id, n.id) for n in nodes for parent_id in n.extra_parent_ids]
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
+
+    def update_nodes(self, run: str, node_ids: List[str], fields: List[Dict[str, Any]]):
+        """Change some columns of stored nodes in one transaction. extra_parent_ids replaces the merged parents."""
+        if not node_ids:
+            return
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            version = self._next_version(conn)
+            for node_id, node_fields in zip(node_ids, fields):
+                columns = {k: v for k, v in node_fields.items() if k != "extra_parent_ids"}
+                for column in columns:
+                    self._check_column(column)
+                columns["version"] = version
+                conn.execute(
+                    f"UPDATE nodes SET {', '.join(f'{c} = ?' for c in columns)} WHERE run = ? AND id = ?",
+                    (*columns.values(), run, node_id)
+                )
+                if "extra_parent_ids" in node_fields:
+                    conn.execute("DELETE FROM edges WHERE run = ? AND child_id = ?", (run, node_id))
+                    conn.executemany(
+                        "INSERT OR IGNORE INTO edges (run, parent_id, child_id) VALUES (?, ?, ?)",
+                        [(run, parent_id, node_id) for parent_id in node_fields["extra_parent_ids"]]
+                    )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
+
+    def get_nodes(self, run: str, ids: Optional[List[str]] = None, where: Optional[Dict[str, Any]] = None,
+                  order_by: Optional[str] = None, limit: Optional[int] = None) -> List[Node]:
+        """Nodes of a run, optionally by id and filtered by a ChromaDB-style where clause"""
+        return [node for _, node in self.get_positioned_nodes(run, ids, where, order_by, limit)]
+
+    def get_positioned_nodes(self, run: str, ids: Optional[List[str]] = None, where: Optional[Dict[str, Any]] = None,
+                             order_by: Optional[str] = None, limit: Optional[int] = None,
+                             also_ids: Optional[List[str]] = None) -> List[Tuple[int, Node]]:
+        """Like get_nodes, with each node's position in the insertion order. The nodes named in also_ids are
+        added whether they match or not, read in the same transaction."""
+        sql = f"SELECT rowid, {', '.join(NODE_COLUMNS)} FROM nodes WHERE run = ?"
+        params: List[Any] = [run]
+        if ids is not None:
+            sql += f" AND id IN ({', '.join('?' * len(ids))})"
+            params.extend(ids)
+        if where:
+            clause, clause_params = self._where_sql(where)
+            sql += f" AND {clause}"
+            params.extend(clause_params)
+        sql += f" ORDER BY {self._order_by_sql(order_by)}, rowid" if order_by else " ORDER BY rowid"
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(limit)
+
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN")
+            rows = conn.execute(sql, params).fetchall() if ids is None or ids else []
+            also_ids = also_ids or []
+            # Stay below SQLite's limit on bound parameters
+            for start in range(0, len(also_ids), 500):
+                chunk = also_ids[start:start + 500]
+                rows += conn.execute(
+                    f"SELECT rowid, {', '.join(NODE_COLUMNS)} FROM nodes WHERE run = ? "
+                    f"AND id IN ({', '.join('?' * len(chunk))})",
+                    (run, *chunk)
+                ).fetchall()
+            nodes = self._rows_to_nodes(conn, run, rows)
+            conn.execute("COMMIT")
+            return [(row["rowid"], node) for row, node in zip(rows, nodes)]
+        finally:
+            conn.close()
+
+    def get_nodes_page(self, run: str, where: Optional[Dict[str, Any]] = None, after: Optional[int] = None,
+                       limit: int = 1000) -> Tuple[List[Node], Optional[int]]:
+        """Up to limit nodes of a run in insertion order, starting after the row position after.
+        Returns the nodes and the position to continue from, or None on the last page."""
+        sql = f"SELECT rowid, {', '.join(NODE_COLUMNS)} FROM nodes WHERE run = ?"
+        params: List[Any] = [run]
+        if where:
+            clause, clause_params = self._where_sql(where)
+            sql += f" AND {clause}"
+            params.extend(clause_params)
+        if after is not None:
+            sql += " AND rowid > ?"
+            params.append(after)
+        # One row more than asked for tells whether another page follows
+        sql += " ORDER BY rowid LIMIT ?"
+        params.append(limit + 1)
+
+        conn = self._connect()
+        try:
+            rows = conn.execute(sql, params).fetchall()
+            more = len(rows) > limit
+            rows = rows[:limit]
+            return self._rows_to_nodes(conn, run, rows), rows[-1]["rowid"] if more else None
+        finally:
+            conn.close()
+
+    def get_children(self, run: str, node_id: str) -> List[Node]:
+        """Nodes with node_id as their primary or a merged parent"""
+        conn = self._connect()
+        try:
+            rows = conn.execute(
+                f"SELECT {', '.join(NODE_COLUMNS)} FROM nodes WHERE run = ? AND (parent_id = ? OR id IN "
+                f"(SELECT child_id FROM edges WHERE run = ? AND parent_id = ?)) ORDER BY rowid",
+                (run, node_id, run, node_id)
+            ).fetchall()
+            return self._rows_to_nodes(conn, run, rows)
+        finally:
+            conn.close()
+
+    def get_path(self, run: str, node_id: str) -> List[Node]:
+        """The node and its primary ancestors, root first"""
+        conn = self._connect()
+        try:
+            rows = conn.execute(
+                f"""
+                WITH RECURSIVE path(node_id, level) AS (
+                    SELECT ?, 0
+                    UNION ALL
+                    SELECT nodes.parent_id, path.level + 1 FROM nodes JOIN path ON nodes.id = path.node_id
+                    WHERE nodes.run = ? AND nodes.parent_id IS NOT NULL AND path.level < 10000
+                )
+                SELECT {', '.join('nodes.' + c for c in NODE_COLUMNS)} FROM path
+                JOIN nodes ON nodes.run = ? AND nodes.id = path.node_id
+                ORDER BY path.level DESC
+                """,
+                (node_id, run, run)
+            ).fetchall()
+            return self._rows_to_nodes(conn, run, rows)
+        finally:
+            conn.close()
+
+    def get_version(self) -> int:
+        """Version of the last write transaction"""
+        conn = self._connect()
+        try:
+            return conn.execute("SELECT value FROM meta WHERE key = 'version'").fetchone()[0]
+        finally:
+            conn.close()
+
+    def changes_since(self, run: str, version: int) -> Dict[str, Any]:
+        """Nodes of a run inserted or updated after version, in the order they were written,
+        and the current version to pass next time"""
+        conn = self._connect()
+        try:
+            # One read transaction, so the version matches the changes exactly
+            conn.execute("BEGIN")
+            current = conn.execute("SELECT value FROM meta WHERE key = 'version'").fetchone()[0]
+            rows = conn.execute(
+                f"SELECT {', '.join(NODE_COLUMNS)}, created_version FROM nodes WHERE run = ? AND version > ? "
+                f"ORDER BY version, rowid",
+                (run, version)
+            ).fetchall()
+            nodes = self._rows_to_nodes(conn, run, rows)
+            conn.execute("COMMIT")
+        finally:
+            conn.close()
+        return {
+            "run": run,
+            "version": current,
+            "inserted": [n for n, row in zip(nodes, rows) if row["created_version"] > version],
+            "updated": [n for n, row in zip(nodes, rows) if row["created_version"] <= version]
+        }
+
+    def count(self, run: str, pending_ids: Optional[List[str]] = None) -> int:
+        """Number of nodes of a run, counting the pending ids that aren't stored yet as well"""
+        pending_ids = pending_ids or []
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN")
+            count = conn.execute("SELECT COUNT(*) FROM nodes WHERE run = ?", (run,)).fetchone()[0]
+            for start in range(0, len(pending_ids), 500):
+                chunk = pending_ids[start:start + 500]
+                stored = conn.execute(
+                    f"SELECT COUNT(*) FROM nodes WHERE run = ? AND id IN ({', '.join('?' * len(chunk))})",
+                    (run, *chunk)
+                ).fetchone()[0]
+                count += len(chunk) - stored
+            conn.execute("COMMIT")
+            return count
+        finally:
+            conn.close()
+
+    def get_stats(self, run: str) -> Dict[str, Any]:
+        """Node count, average score and number of pruned nodes"""
+        conn = self._connect()
+        try:
+            row = conn.execute(
+                "SELECT COUNT(*), COALESCE(AVG(score), 0), COALESCE(SUM(is_pruned), 0) FROM nodes WHERE run = ?",
+                (run,)
+            ).fetchone()
+            return {"total_nodes": row[0], "average_score": row[1], "pruned_nodes": row[2]}
+        finally:
+            conn.close()
+
+    def list_runs(self) -> List[str]:
+        conn = self._connect()
+        try:
+            return [row[0] for row in conn.execute("SELECT DISTINCT run FROM nodes")]
+        finally:
+            conn.close()
+
+    def delete_runs(self, runs: List[str]) -> int:
+        """Delete every row of the given runs. Returns the number of deleted nodes."""
+        if not runs:
+            return 0
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            deleted = conn.executemany("DELETE FROM nodes WHERE run = ?", [(run,) for run in runs]).rowcount
+            conn.executemany("DELETE FROM edges WHERE run = ?", [(run,) for run in runs])
+            conn.execute("COMMIT")
+            return deleted
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
+
+    def checkpoint(self):
+        """Move the WAL into the database file so copying the file alone captures every commit"""
+        conn = self._connect()
+        try:
+            conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        finally:
+            conn.close()
+
+    def vacuum(self):
+        conn = self._connect()
+        try:
+            conn.execute("VACUUM")
+        finally:
+            conn.close()
+
+    def _rows_to_nodes(self, conn: sqlite3.Connection, run: str, rows) -> List[Node]:
+        if not rows:
+            return []
+        ids = [row["id"] for row in rows]
+        extra_parents: Dict[str, List[str]] = {}
+        # Stay below SQLite's limit on bound parameters
+        for start in range(0, len(ids), 500):
+            chunk = ids[start:start + 500]
+            for edge in conn.execute(
+                f"SELECT child_id, parent_id FROM edges WHERE run = ? AND child_id IN ({', '.join('?' * len(chunk))}) "
+                f"ORDER BY rowid",
+                (run, *chunk)
+            ):
+                extra_parents.setdefault(edge["child_id"], []).append(edge["parent_id"])
+        return [
+            Node(**{**{c: row[c] for c in NODE_COLUMNS}, "extra_parent_ids": extra_parents.get(row["id"], [])})
+            for row in rows
+        ]
+
+    def _next_version(self, conn: sqlite3.Connection) -> int:
+        conn.execute("UPDATE meta SET value = value + 1 WHERE key = 'version'")
+        return conn.execute("SELECT value FROM meta WHERE key = 'version'").fetchone()[0]
+
+    def _check_column(self, column: str):
+        if column not in NODE_COLUMNS:
+            raise ValueError(f"Unknown node column: {column}")
+
+    def order_terms(self, order_by: str) -> List[Tuple[str, bool]]:
+        """The node columns of an order, each optionally followed by ASC or DESC, as (column, descending)"""
+        terms = []
+        for term in order_by.split(","):
+            parts = term.split()
+            if not parts or len(parts) > 2 or (len(parts) == 2 and parts[1].upper() not in ("ASC", "DESC")):
+                raise ValueError(f"Invalid node order: {order_by}")
+            self._check_column(parts[0])
+            terms.append((parts[0], len(parts) == 2 and parts[1].upper() == "DESC"))
+        return terms
+
+    def _order_by_sql(self, order_by: str) -> str:
+        return ", ".join(f"{column} {'DESC' if descending else 'ASC'}" for column, descending in self.order_terms(order_by))
+
+    def _where_sql(self, where: Dict[str, Any]):
+        """Translate a ChromaDB where clause into SQL and its parameters"""
+        clauses, params = [], []
+        for key, condition in where.items():
+            if key in ("$and", "$or"):
+                parts = [self._where_sql(clause) for clause in condition]
+                joiner = " AND " if key == "$and" else " OR "
+                clauses.append("(" + joiner.join(part for part, _ in parts) + ")")
+                params.extend(p for _, part_params in parts for p in part_params)
+                continue
+            self._check_column(key)
+            operators = condition if isinstance(condition, dict) else {"$eq": condition}
+            for op, operand in operators.items():
+                if op in ("$in", "$nin"):
+                    negate = "NOT " if op == "$nin" else ""
+                    clauses.append(f"{key} {negate}IN ({', '.join('?' * len(operand))})")
+                    params.extend(operand)
+                else:
+                    clauses.append(f"{key} {SQL_OPERATORS[op]} ?")
+                    params.append(operand)
+        return " AND ".join(clauses) or "1", params
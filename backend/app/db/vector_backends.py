@@ -0,0 +1,285 @@
+# Storage backends behind VectorStore. Results use the same dict layout as ChromaDB collections.
+import threading
+from abc import ABC, abstractmethod
+from typing import Optional, List, Dict, Any, Sequence
+import numpy as np
+from .. import config
+import logging
+
+logger = logging.getLogger(__name__)
+
+class VectorBackend(ABC):
+    """The collection operations VectorStore relies on"""
+
+    @abstractmethod
+    def upsert(self, ids: List[str], embeddings: List[List[float]], metadatas: Optional[List[Dict[str, Any]]] = None):
+        """Insert or replace entries"""
+
+    @abstractmethod
+    def update(self, ids: List[str], metadatas: List[Dict[str, Any]]):
+        """Merge metadata keys into existing entries, leaving their embeddings alone"""
+
+    @abstractmethod
+    def get(self, ids: Optional[List[str]] = None, include: Sequence[str] = ("metadatas",),
+            where: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """Entries by id, or all entries, optionally filtered by a ChromaDB where clause on the metadata"""
+
+    @abstractmethod
+    def query(self, query_embeddings: List[List[float]], n_results: int = 10,
+              include: Sequence[str] = ("metadatas", "distances")) -> Dict[str, Any]:
+        """Nearest entries for each query embedding"""
+
+    @abstractmethod
+    def count(self) -> int:
+        """Number of entries"""
+
+    def persist(self):
+        """Make all writes durable. Backends that write through do nothing."""
+
+    def distances(self, query_embeddings: List[List[float]], embeddings: List[List[float]]) -> np.ndarray:
+        """Distance from each query to each embedding, measured as query measures it. Cosine by default."""
+        queries = np.asarray(query_embeddings, dtype=np.float32)
+        vectors = np.asarray(embeddings, dtype=np.float32)
+        queries = queries / np.clip(np.linalg.norm(queries, axis=1, keepdims=True), 1e-12, None)
+        vectors = vectors / np.clip(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12, None)
+        return 1.0 - queries @ vectors.T
+
+class ChromaBackend(VectorBackend):
+    """Every write goes straight to a persistent ChromaDB collection"""
+
+    def __init__(self, collection):
+        self.collection = collection
+
+    def upsert(self, ids, embeddings, metadatas=None):
+        self.collection.upsert(ids=ids, embeddings=embeddings, metadatas=metadatas)
+
+    def update(self, ids, metadatas):
+        self.collection.update(ids=ids, metadatas=metadatas)
+
+    def get(self, ids=None, include=("metadatas",), where=None):
+        return self.collection.get(ids=ids, include=list(include), where=where)
+
+    def query(self, query_embeddings, n_results=10, include=("metadatas", "distances")):
+        return self.collection.query(query_embeddings=query_embeddings, n_results=n_results, include=list(include))
+
+    def count(self):
+        return self.collection.count()
+
+    def distances(self, query_embeddings, embeddings):
+        # ChromaDB collections measure squared L2 distances unless created with another hnsw:space
+        space = (self.collection.metadata or {}).get("hnsw:space", "l2")
+        if space == "cosine":
+            return super().distances(query_embeddings, embeddings)
+        queries = np.asarray(query_embeddings, dtype=np.float32)
+        vectors = np.asarray(embeddings, dtype=np.float32)
+        if space == "ip":
+            return 1.0 - queries @ vectors.T
+        squared = (queries ** 2).sum(axis=1)[:, None] + (vectors ** 2).sum(axis=1)[None, :] - 2 * queries @ vectors.T
+        return np.maximum(squared, 0.0)
+
+class InMemoryBackend(VectorBackend):
+    """Keeps the run in a NumPy matrix searched by brute-force cosine similarity.
+
+    Writes stay in memory until persist(), which upserts the changed entries into a ChromaDB collection.
+    The collection's contents are loaded on first use, so a resumed run starts from its last persisted state.
+    Above MEMORY_BACKEND_HNSW_THRESHOLD entries queries go through an hnswlib index instead.
+    Distances are cosine distances.
+    """
+
+    def __init__(self, collection=None):
+        self.collection = collection
+        self._ids: List[str] = []
+        self._rows: Dict[str, int] = {}
+        self._metadatas: List[Dict[str, Any]] = []
+        self._vectors = None  # Unit-length rows; capacity grows by doubling
+        self._raw = None  # Embeddings as given, returned by get and query
+        self._dirty = set()
+        self._hnsw = None
+        self._hnsw_available = True
+        self._loaded = collection is None
+        self._lock = threading.RLock()
+
+    def upsert(self, ids, embeddings, metadatas=None):
+        with self._lock:
+            self._load()
+            if metadatas is None:
+                metadatas = [{}] * len(ids)
+            for node_id, embedding, metadata in zip(ids, embeddings, metadatas):
+                row = self._rows.get(node_id)
+                if row is None:
+                    row = len(self._ids)
+                    self._ensure_capacity(row + 1, len(embedding))
+                    self._ids.append(node_id)
+                    self._metadatas.append({})
+                    self._rows[node_id] = row
+                vector = np.asarray(embedding, dtype=np.float32)
+                self._raw[row] = vector
+                self._vectors[row] = vector / max(float(np.linalg.norm(vector)), 1e-12)
+                self._metadatas[row] = dict(metadata)
+                self._dirty.add(node_id)
+                if self._hnsw is not None:
+                    self._hnsw.add_items(self._vectors[row:row + 1], [row])
+
+    def update(self, ids, metadatas):
+        with self._lock:
+            self._load()
+            for node_id, metadata in zip(ids, metadatas):
+                row = self._rows.get(node_id)
+                if row is None:
+                    logger.warning(f"Cannot update unknown node {node_id}")
+                    continue
+                self._metadatas[row].update(metadata)
+                self._dirty.add(node_id)
+
+    def get(self, ids=None, include=("metadatas",), where=None):
+        with self._lock:
+            self._load()
+            if ids is None:
+                rows = list(range(len(self._ids)))
+            else:
+                rows = [self._rows[i] for i in ids if i in self._rows]
+            if where:
+                rows = [r for r in rows if metadata_matches(self._metadatas[r], where)]
+            return self._result(rows, include)
+
+    def query(self, query_embeddings, n_results=10, include=("metadatas", "distances")):
+        with self._lock:
+            self._load()
+            size = len(self._ids)
+            queries = np.asarray(query_embeddings, dtype=np.float32).reshape(len(query_embeddings), -1)
+            queries = queries / np.clip(np.linalg.norm(queries, axis=1, keepdims=True), 1e-12, None)
+            k = min(n_results, size)
+
+            if k == 0:
+                labels = np.zeros((len(queries), 0), dtype=np.int64)
+                distances = np.zeros((len(queries), 0), dtype=np.float32)
+            elif self._use_hnsw():
+                self._hnsw.set_ef(max(50, k))
+                labels, distances = self._hnsw.knn_query(queries, k=k)
+            else:
+                similarities = queries @ self._vectors[:size].T
+                labels = np.argpartition(-similarities, k - 1, axis=1)[:, :k]
+                top = np.take_along_axis(similarities, labels, axis=1)
+                order = np.argsort(-top, axis=1)
+                labels = np.take_along_axis(labels, order, axis=1)
+                distances = 1.0 - np.take_along_axis(top, order, axis=1)
+
+            results = {key: [] for key in ["ids", "metadatas", "embeddings"] if key == "ids" or key in include}
+            for row_labels in labels:
+                result = self._result([int(r) for r in row_labels], include)
+                for key in results:
+                    results[key].append(result[key])
+            if "distances" in include:
+                results["distances"] = [[float(d) for d in row] for row in distances]
+            return results
+
+    def count(self):
+        with self._lock:
+            self._load()
+            return len(self._ids)
+
+    def persist(self):
+        """Upsert everything changed since the last persist into the ChromaDB collection"""
+        with self._lock:
+            if self.collection is None or not self._dirty:
+                return
+            rows = [self._rows[node_id] for node_id in self._dirty]
+            # Chroma limits the size of a single write
+            for start in range(0, len(rows), config.MEMORY_BACKEND_PERSIST_BATCH_SIZE):
+                batch = rows[start:start + config.MEMORY_BACKEND_PERSIST_BATCH_SIZE]
+                self.collection.upsert(
+                    ids=[self._ids[r] for r in batch],
+                    embeddings=[self._raw[r].tolist() for r in batch],
+                    # Chroma rejects empty metadata dicts but accepts None
+                    metadatas=[self._metadatas[r] or None for r in batch]
+                )
+            logger.info(f"Persisted {len(rows)} changed nodes to ChromaDB")
+            self._dirty.clear()
+
+    def _result(self, rows: List[int], include: Sequence[str]) -> Dict[str, Any]:
+        result = {"ids": [self._ids[r] for r in rows]}
+        if "metadatas" in include:
+            result["metadatas"] = [dict(self._metadatas[r]) for r in rows]
+        if "embeddings" in include:
+            result["embeddings"] = [self._raw[r].tolist() for r in rows]
+        return result
+
+    def _ensure_capacity(self, size: int, dim: int):
+        if self._vectors is None:
+            self._vectors = np.zeros((max(size, 64), dim), dtype=np.float32)
+            self._raw = np.zeros_like(self._vectors)
+        elif size > len(self._vectors):
+            capacity = max(size, 2 * len(self._vectors))
+            for name in ("_vectors", "_raw"):
+                grown = np.zeros((capacity, dim), dtype=np.float32)
+                grown[:len(self._ids)] = getattr(self, name)[:len(self._ids)]
+                setattr(self, name, grown)
+            if self._hnsw is not None:
+                self._hnsw.resize_index(capacity)
+
+    def _use_hnsw(self) -> bool:
+        """Build the HNSW index once the run is big enough for brute force to matter"""
+        threshold = config.MEMORY_BACKEND_HNSW_THRESHOLD
+        if threshold is None or len(self._ids) < threshold or not self._hnsw_available:
+            return False
+        if self._hnsw is None:
+            try:
+                import hnswlib  # Installed with chromadb as chroma-hnswlib
+            except ImportError:
+                logger.warning("hnswlib not available - using brute-force search")
+                self._hnsw_available = False
+                return False
+            size = len(self._ids)
+            self._hnsw = hnswlib.Index(space="cosine", dim=self._vectors.shape[1])
+            self._hnsw.init_index(max_elements=len(self._vectors), ef_construction=200, M=16)
+            self._hnsw.add_items(self._vectors[:size], np.arange(size))
+            logger.info(f"Built HNSW index over {size} nodes")
+        return True
+
+    def _load(self):
+        """Read the persisted collection into memory the first time the backend is used"""
+        if self._loaded:
+            return
+        self._loaded = True
+        data = self.collection.get(include=["embeddings", "metadatas"])
+        if data["ids"]:
+            self.upsert(data["ids"], data["embeddings"], [meta or {} for meta in data["metadatas"]])
+            self._dirty.clear()
+            logger.info(f"Loaded {len(data['ids'])} persisted nodes into memory")
+
+COMPARISONS = {
+    "$eq": lambda value, operand: value == operand,
+    "$ne": lambda value, operand: value != operand,
+    "$gt": lambda value, operand: value > operand,
+    "$gte": lambda value, operand: value >= operand,
+    "$lt": lambda value, operand: value < operand,
+    "$lte": lambda value, operand: value <= operand,
+    "$in": lambda value, operand: value in operand,
+    "$nin": lambda value, operand: value not in operand
+}
+
+def metadata_matches(metadata: Dict[str, Any], where: Dict[str, Any]) -> bool:
+    """Evaluate a ChromaDB where clause against one metadata dict. Like ChromaDB, a missing key never matches."""
+    for key, condition in where.items():
+        if key == "$and":
+            if not all(metadata_matches(metadata, clause) for clause in condition):
+                return False
+        elif key == "$or":
+            if not any(metadata_matches(metadata, clause) for clause in condition):
+                return False
+        elif key not in metadata:
+            return False
+        elif isinstance(condition, dict):
+            if not all(COMPARISONS[op](metadata[key], operand) for op, operand in condition.items()):
+                return False
+        elif metadata[key] != condition:
+            return False
+    return True
+
+def create_vector_backend(collection) -> VectorBackend:
+    """Wrap a ChromaDB collection in the configured backend"""
+    if config.VECTOR_BACKEND == "memory":
+        return InMemoryBackend(collection)
+    if config.VECTOR_BACKEND == "chroma":
+        return ChromaBackend(collection)
+    raise ValueError(f"Unknown vector backend: {config.VECTOR_BACKEND}")
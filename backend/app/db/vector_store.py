@@ -1,127 +1,862 @@
-import chromadb
-from sentence_transformers import SentenceTransformer
 from .data_models import Node
+from .graph_store import GraphStore, NODE_COLUMNS
+from .embedding_cache import embedding_cache
+from .embedding_backends import load_embedding_model
+from .vector_backends import create_vector_backend, metadata_matches
+from ..llm.journal import run_journal
 from .. import config
-from typing import Optional, List
+from typing import Optional, List, Dict, Any, Tuple, Union
+import numpy as np
+import threading
+import sqlite3
+import queue
+import shutil
 import logging
+import time
+import uuid
 import os
 
 logger = logging.getLogger(__name__)
 
+# Node fields that change after a node is created; the text, and so the embedding, never does
+NODE_STATE_FIELDS = {'score', 'cumulative_score', 'is_pruned', 'is_fully_explored', 'extra_parent_ids'}
+
+# Process-wide handles shared by every VectorStore, so a reset never reloads the model or reopens the database
+_chroma_clients: Dict[str, Any] = {}
+_embedding_models: Dict[str, Any] = {}
+_client_lock = threading.Lock()
+_model_lock = threading.Lock()
+
+def get_chroma_client(db_path: str):
+    """Return the shared Chroma client for a database path, opening it on first use"""
+    with _client_lock:
+        if db_path not in _chroma_clients:
+            # Imported here so importing the app doesn't pay for chromadb until it is used
+            import chromadb
+            # Ensure the database directory exists and has proper permissions
+            os.makedirs(db_path, exist_ok=True)
+            _chroma_clients[db_path] = chromadb.PersistentClient(path=db_path)
+            logger.info(f"Vector store initialized with database at: {db_path}")
+        return _chroma_clients[db_path]
+
+def get_embedding_model(model_name: str = config.EMBEDDING_MODEL_NAME):
+    """Return the shared embedding model, loading it on first use"""
+    with _model_lock:
+        if model_name not in _embedding_models:
+            _embedding_models[model_name] = load_embedding_model(model_name)
+            logger.info(f"Loaded embedding model {model_name} ({config.EMBEDDING_BACKEND} backend)")
+        return _embedding_models[model_name]
+
+def run_collection_name(run_id: str) -> str:
+    return f"{config.RUN_COLLECTION_PREFIX}{run_id}"
+
 class VectorStore:
     def __init__(self):
-        # Ensure the database directory exists and has proper permissions
-        os.makedirs(config.VECTOR_DB_PATH, exist_ok=True)
-        
         # Use absolute path to avoid any relative path issues
-        db_path = os.path.abspath(config.VECTOR_DB_PATH)
+        self.db_path = os.path.abspath(config.VECTOR_DB_PATH)
         
-        self.client = chromadb.PersistentClient(path=db_path)
-        self.embedding_model = SentenceTransformer('all-MiniLM-L6-v2')  # Small, fast, local
-        self.collection = self.client.get_or_create_collection(name=config.COLLECTION_NAME)
+        # The client, collection and model are opened on first use so imports stay fast
+        # and journal replays never need the model
+        self._client = None
+        self._collection = None
+        self._graph = None
+        self.collection_name = None
+        self._followed_run = None  # Run written by another process, read from the graph store only
+        self._node_count = None  # (run, batches written, count), valid until the writer stores another batch
+        self._embedding_model = None
+        # Also held while reaping and compacting, and by archives while they copy the database files
+        self._open_lock = threading.RLock()
+        self._graph_lock = threading.Lock()  # The graph store is opened while _open_lock is held
+
+        # Related thoughts per node id for retrieval-augmented expansion, for the current run
+        self._related_cache: Dict[str, List[str]] = {}
+
+        # Collections of earlier runs are dropped by a background reaper
+        self._reaper = None
+        self._reap_requested = threading.Event()
+        self._compact_requested = threading.Event()
+
+        # Write-behind buffer: writes are coalesced per node id until the next flush
+        self._pending_nodes: Dict[str, Node] = {}
+        self._pending_state: Dict[str, Dict[str, Any]] = {}
+        self._write_lock = threading.RLock()
+
+        # Flushed batches are stored by a writer thread, in order. Batches are numbered so a flush
+        # can wait for exactly the writes queued before it. Until a batch is stored, reads see it
+        # in _queued_batches, so they never wait for the writer.
+        self._write_queue = queue.Queue(maxsize=config.WRITE_QUEUE_MAX_BATCHES)
+        self._queue_lock = threading.Lock()
+        self._writer = None
+        self._submitted = 0
+        self._written = 0
+        self._queued_batches: Dict[int, Tuple[str, Dict[str, Node], Dict[str, Dict[str, Any]]]] = {}
+        self._failed_batches = []
+        self._write_error = None
+        self._written_cond = threading.Condition()
+
+        # Called with the run after each written batch and when the store switches runs
+        self._change_listeners = []
         
-        logger.info(f"Vector store initialized with database at: {db_path}")
+    @property
+    def client(self):
+        if self._client is None:
+            self._client = get_chroma_client(self.db_path)
+        return self._client
+
+    @property
+    def collection(self):
+        if self._collection is None:
+            # Warm-up and the first request may race to create the collection
+            with self._open_lock:
+                if self._collection is None:
+                    collection = self._latest_collection()
+                    self._import_legacy_nodes(collection)
+                    self.collection_name = collection.name
+                    self._collection = create_vector_backend(collection)
+        return self._collection
+
+    @collection.setter
+    def collection(self, collection):
+        self._collection = collection
+        self._node_count = None
+
+    @property
+    def graph(self) -> GraphStore:
+        """Authoritative store of the graph structure; the collection only holds embeddings"""
+        if self._graph is None:
+            # The reaper and the first request may race to open it, and only one store may be kept
+            with self._graph_lock:
+                if self._graph is None:
+                    self._graph = GraphStore(os.path.join(self.db_path, config.GRAPH_DB_FILENAME))
+        return self._graph
+
+    @property
+    def run(self) -> str:
+        """Key of the current run's rows in the graph store"""
+        if self._followed_run is not None:
+            return self._followed_run
+        self.collection
+        return self.collection_name
+
+    def follow_run(self, run: str):
+        """Read a run that another process writes. Reads then come from the shared graph store alone, so
+        the store never opens ChromaDB or the embedding model; API workers in coordinated mode work this way."""
+        with self._write_lock:
+            if run != self._followed_run:
+                logger.info(f"Following run {run}")
+                self._followed_run = run
+                self._node_count = None
+
+    @property
+    def embedding_model(self):
+        if self._embedding_model is None:
+            self._embedding_model = get_embedding_model(config.EMBEDDING_MODEL_NAME)
+        return self._embedding_model
+
+    def _latest_collection(self):
+        """The collection of the most recent run, or the shared collection if no run has started yet"""
+        runs = [c for c in self.client.list_collections() if c.name.startswith(config.RUN_COLLECTION_PREFIX)]
+        if runs:
+            return max(runs, key=lambda c: (c.metadata or {}).get("created_at", 0))
+        return self.client.get_or_create_collection(name=config.COLLECTION_NAME)
+
+    def _import_legacy_nodes(self, collection):
+        """Copy the nodes of a collection written before the graph store existed out of its metadata"""
+        if self.graph.count(collection.name) > 0 or collection.count() == 0:
+            return
+        data = collection.get(include=["metadatas"])
+        nodes = [self._metadata_to_node(meta) for meta in data["metadatas"] if meta and "text" in meta]
+        self.graph.upsert_nodes(collection.name, nodes)
+        if nodes:
+            logger.info(f"Imported {len(nodes)} nodes of collection {collection.name} into the graph store")
+
+    def warm_up(self):
+        """Open the collection and load the embedding model ahead of the first request"""
+        try:
+            self.collection
+            # Clean up after runs from before a restart; no run is writing yet, so their space can be reclaimed
+            self.reap_collections_async(compact=True)
+            if not run_journal.is_replaying:
+                self.embedding_model
+            logger.info("Vector store warm-up complete")
+        except Exception as e:
+            logger.error(f"Error warming up vector store: {e}")
+
+    def warm_up_async(self) -> threading.Thread:
+        """Run warm_up in a background thread; first use blocks until it has finished"""
+        thread = threading.Thread(target=self.warm_up, name="vector-store-warm-up", daemon=True)
+        thread.start()
+        return thread
+
+    def _encode(self, text: str) -> List[float]:
+        """Embed a text, going through the run journal when recording or replaying"""
+        return self._encode_batch([text])[0]
+
+    def _encode_batch(self, texts: List[str], batch_size: Optional[int] = None) -> List[List[float]]:
+        """Embed many texts with a single batched encode call for the ones not in the embedding cache"""
+        if run_journal.is_replaying:
+            return [run_journal.replay_embedding(text) for text in texts]
+
+        if config.EMBEDDING_CACHE_ENABLED:
+            embeddings = [v.tolist() if v is not None else None for v in embedding_cache.get_many(texts)]
+        else:
+            embeddings = [None] * len(texts)
+
+        missing = [i for i, embedding in enumerate(embeddings) if embedding is None]
+        if missing:
+            missing_texts = [texts[i] for i in missing]
+            encoded = self.embedding_model.encode(
+                missing_texts, batch_size=batch_size or config.EMBEDDING_BATCH_SIZE
+            ).tolist()
+            for i, embedding in zip(missing, encoded):
+                embeddings[i] = embedding
+            if config.EMBEDDING_CACHE_ENABLED:
+                embedding_cache.put_many(missing_texts, encoded)
+
+        # Cache hits are journaled too so a replay sees every embedding of the run
+        run_journal.record_embeddings(texts, embeddings)
+        return embeddings
+
+    def embed_nodes(self, nodes: List[Node], batch_size: Optional[int] = None):
+        """Fill in the embedding of every node that doesn't have one yet"""
+        missing = [n for n in nodes if n.embedding is None]
+        if not missing:
+            return
+        embeddings = self._encode_batch([n.text for n in missing], batch_size)
+        for node, embedding in zip(missing, embeddings):
+            node.embedding = embedding
+
+    def use_run_collection(self, run_id: str, create: bool = True):
+        """Switch to the collection of a run, creating it for a new run. Other runs' collections are reaped.
+        With create=False a missing collection (a run from before per-run collections) keeps the current one."""
+        name = run_collection_name(run_id)
+        with self._write_lock:
+            self._pending_nodes = {}
+            self._pending_state = {}
+        try:
+            with self._open_lock:
+                existing = [c for c in self.client.list_collections() if c.name == name]
+                if existing:
+                    collection = existing[0]
+                    self._import_legacy_nodes(collection)
+                elif not create:
+                    logger.warning(f"No collection {name} - keeping the current collection")
+                    return
+                else:
+                    collection = self.client.create_collection(
+                        name=name, metadata={"run_id": run_id, "created_at": time.time()}
+                    )
+                self.collection_name = name
+                self._collection = create_vector_backend(collection)
+                self._node_count = None
+                self._related_cache = {}
+            logger.info(f"Using collection {name}")
+        except Exception as e:
+            logger.error(f"Error switching to run collection: {e}")
+            raise
+        self._notify_change_listeners(name)
+        self.reap_collections_async()
 
     def clear_collection(self):
-        """Clear all data from the collection"""
+        """Start over with a new empty collection; the old one is dropped in the background"""
+        self.use_run_collection(str(uuid.uuid4()))
+        logger.info("Collection cleared successfully")
+
+    def reap_collections_async(self, compact: bool = False):
+        """Drop finished collections on the reaper thread without blocking the caller.
+        With compact=True their disk space is reclaimed afterwards; only ask for that while no run is writing."""
+        if compact:
+            self._compact_requested.set()
+        self._reap_requested.set()
+        if self._reaper is None or not self._reaper.is_alive():
+            self._reaper = threading.Thread(target=self._reap_loop, name="collection-reaper", daemon=True)
+            self._reaper.start()
+
+    def _reap_loop(self):
+        while self._reap_requested.is_set():
+            self._reap_requested.clear()
+            # Both rewrite the database files, which an archive may be copying
+            with self._open_lock:
+                self.reap_collections()
+                if self._compact_requested.is_set():
+                    self._compact_requested.clear()
+                    self.compact()
+
+    def hold_files(self):
+        """Lock that keeps reaping and compaction away from the database files, for as long as they're copied"""
+        return self._open_lock
+
+    def reap_collections(self) -> int:
+        """Drop every run collection except the current one, with its graph rows, through the Chroma client.
+        Their disk space is reclaimed by compact."""
+        dropped = []
+        try:
+            current = self.collection_name
+            # Runs are listed before collections: a run with rows but no collection at that point is orphaned,
+            # while a run started meanwhile is in neither list
+            graph_runs = self.graph.list_runs()
+            collections = self.client.list_collections()
+            for collection in collections:
+                name = collection.name
+                if name == current:
+                    continue
+                if name.startswith(config.RUN_COLLECTION_PREFIX) or name == config.COLLECTION_NAME:
+                    self.client.delete_collection(name=name)
+                    dropped.append(name)
+            names = {c.name for c in collections}
+            orphaned = [run for run in graph_runs if run not in names and run != current]
+            self.graph.delete_runs(dropped + orphaned)
+            if dropped:
+                logger.info(f"Reaped {len(dropped)} finished collections")
+        except Exception as e:
+            logger.error(f"Error reaping collections: {e}")
+        return len(dropped)
+
+    def compact(self):
+        """Give the space of dropped collections back to the file system: remove segment folders no collection
+        refers to and VACUUM chroma.sqlite3 and the graph store. Neither is safe while a run writes, so this is
+        only requested at warm-up and after a run ends, and a new run waits for it to finish."""
+        with self._open_lock:
+            try:
+                self._remove_orphaned_segments()
+                self._vacuum()
+                self.graph.vacuum()
+                logger.info("Compacted the vector database")
+            except Exception as e:
+                logger.error(f"Error compacting the vector database: {e}")
+
+    def _remove_orphaned_segments(self):
+        """Delete HNSW segment folders that no collection refers to any more"""
+        sqlite_file = os.path.join(self.db_path, "chroma.sqlite3")
+        if not os.path.exists(sqlite_file):
+            return
+        # List folders before reading the segments, so a segment created meanwhile is always known
+        folders = [f for f in os.listdir(self.db_path) if os.path.isdir(os.path.join(self.db_path, f))]
+        conn = sqlite3.connect(sqlite_file, timeout=30)
         try:
-            # Delete the collection if it exists
+            live_segments = {row[0] for row in conn.execute("SELECT id FROM segments")}
+        finally:
+            conn.close()
+        for folder in folders:
             try:
-                self.client.delete_collection(name=config.COLLECTION_NAME)
-                logger.info("Deleted existing collection")
+                uuid.UUID(folder)
             except ValueError:
-                # Collection doesn't exist, which is fine
-                logger.info("Collection didn't exist, nothing to delete")
+                continue
+            if folder not in live_segments:
+                shutil.rmtree(os.path.join(self.db_path, folder), ignore_errors=True)
+                logger.info(f"Removed orphaned segment folder {folder}")
             
-            # Create a fresh collection
-            self.collection = self.client.get_or_create_collection(name=config.COLLECTION_NAME)
-            logger.info("Collection cleared and recreated successfully")
+    def _vacuum(self):
+        """Give the space of dropped collections in chroma.sqlite3 back to the file system"""
+        sqlite_file = os.path.join(self.db_path, "chroma.sqlite3")
+        if not os.path.exists(sqlite_file):
+            return
+        conn = sqlite3.connect(sqlite_file, timeout=30, isolation_level=None)
+        try:
+            conn.execute("VACUUM")
+        finally:
+            conn.close()
+
+    def _metadata_to_node(self, meta: dict) -> Node:
+        """Rebuild a node from the ChromaDB metadata of a collection written before the graph store"""
+        meta = dict(meta)
+        # Ensure parent_id is set to None if missing
+        if 'parent_id' not in meta:
+            meta['parent_id'] = None
+        extra_parent_ids = meta.get('extra_parent_ids')
+        meta['extra_parent_ids'] = extra_parent_ids.split(",") if extra_parent_ids else []
+        return Node(**meta)
+
+    def add_node(self, node: Node):
+        """Add or update a node; it is written to the collection by the next flush"""
+        self.add_nodes([node])
+
+    def add_nodes(self, nodes: List[Node], batch_size: Optional[int] = None):
+        """Add or update many nodes with one batched embedding pass; they are written by the next flush"""
+        if not nodes:
+            return
+        try:
+            # The text of a node never changes, so an embedding computed earlier is still valid
+            self.embed_nodes(nodes, batch_size)
         except Exception as e:
-            logger.error(f"Error clearing collection: {e}")
+            logger.error(f"Error adding nodes to vector store: {e}")
             raise
 
-    def add_node(self, node: Node):
-        """Add a node to the vector store"""
+        with self._write_lock:
+            for node in nodes:
+                self._pending_nodes[node.id] = node
+                # The whole node supersedes state updates queued before it
+                self._pending_state.pop(node.id, None)
+            if len(self._pending_nodes) + len(self._pending_state) >= config.WRITE_BUFFER_MAX_PENDING:
+                self.flush_async()
+
+    def update_node_state(self, node_ids: List[str], fields: Union[Dict[str, Any], List[Dict[str, Any]]]):
+        """Update state fields of stored nodes without touching their embeddings.
+        fields is either one dict applied to every node or one dict per node id."""
+        if not node_ids:
+            return
+        per_node = fields if isinstance(fields, list) else [fields] * len(node_ids)
+        if len(per_node) != len(node_ids):
+            raise ValueError("update_node_state needs one fields dict per node id")
+
+        for node_fields in per_node:
+            unknown = set(node_fields) - NODE_STATE_FIELDS
+            if unknown:
+                raise ValueError(f"Not updatable node fields: {', '.join(sorted(unknown))}")
+
+        with self._write_lock:
+            for node_id, node_fields in zip(node_ids, per_node):
+                self._pending_state.setdefault(node_id, {}).update(node_fields)
+            if len(self._pending_nodes) + len(self._pending_state) >= config.WRITE_BUFFER_MAX_PENDING:
+                self.flush_async()
+
+    def flush_async(self) -> int:
+        """Hand the buffered writes to the writer thread without waiting for them.
+        Blocks only while WRITE_QUEUE_MAX_BATCHES batches are waiting. Returns the batch number."""
+        with self._write_lock:
+            if not self._pending_nodes and not self._pending_state:
+                return self._submitted
+            # The run is fixed now, so a batch queued before a new run starts still lands in its own run
+            batch = (self._submitted + 1, self.run, self.collection, self._pending_nodes, self._pending_state)
+            self._pending_nodes = {}
+            self._pending_state = {}
+            self._submitted += 1
+            with self._written_cond:
+                self._queued_batches[self._submitted] = (batch[1], batch[3], batch[4])
+            if self._writer is None or not self._writer.is_alive():
+                self._writer = threading.Thread(target=self._write_loop, name="vector-store-writer", daemon=True)
+                self._writer.start()
+            # Batches reach the queue in order, but reads and writes to the buffer go on while a full queue blocks
+            self._queue_lock.acquire()
         try:
-            embedding = self.embedding_model.encode(node.text).tolist()
-            node.embedding = embedding
-            
-            # Prepare metadata (exclude embedding from metadata and filter None values)
-            metadata = node.dict(exclude={'embedding'})
-            # Remove None values as ChromaDB doesn't accept them
-            metadata = {k: v for k, v in metadata.items() if v is not None}
-            
-            # Check if node already exists
+            self._write_queue.put(batch)
+        finally:
+            self._queue_lock.release()
+        return batch[0]
+
+    def flush(self):
+        """Write all buffered writes and wait until they are stored.
+        If a write failed the error is raised and the writes are kept, so a later flush retries them."""
+        batch_number = self.flush_async()
+        with self._written_cond:
+            self._written_cond.wait_for(lambda: self._written >= batch_number)
+        # Reads see failed writes until they are back in the buffer
+        with self._write_lock:
+            with self._written_cond:
+                failed, error = self._failed_batches, self._write_error
+                self._failed_batches, self._write_error = [], None
+            if failed:
+                self._restore_failed_batches(failed)
+        if failed:
+            raise error
+
+    def _write_loop(self):
+        """Store queued batches in order. Once one fails, later ones are held back with it so none overtakes it."""
+        while True:
+            batch = self._write_queue.get()
+            if batch is None:
+                return
+            batch_number, run, collection, nodes, state = batch
+            with self._written_cond:
+                failed = bool(self._failed_batches)
+            if not failed:
+                try:
+                    self._write_batch(run, collection, list(nodes.values()), state)
+                except Exception as e:
+                    logger.error(f"Error flushing writes to vector store: {e}")
+                    failed = True
+                    with self._written_cond:
+                        self._write_error = e
+            if not failed:
+                self._notify_change_listeners(run)
+            with self._written_cond:
+                if failed:
+                    self._failed_batches.append((run, nodes, state))
+                del self._queued_batches[batch_number]
+                self._written = batch_number
+                self._written_cond.notify_all()
+
+    def add_change_listener(self, listener):
+        """Call listener(run) after every batch written to the graph store and whenever the store switches runs.
+        Listeners run on the writer thread and must not wait for a flush."""
+        self._change_listeners.append(listener)
+
+    def _notify_change_listeners(self, run: str):
+        for listener in list(self._change_listeners):
             try:
-                existing = self.collection.get(ids=[node.id])
-                if existing['ids']:
-                    # Node exists, update it
-                    self.collection.upsert(
-                        ids=[node.id],
-                        embeddings=[embedding],
-                        metadatas=[metadata]
-                    )
-                    logger.info(f"Updated existing node {node.id} in vector store")
-                else:
-                    # Node doesn't exist, add it
-                    self.collection.add(
-                        ids=[node.id],
-                        embeddings=[embedding],
-                        metadatas=[metadata]
-                    )
-                    logger.info(f"Added new node {node.id} to vector store")
-            except Exception:
-                # If get() fails, assume node doesn't exist and try add()
-                self.collection.add(
-                    ids=[node.id],
-                    embeddings=[embedding],
-                    metadatas=[metadata]
-                )
-                logger.info(f"Added node {node.id} to vector store")
+                listener(run)
+            except Exception as e:
+                logger.error(f"Error in change listener: {e}")
+
+    def _write_batch(self, run: str, collection, nodes: List[Node], state: Dict[str, Dict[str, Any]]):
+        """Write nodes to the graph store and their embeddings to the collection, then the state updates"""
+        # Upserts are idempotent, so no read is needed to choose between add and update
+        if nodes:
+            self.graph.upsert_nodes(run, nodes)
+            collection.upsert(ids=[n.id for n in nodes], embeddings=[n.embedding for n in nodes])
+        # State changes never touch the embeddings
+        if state:
+            self.graph.update_nodes(run, list(state), list(state.values()))
+        embedding_cache.flush()
+        logger.info(f"Flushed {len(nodes)} node writes and {len(state)} state updates to vector store")
+
+    def _restore_failed_batches(self, failed):
+        """Put failed writes back in front of the writes buffered since"""
+        nodes, state = {}, {}
+        for _, batch_nodes, batch_state in failed + [(None, self._pending_nodes, self._pending_state)]:
+            for node_id, node in batch_nodes.items():
+                nodes[node_id] = node
+                state.pop(node_id, None)
+            for node_id, node_fields in batch_state.items():
+                state.setdefault(node_id, {}).update(node_fields)
+        self._pending_nodes = nodes
+        self._pending_state = state
+
+    def _buffered_writes(self) -> Tuple[Dict[str, Node], Dict[str, Dict[str, Any]]]:
+        """Writes to the current run that the graph store may not hold yet: failed and queued batches and the
+        buffer, coalesced in write order. Returns whole nodes by id, in the order they were first buffered,
+        and the state updates made after each node's last whole write."""
+        if self._followed_run is not None:
+            return {}, {}
+        with self._write_lock:
+            with self._written_cond:
+                batches = self._failed_batches + [self._queued_batches[n] for n in sorted(self._queued_batches)]
+            if not batches and not self._pending_nodes and not self._pending_state:
+                return {}, {}
+            run = self.run
+            nodes, state = {}, {}
+            for batch_run, batch_nodes, batch_state in batches + [(run, self._pending_nodes, self._pending_state)]:
+                if batch_run != run:
+                    continue
+                for node_id, node in batch_nodes.items():
+                    nodes[node_id] = node
+                    state.pop(node_id, None)
+                for node_id, node_fields in batch_state.items():
+                    state.setdefault(node_id, {}).update(node_fields)
+        return nodes, state
+
+    def _buffered_node(self, node: Node, fields: Optional[Dict[str, Any]] = None) -> Node:
+        """A copy of a node as the graph store will return it once its buffered writes are stored: with its
+        pending state updates and without the embedding. Buffered nodes themselves are never handed out."""
+        update = {"embedding": None, "extra_parent_ids": list(node.extra_parent_ids)}
+        update.update({k: list(v) if isinstance(v, list) else v for k, v in (fields or {}).items()})
+        return node.model_copy(update=update)
+
+    def _merge_buffered(self, rows: List[Tuple[int, Node]], buffered_nodes: Dict[str, Node],
+                        buffered_state: Dict[str, Dict[str, Any]], buffered_ids: List[str],
+                        where: Optional[Dict[str, Any]], order_by: Optional[str], limit: Optional[int]) -> List[Node]:
+        """Overlay buffered writes on positioned graph store rows, ordered as the graph store will order them
+        once the writes are stored: a new node comes after every stored one, in the order it was buffered"""
+        buffered = set(buffered_ids)
+        stored = {node.id: (position, node) for position, node in rows}
+        merged = [((0, position), node) for position, node in stored.values() if node.id not in buffered]
+        new_nodes = 0
+        for node_id in buffered_ids:
+            if node_id in stored:
+                position = (0, stored[node_id][0])
+                node = buffered_nodes.get(node_id, stored[node_id][1])
+            elif node_id in buffered_nodes:
+                position = (1, new_nodes)
+                new_nodes += 1
+                node = buffered_nodes[node_id]
+            else:
+                # A state update of a node that was never stored changes nothing
+                continue
+            node = self._buffered_node(node, buffered_state.get(node_id))
+            if where and not metadata_matches({c: getattr(node, c) for c in NODE_COLUMNS}, where):
+                continue
+            merged.append((position, node))
+
+        merged.sort(key=lambda item: item[0])
+        # Stable sorts from the last term to the first; like SQLite, None sorts before any value
+        for column, descending in reversed(self.graph.order_terms(order_by) if order_by else []):
+            merged.sort(key=lambda item: (getattr(item[1], column) is not None, getattr(item[1], column)),
+                        reverse=descending)
+        nodes = [node for _, node in merged]
+        return nodes if limit is None else nodes[:limit]
+
+    def _nearest(self, query_embeddings: List[List[float]], n_results: int, buffered_nodes: Dict[str, Node],
+                 include_embeddings: bool = False) -> List[List[Tuple[str, float, Optional[List[float]]]]]:
+        """The n_results stored or buffered nodes nearest to each query as (id, distance, embedding), nearest
+        first. Buffered nodes are measured as the collection measures, so they rank as they will once stored."""
+        rows = [{} for _ in query_embeddings]
+        if self.collection.count() > 0:
+            include = ["distances"] + (["embeddings"] if include_embeddings else [])
+            results = self.collection.query(query_embeddings=query_embeddings, n_results=n_results, include=include)
+            for i, row in enumerate(rows):
+                for j, node_id in enumerate(results['ids'][i]):
+                    embedding = results['embeddings'][i][j] if include_embeddings else None
+                    row[node_id] = (float(results['distances'][i][j]), embedding)
+        if buffered_nodes:
+            ids = list(buffered_nodes)
+            distances = self.collection.distances(query_embeddings, [buffered_nodes[i].embedding for i in ids])
+            nearest = np.argsort(distances, axis=1, kind="stable")[:, :n_results]
+            for row, row_distances, columns in zip(rows, distances, nearest):
+                for column in columns:
+                    node_id = ids[column]
+                    # A node being written may already be in the collection too, with the same vector
+                    if node_id not in row:
+                        row[node_id] = (float(row_distances[column]), buffered_nodes[node_id].embedding)
+        # Stored nodes come first on equal distances
+        return [
+            sorted(((node_id, d, e) for node_id, (d, e) in row.items()), key=lambda item: item[1])[:n_results]
+            for row in rows
+        ]
+
+    def persist(self):
+        """Flush buffered writes and make the run durable, for checkpoints and archives"""
+        self.flush()
+        self.collection.persist()
+        # Archives copy the database files, which must not depend on the WAL
+        self.graph.checkpoint()
+
+    def restore_missing_vectors(self):
+        """Re-embed nodes of the graph store whose vectors never reached the collection, as after a crash
+        between two persists of the memory backend"""
+        try:
+            nodes = self.graph.get_nodes(self.run)
+            stored = set(self.collection.get(ids=[n.id for n in nodes])['ids']) if nodes else set()
+            missing = [n for n in nodes if n.id not in stored]
+            if missing:
+                self.add_nodes(missing)
+                self.flush()
+                logger.info(f"Restored the vectors of {len(missing)} nodes")
         except Exception as e:
-            logger.error(f"Error adding node to vector store: {e}")
-            raise
+            logger.error(f"Error restoring missing vectors: {e}")
+
+    def close(self):
+        """Flush buffered writes and stop the writer thread before the store is left idle.
+        The store stays usable afterwards."""
+        try:
+            self.flush()
+        finally:
+            with self._write_lock, self._queue_lock:
+                if self._writer is not None and self._writer.is_alive():
+                    self._write_queue.put(None)
+                    self._writer.join()
+                self._writer = None
+        embedding_cache.flush()
 
     def get_all_nodes_for_graph(self) -> List[Node]:
         """Retrieve all nodes for visualization"""
+        return self.get_nodes()
+
+    def get_nodes(self, where: Optional[Dict[str, Any]] = None, ids: Optional[List[str]] = None,
+                  order_by: Optional[str] = None, limit: Optional[int] = None) -> List[Node]:
+        """Nodes matching a ChromaDB-style where filter, evaluated by the graph store rather than in Python.
+        Buffered writes are laid over the stored nodes, so reads never wait for the writer thread."""
         try:
-            nodes_data = self.collection.get(include=["metadatas"])
-            nodes = []
-            for meta in nodes_data['metadatas']:
-                # Ensure parent_id is set to None if missing
-                if 'parent_id' not in meta:
-                    meta['parent_id'] = None
-                nodes.append(Node(**meta))
-            return nodes
+            # The buffer is read before the graph store: a batch stored in between is then seen twice, never missed
+            buffered_nodes, buffered_state = self._buffered_writes()
+            if not buffered_nodes and not buffered_state:
+                return self.graph.get_nodes(self.run, ids=ids, where=where, order_by=order_by, limit=limit)
+            wanted = set(ids) if ids is not None else None
+            buffered_ids = [i for i in {**buffered_nodes, **buffered_state} if wanted is None or i in wanted]
+            # Buffered nodes can drop out of the stored result, so enough stored rows are read to fill the limit
+            rows = self.graph.get_positioned_nodes(
+                self.run, ids=ids, where=where, order_by=order_by,
+                limit=None if limit is None else limit + len(buffered_ids), also_ids=buffered_ids
+            )
+            return self._merge_buffered(rows, buffered_nodes, buffered_state, buffered_ids, where, order_by, limit)
         except Exception as e:
-            logger.error(f"Error retrieving nodes: {e}")
+            logger.error(f"Error querying nodes: {e}")
             return []
 
+    def get_nodes_page(self, where: Optional[Dict[str, Any]] = None, after: Optional[int] = None,
+                       limit: int = 1000) -> Tuple[List[Node], Optional[int]]:
+        """One page of nodes in insertion order and the position the next page starts after (None on the last).
+        Only stored nodes have a position, so buffered writes show up once the writer has stored them."""
+        try:
+            return self.graph.get_nodes_page(self.run, where=where, after=after, limit=limit)
+        except Exception as e:
+            logger.error(f"Error reading a page of nodes: {e}")
+            return [], None
+
+    def get_open_nodes(self, max_depth: int) -> List[Node]:
+        """Nodes that can still be expanded: not explored, not pruned and above the depth limit"""
+        return self.get_nodes(where={"$and": [
+            {"is_fully_explored": False},
+            {"is_pruned": False},
+            {"depth": {"$lt": max_depth}}
+        ]})
+
+    def count_nodes(self) -> int:
+        """Number of nodes, buffered ones included, without reading any of them"""
+        try:
+            buffered_nodes, _ = self._buffered_writes()
+            if buffered_nodes:
+                # Buffered nodes the graph store already holds are updates, not new nodes
+                return self.graph.count(self.run, list(buffered_nodes))
+            run, written = self.run, self._written
+            cached = self._node_count
+            # Another process's writes don't invalidate the cached count
+            if cached is None or cached[:2] != (run, written) or self._followed_run is not None:
+                cached = self._node_count = (run, written, self.graph.count(run))
+            return cached[2]
+        except Exception as e:
+            logger.error(f"Error counting nodes: {e}")
+            return 0
+
     def get_node_by_id(self, node_id: str) -> Optional[Node]:
         """Get a specific node by ID"""
+        nodes = self.get_nodes(ids=[node_id])
+        return nodes[0] if nodes else None
+
+    def get_children(self, node_id: str) -> List[Node]:
+        """Nodes generated from, or merged under, the given node"""
+        try:
+            buffered_nodes, buffered_state = self._buffered_writes()
+            stored = self.graph.get_children(self.run, node_id)
+            if not buffered_nodes and not buffered_state:
+                return stored
+            # A buffered write can add a child or change the merged parents of a stored one
+            candidates = [n.id for n in stored] + list({**buffered_nodes, **buffered_state})
+            return [n for n in self.get_nodes(ids=candidates)
+                    if n.parent_id == node_id or node_id in n.extra_parent_ids]
+        except Exception as e:
+            logger.error(f"Error getting children of node: {e}")
+            return []
+
+    def get_path(self, node_id: str) -> List[Node]:
+        """The node and its ancestors along the primary parents, root first"""
+        try:
+            buffered_nodes, buffered_state = self._buffered_writes()
+            if not buffered_nodes and not buffered_state:
+                return self.graph.get_path(self.run, node_id)
+            # Walk up through buffered nodes to the first ancestor the graph store holds
+            buffered_path = []
+            current = node_id
+            while current in buffered_nodes and len(buffered_path) < 10000:
+                buffered_path.append(buffered_nodes[current])
+                current = buffered_nodes[current].parent_id
+            path = (self.graph.get_path(self.run, current) if current else []) + buffered_path[::-1]
+            return [self._buffered_node(buffered_nodes.get(n.id, n), buffered_state.get(n.id)) for n in path]
+        except Exception as e:
+            logger.error(f"Error getting path to node: {e}")
+            return []
+
+    def get_top_nodes(self, k: int = 1) -> List[Node]:
+        """The k nodes with the highest cumulative score, earliest first on ties"""
+        return self.get_nodes(order_by="cumulative_score DESC", limit=k)
+
+    def get_version(self) -> int:
+        """Version of the graph store. Buffered writes get a version once the writer has stored them."""
+        return self.graph.get_version()
+
+    def changes_since(self, version: int) -> Dict[str, Any]:
+        """Nodes of the current run inserted or updated after version, with the version to ask from next.
+        A reader that starts at version 0 gets the whole run as inserts. Buffered writes aren't versioned yet."""
+        try:
+            return self.graph.changes_since(self.run, version)
+        except Exception as e:
+            logger.error(f"Error reading graph changes: {e}")
+            return {"run": self.run, "version": version, "inserted": [], "updated": []}
+
+    def get_graph_stats(self) -> Dict[str, Any]:
+        """Node count, average score and number of pruned nodes of the current run"""
+        try:
+            buffered_nodes, buffered_state = self._buffered_writes()
+            if buffered_nodes or buffered_state:
+                # Buffered scores and prunes can't be added to SQL aggregates, so the nodes are read instead
+                nodes = self.get_nodes()
+                return {
+                    "total_nodes": len(nodes),
+                    "average_score": sum(n.score for n in nodes) / len(nodes) if nodes else 0,
+                    "pruned_nodes": sum(1 for n in nodes if n.is_pruned)
+                }
+            return self.graph.get_stats(self.run)
+        except Exception as e:
+            logger.error(f"Error getting graph statistics: {e}")
+            return {"total_nodes": 0, "average_score": 0, "pruned_nodes": 0}
+
+    def find_duplicate(self, node: Node, threshold: Optional[float] = None) -> Optional[Node]:
+        """Find a stored node that is semantically equivalent to the given node"""
+        return self.find_duplicates([node], threshold)[0]
+
+    def find_duplicates(self, nodes: List[Node], threshold: Optional[float] = None) -> List[Optional[Node]]:
+        """For each node, find a semantically equivalent stored node or earlier node of the same batch.
+        threshold defaults to DEDUP_SIMILARITY_THRESHOLD."""
+        duplicates = [None] * len(nodes)
+        if not nodes:
+            return duplicates
+        if threshold is None:
+            threshold = config.DEDUP_SIMILARITY_THRESHOLD
         try:
-            data = self.collection.get(ids=[node_id], include=["metadatas"])
-            if data['metadatas']:
-                meta = data['metadatas'][0]
-                # Ensure parent_id is set to None if missing
-                if 'parent_id' not in meta:
-                    meta['parent_id'] = None
-                return Node(**meta)
-            return None
+            self.embed_nodes(nodes)
+            # Compare with cosine similarity so the result doesn't depend on the collection's distance space
+            vectors = np.asarray([n.embedding for n in nodes], dtype=np.float32)
+            vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+
+            buffered_nodes, _ = self._buffered_writes()
+            nearest = self._nearest([n.embedding for n in nodes], 1, buffered_nodes, include_embeddings=True)
+            matches = {}
+            for i, row in enumerate(nearest):
+                if not row:
+                    continue
+                node_id, _, embedding = row[0]
+                candidate = np.asarray(embedding, dtype=np.float32)
+                similarity = float(vectors[i] @ candidate / np.linalg.norm(candidate))
+                if similarity >= threshold:
+                    matches[i] = (node_id, similarity)
+
+            if matches:
+                stored = {n.id: n for n in self.get_nodes(ids=list({m[0] for m in matches.values()}))}
+                for i, (node_id, similarity) in matches.items():
+                    if node_id in stored:
+                        duplicates[i] = stored[node_id]
+                        logger.info(f"Node text matches existing node {duplicates[i].id} (similarity: {similarity:.3f})")
+
+            # Thoughts generated together can also repeat each other
+            for i in range(len(nodes)):
+                if duplicates[i] is not None:
+                    continue
+                for j in range(i):
+                    if duplicates[j] is None and float(vectors[i] @ vectors[j]) >= threshold:
+                        duplicates[i] = nodes[j]
+                        break
+            return duplicates
         except Exception as e:
-            logger.error(f"Error getting node by ID: {e}")
-            return None
+            logger.error(f"Error finding duplicate nodes: {e}")
+            return [None] * len(nodes)
+
+    def get_related_context(self, nodes: List[Node], n_results: Optional[int] = None) -> Dict[str, List[str]]:
+        """Texts of the stored thoughts closest to each node, other than the node itself.
+        Nodes not looked up before share one query; results are cached per node.
+        n_results defaults to RETRIEVAL_CONTEXT_K."""
+        if n_results is None:
+            n_results = config.RETRIEVAL_CONTEXT_K
+        missing = list(dict.fromkeys(n.id for n in nodes if n.id not in self._related_cache))
+        if missing:
+            try:
+                # The vectors of stored and buffered nodes are reused, so no text is embedded again
+                buffered_nodes, _ = self._buffered_writes()
+                embeddings = {i: buffered_nodes[i].embedding for i in missing if i in buffered_nodes}
+                stored_ids = [i for i in missing if i not in embeddings]
+                if stored_ids:
+                    stored = self.collection.get(ids=stored_ids, include=["embeddings"])
+                    embeddings.update(zip(stored['ids'], stored['embeddings']))
+                found = [i for i in missing if i in embeddings]
+                if found:
+                    nearest = self._nearest([embeddings[i] for i in found], n_results + 1, buffered_nodes)
+                    neighbour_ids = list({node_id for row in nearest for node_id, _, _ in row})
+                    texts = {n.id: n.text for n in self.get_nodes(ids=neighbour_ids)}
+                    for node_id, row in zip(found, nearest):
+                        related = [texts[i] for i, _, _ in row if i != node_id and i in texts]
+                        self._related_cache[node_id] = related[:n_results]
+                    logger.info(f"Looked up related thoughts for {len(found)} nodes in one query")
+            except Exception as e:
+                logger.error(f"Error finding related thoughts: {e}")
+        return {n.id: self._related_cache.get(n.id, []) for n in nodes}
 
     def find_relevant_knowledge(self, query_text: str, n_results: int = 3) -> str:
         """Find relevant knowledge for providing context to agents"""
         try:
-            query_embedding = self.embedding_model.encode(query_text).tolist()
-            results = self.collection.query(
-                query_embeddings=[query_embedding], 
-                n_results=n_results
-            )
-            if results['metadatas'] and results['metadatas'][0]:
-                return "\n".join([meta['text'] for meta in results['metadatas'][0]])
+            query_embedding = self._encode(query_text)
+            buffered_nodes, _ = self._buffered_writes()
+            ids = [node_id for node_id, _, _ in self._nearest([query_embedding], n_results, buffered_nodes)[0]]
+            if ids:
+                stored = {n.id: n for n in self.get_nodes(ids=ids)}
+                return "\n".join([stored[node_id].text for node_id in ids if node_id in stored])
             return ""
         except Exception as e:
             logger.error(f"Error finding relevant knowledge: {e}")
@@ -131,7 +866,8 @@ class VectorStore:
 vector_store_client = VectorStore()
 
 def reset_vector_store():
-    """Create a new vector store instance and replace the global one"""
+    """Create a new vector store instance and replace the global one. The loaded model and client are reused."""
     global vector_store_client
+    vector_store_client.close()
     vector_store_client = VectorStore()
     return vector_store_client
@@ -0,0 +1,126 @@
+# Compares the embedding backends on throughput, peak memory and agreement with the torch model.
+# Run from the backend directory with: python -m app.embedding_benchmark [--sentences 2000] [--texts file.txt]
+import argparse
+import json
+import os
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+import numpy as np
+from . import config
+
+VARIANTS = {
+    "torch": {"backend": "torch", "quantize": False},
+    "onnx": {"backend": "onnx", "quantize": False},
+    "onnx-int8": {"backend": "onnx", "quantize": True}
+}
+
+SUBJECTS = ["Cheap solar power", "Remote work", "Carbon pricing", "Gene editing", "Urban rail",
+            "Open-source AI models", "Vertical farming", "Battery recycling"]
+EFFECTS = ["will reshape heavy industry", "could lower housing costs in secondary cities",
+           "shifts political power towards regulators", "depends on assumptions about consumer behaviour",
+           "has the biggest impact on developing economies", "may be explained by falling capital costs"]
+
+def build_corpus(count: int, seed: int = 0):
+    """Thought-like sentences of mixed length, similar to what the agents produce"""
+    rng = random.Random(seed)
+    corpus = []
+    for _ in range(count):
+        sentence = f"{rng.choice(SUBJECTS)} {rng.choice(EFFECTS)}."
+        if rng.random() < 0.5:
+            sentence += " " + rng.choice(config.INTERROGATIVE_BATTERY) + f" {rng.choice(SUBJECTS)} {rng.choice(EFFECTS)}."
+        corpus.append(sentence)
+    return corpus
+
+def run_variant(variant: str, model_name: str, texts_file: str, output_file: str, batch_size: int):
+    """Measure one backend in this process and print the results as JSON"""
+    config.EMBEDDING_BACKEND = VARIANTS[variant]["backend"]
+    config.EMBEDDING_ONNX_QUANTIZE = VARIANTS[variant]["quantize"]
+    from .db.embedding_backends import load_embedding_model
+
+    with open(texts_file, 'r', encoding='utf-8') as f:
+        texts = f.read().splitlines()
+
+    started = time.perf_counter()
+    model = load_embedding_model(model_name)
+    load_seconds = time.perf_counter() - started
+
+    model.encode(texts[:batch_size], batch_size=batch_size)  # Warm-up
+    started = time.perf_counter()
+    embeddings = model.encode(texts, batch_size=batch_size)
+    encode_seconds = time.perf_counter() - started
+    np.save(output_file, np.asarray(embeddings, dtype=np.float32))
+
+    print(json.dumps({
+        "load_seconds": load_seconds,
+        "sentences_per_second": len(texts) / encode_seconds,
+        "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,  # ru_maxrss is in KiB on Linux
+        "dimension": int(np.asarray(embeddings).shape[1])
+    }))
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the torch and ONNX embedding backends")
+    parser.add_argument("--model", default=config.EMBEDDING_MODEL_NAME, help="SentenceTransformer name or path")
+    parser.add_argument("--sentences", type=int, default=2000, help="Size of the generated corpus")
+    parser.add_argument("--texts", help="File with one sentence per line to use instead of the generated corpus")
+    parser.add_argument("--batch-size", type=int, default=config.EMBEDDING_BATCH_SIZE)
+    parser.add_argument("--variants", default=",".join(VARIANTS), help="Comma-separated subset of: " + ", ".join(VARIANTS))
+    parser.add_argument("--min-cosine", type=float, default=0.99, help="Fail if any vector agrees less with torch")
+    parser.add_argument("--run-variant", choices=list(VARIANTS), help=argparse.SUPPRESS)
+    parser.add_argument("--texts-file", help=argparse.SUPPRESS)
+    parser.add_argument("--output-file", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run_variant:
+        run_variant(args.run_variant, args.model, args.texts_file, args.output_file, args.batch_size)
+        return
+
+    variants = args.variants.split(",")
+    with tempfile.TemporaryDirectory(prefix="gotai_embedding_bench_") as work_dir:
+        texts_file = os.path.join(work_dir, "texts.txt")
+        if args.texts:
+            with open(args.texts, 'r', encoding='utf-8') as f:
+                texts = [line.strip() for line in f if line.strip()]
+        else:
+            texts = build_corpus(args.sentences)
+        with open(texts_file, 'w', encoding='utf-8') as f:
+            f.write("\n".join(texts))
+        print(f"Embedding {len(texts)} sentences with {args.model}, batch size {args.batch_size}")
+
+        results = {}
+        for variant in variants:
+            # Each backend runs in its own process so peak RSS isn't shared between them
+            output_file = os.path.join(work_dir, f"{variant}.npy")
+            completed = subprocess.run(
+                [sys.executable, "-m", "app.embedding_benchmark", "--run-variant", variant, "--model", args.model,
+                 "--texts-file", texts_file, "--output-file", output_file, "--batch-size", str(args.batch_size)],
+                capture_output=True, text=True
+            )
+            if completed.returncode != 0:
+                print(f"{variant}: failed\n{completed.stderr.strip()}")
+                continue
+            results[variant] = json.loads(completed.stdout.strip().splitlines()[-1])
+            results[variant]["embeddings"] = np.load(output_file)
+
+        reference = results.get("torch")
+        failed = False
+        print(f"\n{'backend':<12}{'load s':>9}{'sent/s':>10}{'peak RSS MB':>13}{'dim':>6}{'min cos':>10}{'mean cos':>10}")
+        for variant, result in results.items():
+            line = (f"{variant:<12}{result['load_seconds']:>9.2f}{result['sentences_per_second']:>10.1f}"
+                    f"{result['peak_rss_mb']:>13.0f}{result['dimension']:>6}")
+            if reference is not None and variant != "torch":
+                from .db.embedding_backends import compare_embeddings
+                accuracy = compare_embeddings(reference["embeddings"], result["embeddings"])
+                line += f"{accuracy['min_cosine']:>10.4f}{accuracy['mean_cosine']:>10.4f}"
+                failed = failed or accuracy["min_cosine"] < args.min_cosine
+            print(line)
+
+        if failed or len(results) < len(variants):
+            print(f"\nAccuracy check failed: a backend is missing or below min cosine {args.min_cosine}")
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+# Records every LLM and embedding call of a run, and can play them back without any model.
+import os
+import gzip
+import json
+import base64
+import threading
+from collections import defaultdict, deque
+from typing import List, Dict, Any
+import numpy as np
+import logging
+
+logger = logging.getLogger(__name__)
+
+JOURNAL_FORMAT_VERSION = 1
+
+class JournalMissError(KeyError):
+    """Raised in replay mode when the journal has no entry for a call"""
+
+class RunJournal:
+    def __init__(self):
+        self.mode = None  # None, "record" or "replay"
+        self.path = None
+        self.header = None
+        self.misses = 0
+        self._file = None
+        self._llm_entries = defaultdict(deque)
+        self._embedding_entries = defaultdict(deque)
+        self._lock = threading.Lock()
+
+    @property
+    def is_recording(self) -> bool:
+        return self.mode == "record"
+
+    @property
+    def is_replaying(self) -> bool:
+        return self.mode == "replay"
+
+    def start_recording(self, path: str, run_info: Dict[str, Any]):
+        """Open a new gzip-compressed JSON-lines journal and write the run header"""
+        self.close()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with self._lock:
+            self._file = gzip.open(path, 'wt', encoding='utf-8')
+            self.mode = "record"
+            self.path = path
+            self.header = {"kind": "header", "version": JOURNAL_FORMAT_VERSION, "run": run_info}
+            self._write(self.header)
+        logger.info(f"Recording run journal to {path}")
+
+    def start_replay(self, path: str) -> Dict[str, Any]:
+        """Load a journal for replay and return the recorded run information"""
+        self.close()
+        llm_entries = defaultdict(deque)
+        embedding_entries = defaultdict(deque)
+        header = None
+
+        with gzip.open(path, 'rt', encoding='utf-8') as f:
+            for line in f:
+                entry = json.loads(line)
+                if entry["kind"] == "header":
+                    header = entry
+                elif entry["kind"] == "llm":
+                    llm_entries[entry["prompt"]].append(entry)
+                elif entry["kind"] == "embedding":
+                    embedding_entries[entry["text"]].append(entry["embedding"])
+
+        if header is None:
+            raise ValueError(f"Journal {path} has no header")
+
+        with self._lock:
+            self.mode = "replay"
+            self.path = path
+            self.header = header
+            self.misses = 0
+            self._llm_entries = llm_entries
+            self._embedding_entries = embedding_entries
+        logger.info(f"Replaying run journal {path} ({len(llm_entries)} prompts, {len(embedding_entries)} texts)")
+        return header["run"]
+
+    def record_llm(self, prompt: str, max_tokens: int, response: str, tokens: int):
+        with self._lock:
+            if self.is_recording:
+                self._write({"kind": "llm", "prompt": prompt, "max_tokens": max_tokens,
+                             "response": response, "tokens": tokens})
+
+    def replay_llm(self, prompt: str) -> Dict[str, Any]:
+        """Return the recorded response entry for a prompt"""
+        with self._lock:
+            return self._next(self._llm_entries, prompt)
+
+    def record_embeddings(self, texts: List[str], embeddings: List[List[float]]):
+        with self._lock:
+            if self.is_recording:
+                for text, embedding in zip(texts, embeddings):
+                    self._write({"kind": "embedding", "text": text, "embedding": self._pack(embedding)})
+
+    def replay_embedding(self, text: str) -> List[float]:
+        """Return the recorded embedding for a text"""
+        with self._lock:
+            return self._unpack(self._next(self._embedding_entries, text))
+
+    def close(self):
+        """Finish recording or replaying"""
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+                logger.info(f"Closed run journal {self.path}")
+            self.mode = None
+
+    def _next(self, entries, key):
+        queue = entries.get(key)
+        if not queue:
+            self.misses += 1
+            raise JournalMissError(key[:80])
+        # Repeated calls are answered in recorded order; the last answer is reused after that
+        return queue.popleft() if len(queue) > 1 else queue[0]
+
+    def _write(self, entry: Dict[str, Any]):
+        self._file.write(json.dumps(entry, ensure_ascii=False) + "\n")
+
+    def _pack(self, embedding: List[float]) -> str:
+        """Store embeddings as base64 float32 so the journal stays compact and exact"""
+        return base64.b64encode(np.asarray(embedding, dtype=np.float32).tobytes()).decode('ascii')
+
+    def _unpack(self, packed: str) -> List[float]:
+        return np.frombuffer(base64.b64decode(packed), dtype=np.float32).tolist()
+
+# Global instance
+run_journal = RunJournal()
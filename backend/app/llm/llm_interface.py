@@ -2,27 +2,62 @@
 
 import ollama
 from .. import config
+from .journal import run_journal
+from ..core.budget import estimate_tokens
 import logging
 
 logger = logging.getLogger(__name__)
 
+# The cheapest call the client makes: a scoring prompt for an empty text and one generated token
+CHEAPEST_CALL_TOKENS = estimate_tokens(config.LOGIC_SCORING_PROMPT_TEMPLATE.format(text="")) + 1
+
 class LLMInterface:
     def __init__(self):
         self.model = config.LOCAL_LLM_MODEL
+        self.seed = None  # Set per run so sampling can be reproduced on resume
+        self.budget = None  # RunBudget of the active run, if any
         
     def generate(self, prompt: str, max_tokens: int = 100) -> str:
         """Generate text using the local LLM via Ollama"""
+        timeout = None
+        if self.budget is not None:
+            # The prompt counts against the token budget too, so it must leave room for one generated token
+            prompt_tokens = estimate_tokens(prompt)
+            if not self.budget.can_afford(tokens=prompt_tokens + 1, min_tokens=CHEAPEST_CALL_TOKENS):
+                reason = self.budget.exhausted_reason()
+                logger.info(f"LLM call refused: budget {reason} exhausted" if reason
+                            else "LLM call refused: it doesn't fit in the remaining budget")
+                return "Error: LLM budget exhausted."
+            max_tokens = self.budget.clamp_tokens(max_tokens, prompt_tokens)
+            # A call still running when the wall-clock budget ends is cut off instead of overshooting it
+            timeout = self.budget.remaining_seconds()
+            
         try:
-            response = ollama.generate(
+            if run_journal.is_replaying:
+                entry = run_journal.replay_llm(prompt)
+                if self.budget is not None:
+                    self.budget.record_call(entry["tokens"])
+                return entry["response"]
+
+            options = {
+                'num_predict': max_tokens,
+                'temperature': 0.7,
+                'top_p': 0.9,
+            }
+            if self.seed is not None:
+                options['seed'] = self.seed
+            client = ollama if timeout is None else ollama.Client(timeout=timeout)
+            response = client.generate(
                 model=self.model,
                 prompt=prompt,
-                options={
-                    'num_predict': max_tokens,
-                    'temperature': 0.7,
-                    'top_p': 0.9,
-                }
+                options=options
             )
-            return response['response'].strip()
+            tokens = response.get('prompt_eval_count', 0) + response.get('eval_count', 0)
+            if self.budget is not None:
+                self.budget.record_call(tokens)
+            text = response['response'].strip()
+            run_journal.record_llm(prompt, max_tokens, text, tokens)
+            return text
         except Exception as e:
             logger.error(f"Error calling LLM: {e}")
             return "Error: Could not generate response."
@@ -0,0 +1,82 @@
+# Replays a recorded run journal through a full Orchestrator run, without Ollama or the embedding model.
+# Run from the backend directory with: python -m app.replay ../journals/<run_id>.jsonl.gz [--profile]
+import argparse
+import cProfile
+import io
+import os
+import pstats
+import tempfile
+import time
+import logging
+from . import config
+
+logger = logging.getLogger(__name__)
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay a recorded GOT-AI run from its journal")
+    parser.add_argument("journal", help="Path to a .jsonl.gz journal written with JOURNAL_RECORDING_ENABLED")
+    parser.add_argument("--work-dir", help="Directory for the replay's database and checkpoints (defaults to a temp dir)")
+    parser.add_argument("--profile", action="store_true", help="Print a cProfile summary of the run")
+    parser.add_argument("--top", type=int, default=25, help="Number of profile entries to print")
+    parser.add_argument("--vector-backend", choices=["chroma", "memory"], default=config.VECTOR_BACKEND,
+                        help="Vector store backend to replay against")
+    parser.add_argument("--verbose", action="store_true", help="Show orchestrator logging")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO if args.verbose else logging.WARNING)
+
+    # Keep the replay away from the live database, checkpoints and task queue.
+    # This has to happen before the modules that build their global instances are imported.
+    work_dir = args.work_dir or tempfile.mkdtemp(prefix="gotai_replay_")
+    config.VECTOR_DB_PATH = os.path.join(work_dir, "db_data")
+    config.CHECKPOINT_PATH = os.path.join(work_dir, "checkpoints")
+    config.TASK_QUEUE_PATH = os.path.join(work_dir, "task_queue", "tasks.sqlite3")
+    config.EXPANSION_MODE = "local"
+    config.VECTOR_BACKEND = args.vector_backend
+    config.CYCLE_PAUSE_SECONDS = 0
+    config.JOURNAL_RECORDING_ENABLED = False
+
+    from .llm.journal import run_journal
+    from .core.orchestrator import orchestrator
+    from .db.vector_store import vector_store_client
+
+    run_info = run_journal.start_replay(args.journal)
+    print(f"Replaying run {run_info.get('run_id')}: {run_info['hypothesis']}")
+
+    profiler = cProfile.Profile() if args.profile else None
+    started = time.perf_counter()
+    if profiler:
+        profiler.enable()
+
+    # The wall-clock budget is dropped: replay is much faster than the recorded run
+    orchestrator.start_analysis(
+        run_info["hypothesis"],
+        run_info["max_depth"],
+        run_info["max_nodes"],
+        run_info["seed"],
+        None,
+        run_info.get("max_tokens"),
+        run_info.get("max_llm_calls"),
+        background=False
+    )
+
+    if profiler:
+        profiler.disable()
+    elapsed = time.perf_counter() - started
+    run_journal.close()
+
+    nodes = vector_store_client.get_all_nodes_for_graph()
+    print(f"Replay finished in {elapsed:.3f}s")
+    print(f"  cycles:         {orchestrator.cycle_count}")
+    print(f"  nodes:          {len(nodes)}")
+    print(f"  stop reason:    {orchestrator.stop_reason}")
+    print(f"  journal misses: {run_journal.misses}")
+    print(f"  work dir:       {work_dir}")
+
+    if profiler:
+        output = io.StringIO()
+        pstats.Stats(profiler, stream=output).sort_stats("cumulative").print_stats(args.top)
+        print(output.getvalue())
+
+if __name__ == "__main__":
+    main()
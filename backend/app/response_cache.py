@@ -0,0 +1,116 @@
+# Encoded JSON responses shared by every client asking for the same version of the graph.
+import gzip
+import json
+import threading
+from collections import OrderedDict
+from typing import Optional, Dict, Any, Callable, Tuple, Hashable
+from fastapi import Request
+from fastapi.responses import Response
+from . import config
+import logging
+
+logger = logging.getLogger(__name__)
+
+try:
+    import orjson  # Optional; several times faster than json for node lists
+except ImportError:
+    orjson = None
+
+def encode_json(payload: Any) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(payload)
+    return json.dumps(payload, separators=(",", ":"), ensure_ascii=False).encode('utf-8')
+
+def gzip_etag(etag: str) -> str:
+    """ETag of the gzip variant; a strong ETag names one exact byte sequence"""
+    return etag[:-1] + '-gzip"'
+
+class CachedResponse:
+    """A JSON body encoded once, with a gzip copy for clients that accept it"""
+
+    def __init__(self, payload: Any, etag: Optional[str]):
+        self.etag = etag
+        self.body = encode_json(payload)
+        self.gzip_body = None
+        if config.RESPONSE_GZIP_MIN_BYTES is not None and len(self.body) >= config.RESPONSE_GZIP_MIN_BYTES:
+            self.gzip_body = gzip.compress(self.body, compresslevel=config.RESPONSE_GZIP_LEVEL)
+
+    def response(self, request: Request) -> Response:
+        """Serve the stored bytes, compressed if the client accepts gzip"""
+        headers = {"Vary": "Accept-Encoding"}
+        body = self.body
+        etag = self.etag
+        if self.gzip_body is not None and "gzip" in request.headers.get("accept-encoding", ""):
+            body = self.gzip_body
+            headers["Content-Encoding"] = "gzip"
+            etag = gzip_etag(etag) if etag else None
+        if etag:
+            headers["ETag"] = etag
+        return Response(content=body, media_type="application/json", headers=headers)
+
+class ResponseCache:
+    """Encoded responses keyed on what they were built from, such as the run and graph version.
+
+    Many viewers polling an unchanged run are served the same bytes, and concurrent requests for a
+    missing key wait for one build instead of each reading and serializing the graph. Least recently
+    used entries are evicted beyond max_entries; old graph versions are never asked for again.
+    """
+
+    def __init__(self, max_entries: int = config.RESPONSE_CACHE_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[Hashable, CachedResponse]" = OrderedDict()
+        self._building: Dict[Hashable, threading.Lock] = {}
+        self._lock = threading.Lock()
+
+    def get_or_build(self, key: Hashable, build: Callable[[], Tuple[Any, Optional[str]]]) -> CachedResponse:
+        """Cached response for key, or build() -> (payload, etag) encoded once. A build without an ETag
+        doesn't match key exactly (the graph changed while it was read) and is served but not kept."""
+        with self._lock:
+            entry = self._hit(key)
+            if entry is not None:
+                return entry
+            build_lock = self._building.setdefault(key, threading.Lock())
+
+        with build_lock:
+            with self._lock:
+                entry = self._hit(key)
+                if entry is not None:
+                    return entry
+                self.misses += 1
+            try:
+                payload, etag = build()
+                entry = CachedResponse(payload, etag)
+                if etag is not None:
+                    with self._lock:
+                        self._entries[key] = entry
+                        while len(self._entries) > self.max_entries:
+                            self._entries.popitem(last=False)
+                return entry
+            finally:
+                with self._lock:
+                    self._building.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses
+            }
+
+    def _hit(self, key: Hashable) -> Optional[CachedResponse]:
+        entry = self._entries.get(key)
+        if entry is not None:
+            self._entries.move_to_end(key)
+            self.hits += 1
+        return entry
+
+# Global instance
+response_cache = ResponseCache()
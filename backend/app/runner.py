@@ -0,0 +1,139 @@
+# Orchestration process for coordinated mode: runs the analysis and the commands API workers queue for it.
+# Start exactly one from the backend directory with: python -m app.runner
+import argparse
+import functools
+import os
+import socket
+import threading
+import time
+import uuid
+import logging
+from typing import Optional, Dict, Any
+from .core.orchestrator import orchestrator
+from .core.archive_manager import archive_manager
+from .core.control import control_store
+from .core.events import graph_events
+from .core.jobs import run_job
+from .db.vector_store import vector_store_client
+from . import config
+
+logger = logging.getLogger(__name__)
+
+class Runner:
+    """Owns the orchestrator, the vector store and archiving. API workers only read the shared stores,
+    so they scale with viewers while the LLM work stays in this one process."""
+
+    def __init__(self, runner_id: Optional[str] = None, poll_seconds: float = config.CONTROL_POLL_SECONDS):
+        self.runner_id = runner_id or f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:6]}"
+        self.poll_seconds = poll_seconds
+        self.is_running = False
+        self._heartbeat = None
+        self.handlers = {
+            "start": lambda progress, **payload: self._start(**payload),
+            "resume": lambda progress: self._resume(),
+            "archive": lambda progress, run_name: archive_manager.stop_and_archive(progress, run_name),
+            "clear": lambda progress: {"success": archive_manager.clear_current_run()}
+        }
+
+    def run(self, max_jobs: Optional[int] = None):
+        """Process queued jobs until stopped (or max_jobs have been processed)"""
+        self.is_running = True
+        control_store.fail_interrupted_jobs(self.runner_id)
+        # Every event this process publishes reaches the API workers through the control store
+        graph_events.add_listener(control_store.append_event)
+        graph_events.attach()
+        self.publish_status()
+        self._heartbeat = threading.Thread(target=self._heartbeat_loop, daemon=True, name="runner-heartbeat")
+        self._heartbeat.start()
+        processed = 0
+        logger.info(f"Runner {self.runner_id} waiting for jobs")
+
+        while self.is_running and (max_jobs is None or processed < max_jobs):
+            try:
+                claimed = control_store.claim_job(self.runner_id)
+            except Exception as e:
+                logger.error(f"Error claiming job: {e}")
+                claimed = None
+
+            if claimed is None:
+                time.sleep(self.poll_seconds)
+                continue
+
+            self.process_job(*claimed)
+            processed += 1
+
+        self.is_running = False
+        logger.info(f"Runner {self.runner_id} stopped after {processed} jobs")
+
+    def process_job(self, job: Dict[str, Any], payload: Dict[str, Any]):
+        """Run a claimed job, recording its progress in the control store and on the event stream"""
+        logger.info(f"Runner {self.runner_id} running {job['kind']} job {job['id']}")
+        graph_events.publish("job", job)
+        handler = self.handlers.get(job["kind"])
+        if handler is None:
+            self._update(job["id"], status="failed", error=f"Unknown job kind: {job['kind']}", finished_at=time.time())
+            return
+        run_job(job["id"], functools.partial(handler, **payload), (), functools.partial(self._update, job["id"]))
+        self.publish_status()
+
+    def publish_status(self):
+        """Share the orchestrator's state and current run with the API workers"""
+        try:
+            status = orchestrator.get_best_result()
+            status.update({
+                "run": vector_store_client.run,
+                "runner_id": self.runner_id,
+                "resumable_checkpoint": self._resumable_checkpoint(),
+                "updated_at": time.time()
+            })
+            control_store.set_state("status", status)
+        except Exception as e:
+            logger.error(f"Error publishing runner status: {e}")
+
+    def _resumable_checkpoint(self) -> Optional[Dict[str, Any]]:
+        """The part of the runner's latest checkpoint API workers need to answer /api/resume"""
+        # A running analysis can't be resumed, so the heartbeat doesn't reload its checkpoint
+        if orchestrator.is_running:
+            return None
+        checkpoint = orchestrator.get_resumable_checkpoint()
+        if not checkpoint:
+            return None
+        return {key: checkpoint.get(key) for key in ["run_id", "hypothesis", "cycle_count", "max_depth", "max_nodes"]}
+
+    def _start(self, **request) -> Dict[str, Any]:
+        if orchestrator.is_running:
+            raise RuntimeError("Analysis already running")
+        orchestrator.start_analysis(**request)
+        return {"run_id": orchestrator.run_id}
+
+    def _resume(self) -> Dict[str, Any]:
+        if not orchestrator.resume_analysis():
+            raise RuntimeError("No resumable checkpoint found")
+        return {"run_id": orchestrator.run_id}
+
+    def _update(self, job_id: str, **fields):
+        job = control_store.update_job(job_id, **fields)
+        graph_events.publish("job", job)
+
+    def _heartbeat_loop(self):
+        # Status is published even while a long archive job holds up the job loop
+        while self.is_running:
+            time.sleep(self.poll_seconds)
+            self.publish_status()
+
+def main():
+    parser = argparse.ArgumentParser(description="GOT-AI orchestration process for coordinated mode")
+    parser.add_argument("--runner-id", help="Identifier recorded on claimed jobs (defaults to host-pid)")
+    parser.add_argument("--poll-seconds", type=float, default=config.CONTROL_POLL_SECONDS)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    runner = Runner(args.runner_id, args.poll_seconds)
+    try:
+        runner.run()
+    except KeyboardInterrupt:
+        logger.info("Runner interrupted")
+        orchestrator.stop_analysis()
+
+if __name__ == "__main__":
+    main()
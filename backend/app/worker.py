@@ -0,0 +1,109 @@
+# Expansion worker: claims node-expansion tasks from the shared task queue and runs the agent on them.
+# Start one or more from the backend directory with: python -m app.worker
+import argparse
+import os
+import socket
+import threading
+import time
+import uuid
+import logging
+from typing import Optional, Dict, Any
+from .core.agent import agent
+from .core.budget import RunBudget
+from .core.task_queue import task_queue
+from .db.data_models import Node
+from .llm.llm_interface import llm_client
+from . import config
+
+logger = logging.getLogger(__name__)
+
+class ExpansionWorker:
+    def __init__(self, worker_id: Optional[str] = None, lease_seconds: float = config.TASK_LEASE_SECONDS,
+                 poll_seconds: float = config.TASK_QUEUE_POLL_SECONDS):
+        self.worker_id = worker_id or f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:6]}"
+        self.lease_seconds = lease_seconds
+        self.poll_seconds = poll_seconds
+        self.is_running = False
+
+    def run(self, max_tasks: Optional[int] = None):
+        """Claim and process tasks until stopped (or max_tasks have been processed)"""
+        self.is_running = True
+        processed = 0
+        logger.info(f"Worker {self.worker_id} waiting for expansion tasks")
+
+        while self.is_running and (max_tasks is None or processed < max_tasks):
+            try:
+                task = task_queue.claim(self.worker_id, self.lease_seconds)
+            except Exception as e:
+                logger.error(f"Error claiming task: {e}")
+                task = None
+
+            if task is None:
+                time.sleep(self.poll_seconds)
+                continue
+
+            self.process_task(task)
+            processed += 1
+
+        logger.info(f"Worker {self.worker_id} stopped after {processed} tasks")
+
+    def process_task(self, task: Dict[str, Any]):
+        """Expand the task's node and post the result back to the queue"""
+        payload = task["payload"]
+        source_node = Node(**payload["node"])
+        logger.info(f"Worker {self.worker_id} expanding node {source_node.id} (attempt {task['attempts']})")
+
+        # Keep the lease alive for as long as the LLM calls take
+        done = threading.Event()
+        heartbeat = threading.Thread(target=self._renew_lease, args=(task["id"], done), daemon=True)
+        heartbeat.start()
+
+        try:
+            budget = RunBudget(max_tokens=payload.get("max_tokens"), max_llm_calls=payload.get("max_llm_calls"))
+            llm_client.seed = payload.get("seed")
+            llm_client.budget = budget
+
+            new_nodes = agent.investigate(source_node, payload.get("related"))
+            if not new_nodes and budget.can_afford(calls=2):
+                # Nothing came back although the budget allowed it: most likely the local LLM is unavailable
+                raise RuntimeError("Agent produced no nodes")
+
+            result = {
+                "nodes": [n.dict(exclude={'embedding'}) for n in new_nodes],
+                "used_tokens": budget.used_tokens,
+                "used_llm_calls": budget.used_llm_calls,
+                "worker_id": self.worker_id
+            }
+            if not task_queue.complete(task["id"], self.worker_id, result):
+                logger.warning(f"Lease on task {task['id']} was lost - result discarded")
+        except Exception as e:
+            logger.error(f"Error processing task {task['id']}: {e}")
+            task_queue.fail(task["id"], self.worker_id, str(e))
+        finally:
+            done.set()
+            llm_client.budget = None
+
+    def _renew_lease(self, task_id: str, done: threading.Event):
+        """Extend the lease periodically until the task is finished"""
+        while not done.wait(self.lease_seconds / 3):
+            if not task_queue.extend_lease(task_id, self.worker_id, self.lease_seconds):
+                logger.warning(f"Could not renew lease on task {task_id}")
+                return
+
+def main():
+    parser = argparse.ArgumentParser(description="GOT-AI node expansion worker")
+    parser.add_argument("--worker-id", help="Identifier recorded on leased tasks (defaults to host-pid)")
+    parser.add_argument("--lease-seconds", type=float, default=config.TASK_LEASE_SECONDS)
+    parser.add_argument("--poll-seconds", type=float, default=config.TASK_QUEUE_POLL_SECONDS)
+    parser.add_argument("--max-tasks", type=int, help="Exit after processing this many tasks")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    worker = ExpansionWorker(args.worker_id, args.lease_seconds, args.poll_seconds)
+    try:
+        worker.run(args.max_tasks)
+    except KeyboardInterrupt:
+        logger.info("Worker interrupted")
+
+if __name__ == "__main__":
+    main()
@@ -2,10 +2,40 @@
 
 import sys
 import os
+import argparse
+import subprocess
 
 # Add the backend directory to the Python path
 sys.path.insert(0, os.path.dirname(__file__))
 
-if __name__ == "__main__":
+def run_production(workers: int, start_runner: bool):
+    """Serve the API from several worker processes next to one orchestration process (coordinated mode)"""
     import uvicorn
-    uvicorn.run("app.api:app", host="0.0.0.0", port=8000, reload=True)
+    from app import config
+
+    # Set before the workers import the app, so every one of them runs in coordinated mode
+    os.environ["GOTAI_SERVER_MODE"] = "coordinated"
+    runner = None
+    if start_runner:
+        runner = subprocess.Popen([sys.executable, "-m", "app.runner"], cwd=os.path.dirname(os.path.abspath(__file__)))
+    try:
+        uvicorn.run("app.api:app", host="0.0.0.0", port=8000, workers=workers or config.SERVER_WORKERS)
+    finally:
+        if runner is not None:
+            runner.terminate()
+            runner.wait()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="GOT-AI backend server")
+    parser.add_argument("--production", action="store_true",
+                        help="Run several API workers and a separate orchestration process instead of one reloading process")
+    parser.add_argument("--workers", type=int, help="API worker processes in production mode (defaults to SERVER_WORKERS)")
+    parser.add_argument("--no-runner", action="store_true",
+                        help="Don't start the orchestration process; run python -m app.runner yourself")
+    args = parser.parse_args()
+
+    if args.production:
+        run_production(args.workers, not args.no_runner)
+    else:
+        import uvicorn
+        uvicorn.run("app.api:app", host="0.0.0.0", port=8000, reload=True)
@@ -1,9 +1,21 @@
 // Main application logic for GOT-AI frontend
 
+// Node fields the graph draws; the text is fetched when a node is opened
+const GRAPH_FIELDS = 'id,parent_id,extra_parent_ids,score,cumulative_score,is_pruned,depth';
+const GRAPH_PAGE_SIZE = 2000;
+
 class GOTAIApp {
     constructor() {
         this.isRunning = false;
-        this.updateInterval = null;
+        this.uiState = 'ready';
+        this.eventSource = null;
+        this.nodes = new Map();  // Current graph by node id, kept up to date by the event stream
+        this.graphRun = null;  // Run and graph version the nodes reflect
+        this.graphVersion = null;
+        this.graphReloads = 0;
+        this.pendingEvents = null;  // Node events held back while the graph is reloaded
+        this.renderTimer = null;
+        this.archiveJobId = null;  // Archive job started by a stop, followed through job events
         this.baseURL = window.location.origin;
         
         this.init();
@@ -40,6 +52,9 @@ class GOTAIApp {
         // Initial status check and load archives
         this.updateStatus();
         this.loadArchives();
+
+        // Graph changes are pushed by the server from now on
+        this.connectEvents();
         
         console.log('GOT-AI Frontend initialized');
     }
@@ -80,7 +95,6 @@ class GOTAIApp {
             
             this.isRunning = true;
             this.setUIState('running');
-            this.startPeriodicUpdates();
             
         } catch (error) {
             console.error('Error starting analysis:', error);
@@ -113,25 +127,10 @@ class GOTAIApp {
             }
             
             const data = await response.json();
-            console.log('Analysis stopped:', data);
+            console.log('Archive job started:', data);
             
-            // Show success message
-            if (runName && data.archive_name) {
-                this.showSuccess(`Analysis archived as "${runName}". ${data.nodes_archived} nodes saved.`);
-            } else {
-                this.showSuccess('Analysis stopped. Data cleared for fresh start.');
-            }
-            
-            this.isRunning = false;
-            this.setUIState('ready');
-            this.stopPeriodicUpdates();
-            
-            // Clear inputs for fresh start
-            this.clearInputs();
-            
-            // Refresh graph and archives
-            this.updateGraph();
-            this.loadArchives();
+            // The archive is written in the background; job events report its progress
+            this.followArchiveJob(data.job);
             
         } catch (error) {
             console.error('Error stopping analysis:', error);
@@ -139,6 +138,59 @@ class GOTAIApp {
             this.setUIState('ready');
         }
     }
+
+    followArchiveJob(job) {
+        if (job.status === 'done' || job.status === 'failed') {
+            if (job.id === this.archiveJobId) {
+                this.finishArchiveJob(job);
+            }
+            return;
+        }
+
+        this.archiveJobId = job.id;
+        if (this.uiState !== 'stopping') {
+            this.setUIState('stopping');
+        }
+        const statusElement = document.getElementById('status');
+        const percent = Math.round((job.progress || 0) * 100);
+        statusElement.textContent = job.stage ? `Archiving: ${job.stage} (${percent}%)` : 'Stopping & Archiving...';
+    }
+
+    finishArchiveJob(job) {
+        this.archiveJobId = null;
+        const result = job.result || {};
+
+        if (job.status === 'failed' || result.error) {
+            this.showError('Failed to archive analysis: ' + (job.error || result.error));
+        } else if (result.archive_name) {
+            this.showSuccess(`${result.message}. ${result.nodes_archived} nodes saved.`);
+        } else {
+            this.showSuccess('Analysis stopped. Data cleared for fresh start.');
+        }
+
+        this.isRunning = false;
+        this.setUIState('ready');
+
+        // Clear inputs for fresh start
+        this.clearInputs();
+
+        // Refresh graph and archives
+        this.updateGraph();
+        this.loadArchives();
+    }
+
+    async checkArchiveJob() {
+        // Job events sent while the stream was disconnected are gone, so ask for the job itself
+        if (!this.archiveJobId) return;
+        try {
+            const response = await fetch(`${this.baseURL}/api/jobs/${this.archiveJobId}`);
+            if (response.ok) {
+                this.followArchiveJob(await response.json());
+            }
+        } catch (error) {
+            console.error('Error checking archive job:', error);
+        }
+    }
     
     async clearData() {
         const confirm_clear = confirm('This will permanently clear all current analysis data. Are you sure?');
@@ -293,15 +345,13 @@ class GOTAIApp {
             // Update UI elements
             document.getElementById('node-count').textContent = status.total_nodes;
             
-            if (status.is_running !== this.isRunning) {
+            if (status.archive_job) {
+                this.followArchiveJob(status.archive_job);
+            } else if (this.archiveJobId) {
+                this.checkArchiveJob();
+            } else if (status.is_running !== this.isRunning) {
                 this.isRunning = status.is_running;
                 this.setUIState(status.is_running ? 'running' : 'ready');
-                
-                if (status.is_running && !this.updateInterval) {
-                    this.startPeriodicUpdates();
-                } else if (!status.is_running && this.updateInterval) {
-                    this.stopPeriodicUpdates();
-                }
             }
             
         } catch (error) {
@@ -310,17 +360,139 @@ class GOTAIApp {
     }
     
     async updateGraph() {
+        // Events that arrive during the fetch are held back and applied on top of the fetched graph
+        const reload = ++this.graphReloads;
+        if (!this.pendingEvents) this.pendingEvents = [];
         try {
             console.log('updateGraph called');
-            const response = await fetch(`${this.baseURL}/api/graph_data`);
-            
-            if (!response.ok) {
-                throw new Error(`HTTP error! status: ${response.status}`);
+            const nodes = new Map();
+            let snapshot = null;
+            let cursor = null;
+            do {
+                const params = new URLSearchParams({fields: GRAPH_FIELDS, limit: GRAPH_PAGE_SIZE});
+                if (cursor) params.set('cursor', cursor);
+                const response = await fetch(`${this.baseURL}/api/graph_data?${params}`);
+
+                if (!response.ok) {
+                    throw new Error(`HTTP error! status: ${response.status}`);
+                }
+
+                const graphData = await response.json();
+                console.log('Graph data received:', graphData.nodes.length, 'nodes');
+                // Later pages can only be newer, so the first page's version is what the whole graph reflects
+                if (!snapshot) snapshot = { run: graphData.run, version: graphData.version };
+                graphData.nodes.forEach(node => nodes.set(node.id, node));
+                cursor = graphData.next_cursor;
+            } while (cursor);
+
+            // A reload started meanwhile replaces this one
+            if (reload !== this.graphReloads) return;
+            // Keep the node objects already shown so the layout doesn't jump
+            nodes.forEach((node, id) => {
+                const existing = this.nodes.get(id);
+                if (existing) nodes.set(id, Object.assign(existing, node));
+            });
+            this.nodes = nodes;
+            this.graphRun = snapshot.run;
+            this.graphVersion = snapshot.version;
+        } catch (error) {
+            console.error('Error updating graph:', error);
+            if (reload !== this.graphReloads) return;
+        }
+
+        const pending = this.pendingEvents;
+        this.pendingEvents = null;
+        pending.forEach(data => this.applyNodeEvent(data));
+        this.renderGraph(this.buildGraphData());
+    }
+
+    applyNodeEvent(data) {
+        // Events of another run, or older than the graph shown, would undo newer state
+        if (this.graphRun !== null && data.run !== this.graphRun) return;
+        if (this.graphVersion !== null && data.version < this.graphVersion) return;
+        this.graphVersion = data.version;
+        data.nodes.forEach(node => {
+            const existing = this.nodes.get(node.id);
+            this.nodes.set(node.id, existing ? Object.assign(existing, node) : node);
+        });
+    }
+
+    connectEvents() {
+        // EventSource reconnects by itself and sends the last event id, so no change is missed
+        if (this.eventSource) {
+            this.eventSource.close();
+        }
+        this.eventSource = new EventSource(`${this.baseURL}/api/events`);
+
+        // A new connection, a new run or a client that fell too far behind reloads the whole graph
+        this.eventSource.addEventListener('reset', () => {
+            this.updateStatus();
+            this.updateGraph();
+        });
+
+        ['node-added', 'node-updated', 'pruned'].forEach(type => {
+            this.eventSource.addEventListener(type, (event) => {
+                const data = JSON.parse(event.data);
+                if (this.pendingEvents) {
+                    this.pendingEvents.push(data);
+                    return;
+                }
+                this.applyNodeEvent(data);
+                document.getElementById('node-count').textContent = this.nodes.size;
+                this.scheduleRender();
+            });
+        });
+
+        this.eventSource.addEventListener('cycle', (event) => {
+            const cycle = JSON.parse(event.data);
+            document.getElementById('node-count').textContent = cycle.total_nodes;
+            if (!this.isRunning && this.uiState !== 'stopping') {
+                this.isRunning = true;
+                this.setUIState('running');
             }
-            
-            const graphData = await response.json();
-            console.log('Graph data received:', graphData);
-            
+        });
+
+        this.eventSource.addEventListener('job', (event) => {
+            const job = JSON.parse(event.data);
+            if (job.kind === 'archive') {
+                this.followArchiveJob(job);
+            }
+        });
+
+        this.eventSource.addEventListener('run-finished', () => {
+            // While stopping, the archive job decides what happens next
+            if (this.uiState !== 'stopping') {
+                this.isRunning = false;
+                this.setUIState('ready');
+            }
+        });
+    }
+
+    scheduleRender() {
+        // Events arrive in bursts; draw at most a few times per second
+        if (this.renderTimer) return;
+        this.renderTimer = setTimeout(() => {
+            this.renderTimer = null;
+            this.renderGraph(this.buildGraphData());
+        }, 200);
+    }
+
+    buildGraphData() {
+        const nodes = Array.from(this.nodes.values());
+        const links = [];
+        nodes.forEach(node => {
+            // Merged thoughts have one link per parent
+            [node.parent_id, ...(node.extra_parent_ids || [])].forEach(parentId => {
+                if (parentId) {
+                    links.push({ source: parentId, target: node.id, value: node.score });
+                }
+            });
+        });
+        return { nodes, links };
+    }
+
+    renderGraph(graphData) {
+        try {
             // Store for re-rendering when options change
             window.lastGraphData = graphData;
             
@@ -360,7 +532,7 @@ class GOTAIApp {
             }
             
         } catch (error) {
-            console.error('Error updating graph:', error);
+            console.error('Error rendering graph:', error);
         }
     }
     
@@ -482,6 +654,7 @@ class GOTAIApp {
     }
     
     setUIState(state) {
+        this.uiState = state;
         const startBtn = document.getElementById('start-btn');
         const stopBtn = document.getElementById('stop-btn');
         const statusElement = document.getElementById('status');
@@ -524,28 +697,6 @@ class GOTAIApp {
         }
     }
     
-    startPeriodicUpdates() {
-        if (this.updateInterval) {
-            clearInterval(this.updateInterval);
-        }
-        
-        // Update immediately
-        this.updateGraph();
-        
-        // Then update every 3 seconds
-        this.updateInterval = setInterval(() => {
-            this.updateStatus();
-            this.updateGraph();
-        }, 3000);
-    }
-    
-    stopPeriodicUpdates() {
-        if (this.updateInterval) {
-            clearInterval(this.updateInterval);
-            this.updateInterval = null;
-        }
-    }
-    
     showError(message) {
         // Simple alert for now - in production, use a better notification system
         alert('Error: ' + message);
@@ -579,9 +730,23 @@ class GOTAIApp {
         }
     }
     
-    showNodeDetails(node) {
+    async showNodeDetails(node) {
         const nodeDetailsContainer = document.getElementById('node-details');
         if (!nodeDetailsContainer) return;
+
+        // The graph is loaded without node text, so fetch it the first time a node is opened
+        if (node.text === undefined) {
+            try {
+                const response = await fetch(`${this.baseURL}/api/node/${encodeURIComponent(node.id)}`);
+                if (!response.ok) {
+                    throw new Error(`HTTP error! status: ${response.status}`);
+                }
+                node.text = (await response.json()).text;
+            } catch (error) {
+                console.error('Error loading node details:', error);
+                node.text = '';
+            }
+        }
         
         const truncateText = (text, maxLength = 200) => {
             if (text.length <= maxLength) return text;
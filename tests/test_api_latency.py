@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Test that blocking work in the API runs off the event loop: status polls stay fast while a slow
+archive job started by a stop request is in progress.
+"""
+import os
+import sys
+import time
+import asyncio
+import tempfile
+
+# Add the backend directory to Python path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'backend'))
+
+from app import config
+
+ARCHIVE_SECONDS = 2.0
+
+def test_api_latency():
+    print("=== API Latency Test ===")
+
+    import httpx
+    from app import api
+    from app.core import archive_manager as archive_module
+    from app.db.vector_store import VectorStore
+    from app.db.data_models import Node
+
+    saved_globals = (api.vector_store_client, archive_module.vector_store_client,
+                     api.archive_manager.archive_base_path)
+    saved_config = (config.VECTOR_DB_PATH, config.ARCHIVE_BASE_PATH, config.VECTOR_STORE_WARMUP_ENABLED)
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        # Keep the test away from the live database and archives
+        config.VECTOR_DB_PATH = os.path.join(tmp_dir, "db_data")
+        config.ARCHIVE_BASE_PATH = os.path.join(tmp_dir, "archive")
+        config.VECTOR_STORE_WARMUP_ENABLED = False
+        store = VectorStore()
+        try:
+            store.use_run_collection("latency-test")
+            store.add_node(Node(trajectory_id="root", text="Root", score=0.5, cumulative_score=0.5,
+                                embedding=[1.0, 0.0]))
+            api.vector_store_client = store
+            archive_module.vector_store_client = store
+            api.archive_manager.archive_base_path = config.ARCHIVE_BASE_PATH
+            os.makedirs(config.ARCHIVE_BASE_PATH, exist_ok=True)
+
+            # Copying the database of a big run takes a while
+            def slow_copy(archive_path, progress=None):
+                time.sleep(ARCHIVE_SECONDS)
+            api.archive_manager._archive_database_files = slow_copy
+
+            job, stop_seconds, latencies = asyncio.run(stop_and_poll(api))
+            assert job["status"] == "done" and job["result"]["nodes_archived"] == 1
+            assert stop_seconds >= ARCHIVE_SECONDS and len(latencies) >= 5
+            print(f"Stop and archive took {stop_seconds:.2f}s; {len(latencies)} status polls, "
+                  f"slowest {max(latencies) * 1000:.0f} ms")
+            assert max(latencies) < 0.5
+            print("✓ Status polls are answered while an archive is being written")
+        finally:
+            # The instance attribute shadowed the class's copy method
+            vars(api.archive_manager).pop("_archive_database_files", None)
+            (api.vector_store_client, archive_module.vector_store_client,
+             api.archive_manager.archive_base_path) = saved_globals
+            config.VECTOR_DB_PATH, config.ARCHIVE_BASE_PATH, config.VECTOR_STORE_WARMUP_ENABLED = saved_config
+            if store._reaper is not None:
+                store._reaper.join(timeout=30)
+            store.close()
+
+    print("\n=== Test completed ===")
+
+async def stop_and_poll(api):
+    """Stop the run and poll the status until its archive job is finished"""
+    import httpx
+    transport = httpx.ASGITransport(app=api.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://testserver") as client:
+        started = time.perf_counter()
+        stop = await client.post("/api/stop", json={"run_name": "latency"})
+        assert stop.status_code == 200
+        status_url = stop.json()["status_url"]
+        await asyncio.sleep(0.2)
+
+        latencies = []
+        while True:
+            poll_started = time.perf_counter()
+            response = await client.get("/api/status")
+            assert response.status_code == 200
+            latencies.append(time.perf_counter() - poll_started)
+            job = (await client.get(status_url)).json()
+            if job["status"] in ("done", "failed"):
+                return job, time.perf_counter() - started, latencies
+            await asyncio.sleep(0.1)
+
+if __name__ == "__main__":
+    test_api_latency()
@@ -0,0 +1,207 @@
+#!/usr/bin/env python3
+"""
+Test archive jobs: /api/stop returns a job at once, the archive runs in the background with its progress
+reported by /api/jobs/{id} and job events, and the run can't be restarted or cleared until it's done.
+"""
+import os
+import sys
+import time
+import threading
+import tempfile
+
+# Add the backend directory to Python path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'backend'))
+
+from app import config
+
+def test_archive_jobs():
+    print("=== Archive Jobs Test ===")
+    from fastapi.testclient import TestClient
+    from app import api
+    from app.core import archive_manager as archive_module
+    from app.core.archive_manager import ArchiveManager
+    from app.core.jobs import JobManager
+    from app.core.events import graph_events
+    from app.db.vector_store import VectorStore
+    from app.db.data_models import Node
+
+    saved_globals = (api.vector_store_client, archive_module.vector_store_client,
+                     api.archive_manager.archive_base_path)
+    saved_config = (config.VECTOR_DB_PATH, config.ARCHIVE_BASE_PATH, config.VECTOR_STORE_WARMUP_ENABLED)
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        # Keep the test away from the live database and archives
+        config.VECTOR_DB_PATH = os.path.join(tmp_dir, "db_data")
+        config.ARCHIVE_BASE_PATH = os.path.join(tmp_dir, "archive")
+        config.VECTOR_STORE_WARMUP_ENABLED = False
+        store = VectorStore()
+        try:
+            store.use_run_collection("jobs-test")
+            store.add_node(Node(trajectory_id="root", text="Root", score=0.5, cumulative_score=0.5,
+                                embedding=[1.0, 0.0]))
+            api.vector_store_client = store
+            archive_module.vector_store_client = store
+            api.archive_manager.archive_base_path = config.ARCHIVE_BASE_PATH
+            os.makedirs(config.ARCHIVE_BASE_PATH, exist_ok=True)
+            client = TestClient(api.app)
+
+            print("\n--- Job manager ---")
+            jobs = JobManager(max_finished=2)
+
+            def wait_for(job):
+                for _ in range(100):
+                    job = jobs.get(job["id"])
+                    if job["status"] in ("done", "failed"):
+                        return job
+                    time.sleep(0.05)
+                raise AssertionError(f"Job {job['id']} did not finish")
+
+            def failing(progress):
+                progress("working", 0.5)
+                raise RuntimeError("disk full")
+
+            failed = wait_for(jobs.submit("test", failing))
+            assert failed["status"] == "failed" and failed["error"] == "disk full" and failed["stage"] == "working"
+            print("✓ A failing job is reported as failed with its error")
+
+            finished = [wait_for(jobs.submit("test", lambda progress, n: n * 2, n)) for n in range(3)]
+            assert [job["result"] for job in finished] == [0, 2, 4] and finished[-1]["progress"] == 1.0
+            # Finished jobs beyond max_finished are forgotten, oldest first, when a new job is queued
+            assert jobs.get(failed["id"]) is None and len(jobs.list_jobs()) == 3
+            print("✓ Jobs return their results, and old finished jobs are forgotten")
+
+            gate = threading.Event()
+            submitted = []
+            submitters = [threading.Thread(target=lambda: submitted.append(
+                jobs.submit_unique("unique", lambda progress: gate.wait(10)))) for _ in range(8)]
+            for thread in submitters:
+                thread.start()
+            for thread in submitters:
+                thread.join()
+            assert len({job["id"] for job in submitted}) == 1
+            gate.set()
+            wait_for(submitted[0])
+            assert jobs.submit_unique("unique", lambda progress: None)["id"] != submitted[0]["id"]
+            print("✓ Concurrent unique submits queue one job, and a finished job doesn't block the next")
+
+            print("\n--- Stop returns at once ---")
+            release = threading.Event()
+            # Bind the class's copy method, not whatever an earlier test left on the instance
+            real_copy = ArchiveManager._archive_database_files
+
+            def held_copy(archive_path, progress=None):
+                release.wait(10)
+                real_copy(api.archive_manager, archive_path, progress=progress)
+            api.archive_manager._archive_database_files = held_copy
+
+            cursor = graph_events.cursor()
+            started = time.perf_counter()
+            response = client.post("/api/stop", json={"run_name": "jobs"})
+            assert response.status_code == 200 and time.perf_counter() - started < 1.0
+            job_id = response.json()["job_id"]
+            assert response.json()["status_url"] == f"/api/jobs/{job_id}"
+            assert client.post("/api/stop", json={"run_name": "jobs"}).json()["job_id"] == job_id
+            print("✓ Stop returns a job id before the archive is written, and a second stop returns the same job")
+
+            assert client.get("/api/status").json()["archive_job"]["id"] == job_id
+            start = {"hypothesis": "Test", "max_depth": 2, "max_nodes": 5}
+            assert client.post("/api/start", json=start).status_code == 409
+            assert client.post("/api/clear").status_code == 409
+            print("✓ Starting or clearing is refused while the archive job runs")
+
+            release.set()
+            for _ in range(100):
+                job = client.get(f"/api/jobs/{job_id}").json()
+                if job["status"] in ("done", "failed"):
+                    break
+                time.sleep(0.1)
+            assert job["status"] == "done" and job["progress"] == 1.0, job
+            assert job["result"]["nodes_archived"] == 1
+            assert os.path.exists(os.path.join(config.ARCHIVE_BASE_PATH, job["result"]["archive_name"], "database"))
+            assert client.get("/api/status").json()["archive_job"] is None
+            assert client.get("/api/jobs/unknown").status_code == 404
+            print(f"✓ The job finished and archived {job['result']['nodes_archived']} node")
+
+            events, _ = graph_events.events_since(cursor)
+            updates = [e["data"] for e in events if e["type"] == "job" and e["data"]["id"] == job_id]
+            stages = [u["stage"] for u in updates]
+            assert [u["status"] for u in updates][0] == "queued" and updates[-1]["status"] == "done"
+            assert "copying database" in stages and "clearing run" in stages
+            progress = [u["progress"] for u in updates]
+            assert progress == sorted(progress)
+            print(f"✓ {len(updates)} job events through stages {sorted(set(s for s in stages if s))}")
+
+        finally:
+            vars(api.archive_manager).pop("_archive_database_files", None)
+            (api.vector_store_client, archive_module.vector_store_client,
+             api.archive_manager.archive_base_path) = saved_globals
+            config.VECTOR_DB_PATH, config.ARCHIVE_BASE_PATH, config.VECTOR_STORE_WARMUP_ENABLED = saved_config
+            if store._reaper is not None:
+                store._reaper.join(timeout=30)
+            store.close()
+
+    print("\n=== Test completed ===")
+
+def test_stop_waits_for_the_loop():
+    print("\n=== Stop Waits For The Loop Test ===")
+    from app.core import orchestrator as orchestrator_module
+    from app.core.checkpoint import CheckpointManager
+    from app.llm.journal import RunJournal, run_journal
+    from app.llm.llm_interface import llm_client
+    from app.db.vector_store import VectorStore
+
+    saved_globals = (orchestrator_module.vector_store_client, orchestrator_module.checkpoint_manager)
+    saved_config = (config.VECTOR_DB_PATH, config.CYCLE_PAUSE_SECONDS, config.EXPANSION_MODE)
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        config.VECTOR_DB_PATH = os.path.join(tmp_dir, "db_data")
+        store = VectorStore()
+        journal_path = os.path.join(tmp_dir, "run.jsonl.gz")
+        journal = RunJournal()
+        journal.start_recording(journal_path, {"hypothesis": "Slow"})
+        journal.record_embeddings(["Slow"], [[1.0, 0.0]])
+        journal.close()
+
+        # A cycle held in an LLM call for longer than stop used to wait
+        entered, release = threading.Event(), threading.Event()
+        orchestrator = orchestrator_module.Orchestrator()
+        def slow_cycle():
+            entered.set()
+            release.wait(10)
+            return True
+        orchestrator._run_cycle = slow_cycle
+        try:
+            orchestrator_module.vector_store_client = store
+            orchestrator_module.checkpoint_manager = CheckpointManager(os.path.join(tmp_dir, "checkpoints"))
+            config.CYCLE_PAUSE_SECONDS = 0
+            config.EXPANSION_MODE = "local"
+
+            run_journal.start_replay(journal_path)
+            orchestrator.start_analysis("Slow", max_depth=1, max_nodes=100, seed=1)
+            assert entered.wait(5)
+            stopper = threading.Thread(target=orchestrator.stop_analysis)
+            stopper.start()
+            stopper.join(5.5)
+            assert stopper.is_alive() and orchestrator.current_thread.is_alive()
+            print("✓ Stop is still waiting while the cycle in progress outlasts the old timeout")
+
+            release.set()
+            stopper.join(10)
+            assert not stopper.is_alive() and not orchestrator.current_thread.is_alive()
+            assert orchestrator.stop_reason == "stopped" and not orchestrator.is_running
+            print("✓ Stop returns once the loop has exited, so nothing of it reaches the next run")
+        finally:
+            # The loop must be gone before the live store is put back
+            release.set()
+            orchestrator.stop_analysis()
+            run_journal.close()
+            llm_client.budget = None
+            (orchestrator_module.vector_store_client, orchestrator_module.checkpoint_manager) = saved_globals
+            config.VECTOR_DB_PATH, config.CYCLE_PAUSE_SECONDS, config.EXPANSION_MODE = saved_config
+            if store._reaper is not None:
+                store._reaper.join(timeout=30)
+            store.close()
+
+    print("\n=== Test completed ===")
+
+if __name__ == "__main__":
+    test_archive_jobs()
+    test_stop_waits_for_the_loop()
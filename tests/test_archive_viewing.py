@@ -33,16 +33,9 @@ def test_archive_viewing():
                     print("✅ Archive loaded successfully")
                     print(f"   Success: {archive_data['success']}")
                     print(f"   Total nodes: {archive_data['total_nodes']}")
-                    print(f"   Total links: {archive_data['total_links']}")
+                    print(f"   Total links: {len(archive_data['links'])}")
                     print(f"   Metadata keys: {list(archive_data['metadata'].keys())}")
                     
-                    # Check if graph data is present
-                    if 'graph_data' in archive_data and archive_data['graph_data']:
-                        graph_nodes = len(archive_data['graph_data'].get('nodes', []))
-                        graph_links = len(archive_data['graph_data'].get('links', []))
-                        print(f"   Graph nodes: {graph_nodes}")
-                        print(f"   Graph links: {graph_links}")
-                    
                     # Check if nodes data is present
                     if 'nodes' in archive_data:
                         print(f"   Node details available: {len(archive_data['nodes'])} nodes")
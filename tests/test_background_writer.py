@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+Test the vector store's writer thread: flushing doesn't wait for the database, reads see every earlier
+write without waiting for the writer, the queue is bounded, and failed writes are kept for the next flush.
+"""
+import os
+import sys
+import tempfile
+import threading
+
+# Add the backend directory to Python path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'backend'))
+
+from app import config
+
+def test_background_writer():
+    print("=== Background Writer Test ===")
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        # Keep the test away from the live database
+        config.VECTOR_DB_PATH = os.path.join(tmp_dir, "db_data")
+        config.WRITE_QUEUE_MAX_BATCHES = 1
+        from app.db.vector_store import VectorStore
+        from app.db.data_models import Node
+
+        store = VectorStore()
+        store.use_run_collection("writer-test")
+        release = threading.Event()
+        upsert_nodes = store.graph.upsert_nodes
+        def slow_upsert(run, nodes):
+            release.wait(10)
+            upsert_nodes(run, nodes)
+        store.graph.upsert_nodes = slow_upsert
+
+        print("\n--- Flushing without waiting ---")
+        first = Node(trajectory_id="t1", text="First", embedding=[1.0, 0.0])
+        store.add_node(first)
+        store.flush_async()
+        assert store._written == 0
+        print("✓ flush_async returns while the writer is still busy")
+
+        store.add_node(Node(trajectory_id="t1", text="Second", embedding=[0.0, 1.0]))
+        store.flush_async()  # Waits in the queue
+        store.add_node(Node(trajectory_id="t1", text="Third", embedding=[1.0, 1.0]))
+        blocked = threading.Thread(target=store.flush_async)
+        blocked.start()
+        blocked.join(0.3)
+        assert blocked.is_alive()
+        print("✓ Flushing blocks once WRITE_QUEUE_MAX_BATCHES batches are waiting")
+
+        assert store.get_node_by_id(first.id).text == "First" and store.count_nodes() == 3
+        assert [n.text for n in store.get_all_nodes_for_graph()] == ["First", "Second", "Third"]
+        assert store._written == 0
+        print("✓ Reads see queued writes without waiting for the writer, even while flushing blocks")
+
+        release.set()
+        blocked.join(10)
+        store.flush()
+
+        print("\n--- Reads while the writer is busy ---")
+        def snapshot():
+            return {
+                "all": [n.model_dump() for n in store.get_all_nodes_for_graph()],
+                "count": store.count_nodes(),
+                "top": [n.text for n in store.get_top_nodes(2)],
+                "open": [n.text for n in store.get_nodes(where={"is_fully_explored": False})],
+                "children": [n.model_dump() for n in store.get_children(first.id)],
+                "path": [n.text for n in store.get_path(child.id)],
+                "duplicate": store.find_duplicate(Node(trajectory_id="t2", text="Child again", embedding=[0.6, 0.8])).id,
+                "stats": store.get_graph_stats()
+            }
+
+        release.clear()
+        child = Node(parent_id=first.id, trajectory_id="t1", text="Child", depth=1, score=5.0, cumulative_score=5.0,
+                     embedding=[0.6, 0.8])
+        store.add_node(child)
+        store.update_node_state([first.id], {"is_fully_explored": True, "cumulative_score": 1.0})
+        written = store._written
+        store.flush_async()
+        store.update_node_state([child.id], {"is_pruned": True})
+        buffered = snapshot()
+        assert store._written == written
+        assert [n["text"] for n in buffered["all"]] == ["First", "Second", "Third", "Child"]
+        assert buffered["count"] == 4 and buffered["top"] == ["Child", "First"]
+        assert buffered["open"] == ["Second", "Third", "Child"]
+        assert [n["text"] for n in buffered["children"]] == ["Child"] and buffered["children"][0]["is_pruned"]
+        assert buffered["path"] == ["First", "Child"] and buffered["duplicate"] == child.id
+        assert store.get_node_by_id(child.id).embedding is None
+        print("✓ Queued and buffered writes are laid over the stored nodes")
+
+        release.set()
+        store.flush()
+        assert snapshot() == buffered
+        print("✓ Reads return the same once the writer has stored them")
+
+        print("\n--- Failed writes ---")
+        update_nodes = store.graph.update_nodes
+        def failing_update(run, node_ids, fields):
+            store.graph.update_nodes = update_nodes
+            raise RuntimeError("database is locked")
+        store.graph.update_nodes = failing_update
+        store.update_node_state([first.id], {"is_pruned": True})
+        try:
+            store.flush()
+            assert False, "Expected the failed write to be raised"
+        except RuntimeError:
+            pass
+        store.update_node_state([first.id], {"score": 3.0})
+        assert store._pending_state[first.id] == {"is_pruned": True, "score": 3.0}
+        stored = store.get_node_by_id(first.id)
+        assert stored.is_pruned and stored.score == 3.0
+        print("✓ A failed write is raised by flush and retried by the next one")
+
+        store.close()
+        assert store._writer is None
+        print("✓ Closing drains the queue and stops the writer")
+
+    config.WRITE_QUEUE_MAX_BATCHES = 8
+    print("\n=== Test completed ===")
+
+if __name__ == "__main__":
+    test_background_writer()
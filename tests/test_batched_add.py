@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+Test batched node inserts: add_nodes embeds a whole batch with one encode call, and thoughts that repeat
+each other within one batch are merged instead of stored twice.
+"""
+import os
+import sys
+import zlib
+import tempfile
+import numpy as np
+
+# Add the backend directory to Python path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'backend'))
+
+from app import config
+
+class CountingModel:
+    """Embeds a text as a random unit vector seeded by the text and records every encode call"""
+
+    def __init__(self):
+        self.calls = []
+
+    def encode(self, texts, batch_size=None):
+        self.calls.append(list(texts))
+        vectors = [np.random.default_rng(zlib.crc32(text.encode())).normal(size=16) for text in texts]
+        return np.array([v / np.linalg.norm(v) for v in vectors])
+
+def test_batched_add():
+    print("=== Batched Add Test ===")
+    from app.core import orchestrator as orchestrator_module
+    from app.db.vector_store import VectorStore
+    from app.db.data_models import Node
+
+    saved_store = orchestrator_module.vector_store_client
+    saved_config = (config.VECTOR_DB_PATH, config.EMBEDDING_CACHE_ENABLED, config.DEDUP_ENABLED)
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        config.VECTOR_DB_PATH = os.path.join(tmp_dir, "db_data")
+        store = VectorStore()
+        try:
+            store.use_run_collection("batched-add-test")
+            orchestrator_module.vector_store_client = store
+            # Every text must reach the model so the encode calls can be counted
+            config.EMBEDDING_CACHE_ENABLED = False
+            config.DEDUP_ENABLED = True
+            model = CountingModel()
+            store._embedding_model = model
+
+            print("\n--- One encode call per batch ---")
+            root = Node(trajectory_id="root", text="Root")
+            children = [Node(parent_id=root.id, trajectory_id=f"t{i}", text=f"Child {i}", depth=1) for i in range(8)]
+            store.add_nodes([root] + children)
+            assert model.calls == [["Root"] + [f"Child {i}" for i in range(8)]]
+            assert all(n.embedding is not None for n in children)
+            store.flush()
+            assert store.count_nodes() == 9
+            print("✓ Nine nodes embedded with a single encode call")
+
+            store.add_nodes(children)
+            assert len(model.calls) == 1
+            print("✓ Nodes that already carry an embedding are not encoded again")
+
+            print("\n--- Repeats within a batch ---")
+            orchestrator = orchestrator_module.Orchestrator()
+            a, b = children[0], children[1]
+            batch = [
+                Node(parent_id=a.id, trajectory_id="t", text="Shared idea", depth=2),
+                Node(parent_id=b.id, trajectory_id="t", text="Shared idea", depth=2),
+                Node(parent_id=a.id, trajectory_id="t", text="Shared idea", depth=2),
+                Node(parent_id=a.id, trajectory_id="t", text="Other idea", depth=2)
+            ]
+            inserted = orchestrator._store_new_nodes(batch)
+            assert len(model.calls) == 2 and model.calls[1] == [n.text for n in batch]
+            assert [n.id for n in inserted] == [batch[0].id, batch[3].id]
+            store.flush()
+            assert store.count_nodes() == 11
+            assert store.get_node_by_id(batch[0].id).extra_parent_ids == [b.id]
+            print("✓ The batch is embedded once; a repeat from another parent becomes an extra parent link "
+                  "and a repeat from the same parent is dropped")
+        finally:
+            orchestrator_module.vector_store_client = saved_store
+            config.VECTOR_DB_PATH, config.EMBEDDING_CACHE_ENABLED, config.DEDUP_ENABLED = saved_config
+            if store._reaper is not None:
+                store._reaper.join(timeout=30)
+            store.close()
+
+    print("\n=== Test completed ===")
+
+if __name__ == "__main__":
+    test_batched_add()
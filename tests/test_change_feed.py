@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Test the graph change feed: every write takes a new graph version and readers fetch only the nodes
+inserted or updated after the version they last saw.
+"""
+import os
+import sys
+import tempfile
+
+# Add the backend directory to Python path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'backend'))
+
+from app import config
+
+def test_change_feed():
+    print("=== Change Feed Test ===")
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        from app.db.graph_store import GraphStore
+        from app.db.data_models import Node
+
+        graph = GraphStore(os.path.join(tmp_dir, "graph.sqlite3"))
+        assert graph.get_version() == 0
+        root = Node(trajectory_id="root", text="Root")
+        a = Node(parent_id=root.id, trajectory_id="a", text="A", depth=1)
+        graph.upsert_nodes("run_1", [root, a])
+        first = graph.changes_since("run_1", 0)
+        assert first["version"] == 1 and graph.get_version() == 1
+        assert [n.text for n in first["inserted"]] == ["Root", "A"] and first["updated"] == []
+        print("✓ A reader starting at 0 gets the whole run as inserts")
+
+        b = Node(parent_id=root.id, trajectory_id="b", text="B", depth=1)
+        graph.upsert_nodes("run_1", [b])
+        graph.update_nodes("run_1", [a.id], [{"is_pruned": True}])
+        graph.update_nodes("run_1", [b.id], [{"extra_parent_ids": [a.id]}])
+        changes = graph.changes_since("run_1", first["version"])
+        assert changes["version"] == 4
+        assert [n.text for n in changes["inserted"]] == ["B"]
+        assert changes["inserted"][0].extra_parent_ids == [a.id]
+        assert [n.text for n in changes["updated"]] == ["A"] and changes["updated"][0].is_pruned
+        print("✓ Later reads return only new and changed nodes, in write order")
+
+        graph.upsert_nodes("run_1", [root.copy(update={"score": 2.0})])
+        changes = graph.changes_since("run_1", 4)
+        assert changes["inserted"] == [] and [n.score for n in changes["updated"]] == [2.0]
+        assert graph.changes_since("run_1", changes["version"])["inserted"] == []
+        print("✓ Replacing a node counts as an update, and an up-to-date reader gets nothing")
+
+        graph.upsert_nodes("run_2", [Node(trajectory_id="root", text="Other run")])
+        assert graph.changes_since("run_1", changes["version"])["updated"] == []
+        print("✓ Writes to another run advance the version without showing up in this run")
+
+    print("\n--- Through the vector store ---")
+    saved_db_path = config.VECTOR_DB_PATH
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        config.VECTOR_DB_PATH = os.path.join(tmp_dir, "db_data")
+        from app.db.vector_store import VectorStore
+        from app.db.data_models import Node
+
+        store = VectorStore()
+        try:
+            store.use_run_collection("feed")
+            root = Node(trajectory_id="root", text="Root", embedding=[1.0, 0.0])
+            store.add_nodes([root])
+            assert store.get_version() == 0 and store.changes_since(0)["inserted"] == []
+            store.flush()
+            version = store.get_version()
+            assert [n.text for n in store.changes_since(0)["inserted"]] == ["Root"]
+
+            store.add_nodes([Node(parent_id=root.id, trajectory_id="t", text="Child", depth=1, embedding=[0.0, 1.0])])
+            store.update_node_state([root.id], {"is_fully_explored": True})
+            assert store.changes_since(version)["inserted"] == []
+            store.flush()
+            changes = store.changes_since(version)
+            assert [n.text for n in changes["inserted"]] == ["Child"]
+            assert [n.text for n in changes["updated"]] == ["Root"] and changes["updated"][0].is_fully_explored
+            print("✓ The feed reports written versions and never waits for buffered writes")
+        finally:
+            config.VECTOR_DB_PATH = saved_db_path
+            if store._reaper is not None:
+                store._reaper.join(timeout=30)
+            store.close()
+
+    print("\n=== Test completed ===")
+
+if __name__ == "__main__":
+    test_change_feed()
@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+"""
+Test checkpoints and resume: checkpoints are written atomically, and a run that crashes mid-expansion
+resumes from its latest checkpoint with its cycle count and budget, without redoing a finished expansion.
+The LLM and the embedding model are played back from a synthetic run journal.
+"""
+import os
+import sys
+import tempfile
+import numpy as np
+
+# Add the backend directory to Python path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'backend'))
+
+from app import config
+
+HYPOTHESIS = "Cheap solar power will reshape heavy industry"
+
+class Crash(BaseException):
+    """Stands in for the process dying; the orchestrator only catches Exception"""
+
+def write_journal(path, depth=2):
+    """Journal a run in which every node gets one child per question of the battery"""
+    from app.llm.journal import RunJournal
+    rng = np.random.default_rng(0)
+    journal = RunJournal()
+    journal.start_recording(path, {"hypothesis": HYPOTHESIS, "max_depth": depth, "max_nodes": 100, "seed": 7})
+
+    def embedding():
+        vector = rng.normal(size=16)
+        return (vector / np.linalg.norm(vector)).tolist()
+
+    journal.record_embeddings([HYPOTHESIS], [embedding()])
+    frontier, count = [HYPOTHESIS], 0
+    for _ in range(depth):
+        children = []
+        for statement in frontier:
+            for question in config.INTERROGATIVE_BATTERY:
+                count += 1
+                text = f"Outcome {count}: {question.lower()} for {statement[:30]}"
+                journal.record_llm(config.AGENT_PROMPT_TEMPLATE.format(question=question, statement_text=statement),
+                                   100, text, 50)
+                journal.record_llm(config.LOGIC_SCORING_PROMPT_TEMPLATE.format(text=text), 10, f"0.{(count * 37) % 10}", 5)
+                journal.record_embeddings([text], [embedding()])
+                children.append(text)
+        frontier = children
+    journal.close()
+
+def test_checkpoint_manager():
+    print("=== Checkpoint Manager Test ===")
+    from app.core.checkpoint import CheckpointManager
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        manager = CheckpointManager(os.path.join(tmp_dir, "checkpoints"))
+        assert manager.load_checkpoint() is None
+        assert manager.save_checkpoint({"run_id": "r1", "cycle_count": 3})
+        state = manager.load_checkpoint()
+        assert state["run_id"] == "r1" and state["cycle_count"] == 3 and "saved_at" in state
+        assert os.listdir(manager.checkpoint_path) == ["latest.json"]
+        print("✓ Checkpoints are written through a temporary file and read back")
+
+        # A crash while writing leaves a torn temporary file; the previous checkpoint is still read
+        with open(manager.checkpoint_file + ".tmp", 'w', encoding='utf-8') as f:
+            f.write('{"run_id": "r2", "cyc')
+        assert manager.load_checkpoint()["run_id"] == "r1"
+        assert manager.save_checkpoint({"run_id": "r2", "cycle_count": 4})
+        assert manager.load_checkpoint()["run_id"] == "r2"
+        print("✓ A torn write never replaces the latest checkpoint")
+
+        assert manager.clear_checkpoint() and manager.load_checkpoint() is None
+        print("✓ Checkpoints can be cleared")
+
+def test_resume_after_crash():
+    print("\n=== Resume After Crash Test ===")
+    from app.core import orchestrator as orchestrator_module
+    from app.core.checkpoint import CheckpointManager
+    from app.llm.journal import run_journal
+    from app.llm.llm_interface import llm_client
+    from app.db.vector_store import VectorStore
+
+    saved_globals = (orchestrator_module.vector_store_client, orchestrator_module.checkpoint_manager)
+    saved_config = (config.VECTOR_DB_PATH, config.CYCLE_PAUSE_SECONDS, config.EXPANSION_MODE,
+                    config.CHECKPOINT_INTERVAL_CYCLES)
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        config.VECTOR_DB_PATH = os.path.join(tmp_dir, "db_data")
+        store = VectorStore()
+        checkpoints = CheckpointManager(os.path.join(tmp_dir, "checkpoints"))
+        journal_path = os.path.join(tmp_dir, "run.jsonl.gz")
+        write_journal(journal_path)
+        try:
+            orchestrator_module.vector_store_client = store
+            orchestrator_module.checkpoint_manager = checkpoints
+            config.CYCLE_PAUSE_SECONDS = 0
+            config.EXPANSION_MODE = "local"
+            config.CHECKPOINT_INTERVAL_CYCLES = 1
+
+            print("\n--- Uninterrupted run ---")
+            run_journal.start_replay(journal_path)
+            reference = orchestrator_module.Orchestrator()
+            reference.start_analysis(HYPOTHESIS, max_depth=2, max_nodes=100, seed=7, max_llm_calls=100, background=False)
+            expected_texts = sorted(n.text for n in store.get_all_nodes_for_graph())
+            assert len(expected_texts) == 31 and reference.stop_reason == "frontier_exhausted"
+            assert reference.budget.used_llm_calls == 60
+            print(f"✓ {len(expected_texts)} nodes in {reference.cycle_count} cycles and 60 LLM calls")
+
+            print("\n--- Crash in the third expansion ---")
+            run_journal.start_replay(journal_path)
+            crashed = orchestrator_module.Orchestrator()
+            expansions = []
+
+            def crash_on_third(node, new_nodes):
+                expansions.append(node.id)
+                if len(expansions) == 3:
+                    # The children reach the store, but the node is never marked explored
+                    crashed._store_new_nodes(new_nodes)
+                    store.flush()
+                    raise Crash()
+                return orchestrator_module.Orchestrator._apply_expansion(crashed, node, new_nodes)
+
+            crashed._apply_expansion = crash_on_third
+            try:
+                crashed.start_analysis(HYPOTHESIS, max_depth=2, max_nodes=100, seed=7, max_llm_calls=100,
+                                       background=False)
+                assert False, "Expected the run to crash"
+            except Crash:
+                pass
+            checkpoint = checkpoints.load_checkpoint()
+            assert checkpoint["status"] == "running" and checkpoint["run_id"] == crashed.run_id
+            assert checkpoint["cycle_count"] == 2 and checkpoint["budget"]["used_llm_calls"] == 20
+            assert expansions[2] in {n.id for n in store.get_open_nodes(2)}
+            print("✓ The latest checkpoint is from cycle 2; the third node's children are stored but it is still open")
+
+            print("\n--- Resume ---")
+            resumed = orchestrator_module.Orchestrator()
+            assert resumed.resume_analysis(background=False)
+            assert resumed.run_id == crashed.run_id and resumed.budget.max_llm_calls == 100
+            # Three expansions were left, and the interrupted one counts as done
+            assert resumed.budget.used_llm_calls == 20 + 30, resumed.budget.to_dict()
+            assert resumed.cycle_count == 2 + 3 + 1
+            assert resumed.stop_reason == "frontier_exhausted" and checkpoints.load_checkpoint()["status"] == "completed"
+            assert sorted(n.text for n in store.get_all_nodes_for_graph()) == expected_texts
+            assert store.get_open_nodes(2) == []
+            print("✓ The resumed run keeps its cycle count and budget, skips the finished expansion and "
+                  "ends with the same graph")
+
+            assert not orchestrator_module.Orchestrator().resume_analysis(background=False)
+            print("✓ A completed run is not resumed")
+        finally:
+            run_journal.close()
+            llm_client.budget = None
+            orchestrator_module.vector_store_client, orchestrator_module.checkpoint_manager = saved_globals
+            (config.VECTOR_DB_PATH, config.CYCLE_PAUSE_SECONDS, config.EXPANSION_MODE,
+             config.CHECKPOINT_INTERVAL_CYCLES) = saved_config
+            if store._reaper is not None:
+                store._reaper.join(timeout=30)
+            store.close()
+
+    print("\n=== Test completed ===")
+
+if __name__ == "__main__":
+    test_checkpoint_manager()
+    test_resume_after_crash()
@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+Test delta reads and conditional GETs: /api/graph_data?since= returns only changed nodes, and the graph
+and archive endpoints answer If-None-Match with 304 while nothing has changed.
+"""
+import os
+import sys
+import json
+import tempfile
+
+# Add the backend directory to Python path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'backend'))
+
+from app import config
+
+def test_conditional_get():
+    print("=== Conditional GET Test ===")
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        # Keep the test away from the live database and archives
+        config.VECTOR_DB_PATH = os.path.join(tmp_dir, "db_data")
+        config.ARCHIVE_BASE_PATH = os.path.join(tmp_dir, "archive")
+        config.VECTOR_STORE_WARMUP_ENABLED = False
+        from fastapi.testclient import TestClient
+        from app import api
+        from app.db.vector_store import VectorStore
+        from app.db.data_models import Node
+
+        store = VectorStore()
+        store.use_run_collection("etag-test")
+        api.vector_store_client = store
+        api.archive_manager.archive_base_path = config.ARCHIVE_BASE_PATH
+        client = TestClient(api.app)
+
+        root = Node(trajectory_id="root", text="Root", score=0.5, cumulative_score=0.5, embedding=[1.0, 0.0])
+        store.add_node(root)
+        store.flush()
+
+        print("\n--- Graph data ---")
+        response = client.get("/api/graph_data")
+        assert response.status_code == 200
+        full = response.json()
+        etag = response.headers["etag"]
+        assert [n["text"] for n in full["nodes"]] == ["Root"] and full["run"] == "run_etag-test"
+        response = client.get("/api/graph_data", headers={"If-None-Match": etag})
+        assert response.status_code == 304 and response.content == b""
+        print("✓ An unchanged graph is answered with 304 and no body")
+
+        child = Node(parent_id=root.id, trajectory_id="t", text="Child", depth=1, score=2.0,
+                     cumulative_score=2.5, embedding=[0.0, 1.0])
+        store.add_node(child)
+        store.flush()
+        assert client.get("/api/graph_data", headers={"If-None-Match": etag}).status_code == 200
+        print("✓ Any write changes the ETag")
+
+        delta = client.get("/api/graph_data", params={"since": full["version"]}).json()
+        assert [n["text"] for n in delta["nodes"]] == ["Child"]
+        assert delta["links"] == [{"source": root.id, "target": child.id, "value": 2.0}]
+        store.update_node_state([root.id], {"is_fully_explored": True})
+        store.flush()
+        response = client.get("/api/graph_data", params={"since": delta["version"]})
+        assert [(n["text"], n["is_fully_explored"]) for n in response.json()["nodes"]] == [("Root", True)]
+        response = client.get("/api/graph_data", params={"since": response.json()["version"]},
+                              headers={"If-None-Match": response.headers["etag"]})
+        assert response.status_code == 200 and response.json()["nodes"] == []
+        print("✓ since=<version> returns only the nodes changed after it, with their links")
+
+        print("\n--- Analysis ---")
+        response = client.get("/api/analysis")
+        assert response.json()["best_trajectory"]["final_insight"] == "Child"
+        assert client.get("/api/analysis", headers={"If-None-Match": response.headers["etag"]}).status_code == 304
+        print("✓ Analysis is cached by the client until the graph changes")
+
+        print("\n--- Archives ---")
+        archive_path = os.path.join(config.ARCHIVE_BASE_PATH, "20250101_000000_test")
+        os.makedirs(archive_path)
+        for name, data in [("metadata.json", {"run_name": "test", "timestamp": "20250101_000000"}),
+                           ("nodes.json", [child.dict(exclude={'embedding'})]),
+                           ("analysis.json", {"total_nodes": 1})]:
+            with open(os.path.join(archive_path, name), 'w', encoding='utf-8') as f:
+                json.dump(data, f)
+
+        for url in ["/api/archives", "/api/archive/20250101_000000_test",
+                    "/api/archive/20250101_000000_test/analysis"]:
+            response = client.get(url)
+            assert response.status_code == 200
+            assert client.get(url, headers={"If-None-Match": response.headers["etag"]}).status_code == 304
+        print("✓ Archive list, archive and archive analysis support If-None-Match")
+
+        before = client.get("/api/archive/20250101_000000_test/analysis").headers["etag"]
+        with open(os.path.join(archive_path, "analysis.json"), 'w', encoding='utf-8') as f:
+            json.dump({"total_nodes": 12}, f)
+        response = client.get("/api/archive/20250101_000000_test/analysis", headers={"If-None-Match": before})
+        assert response.status_code == 200 and response.json() == {"total_nodes": 12}
+        print("✓ Rewriting an archive file changes its ETag")
+
+        store._reaper.join(timeout=30)
+        store.close()
+
+    print("\n=== Test completed ===")
+
+if __name__ == "__main__":
+    test_conditional_get()
@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+"""
+Test coordinated mode: API workers queue commands in the shared control store, the orchestration process
+runs them and publishes its status and events, and each API worker follows the runner's run and events.
+"""
+import os
+import sys
+import tempfile
+
+# Add the backend directory to Python path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'backend'))
+
+from app import config
+
+def test_coordinated_mode():
+    print("=== Coordinated Mode Test ===")
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        # Keep the test away from the live database, archives and control store
+        config.VECTOR_DB_PATH = os.path.join(tmp_dir, "db_data")
+        config.ARCHIVE_BASE_PATH = os.path.join(tmp_dir, "archive")
+        config.CONTROL_DB_PATH = os.path.join(tmp_dir, "control", "control.sqlite3")
+        config.VECTOR_STORE_WARMUP_ENABLED = False
+        from fastapi.testclient import TestClient
+        from app import api, runner as runner_module
+        from app.core import archive_manager as archive_module
+        from app.core import orchestrator as orchestrator_module
+        from app.core.checkpoint import CheckpointManager
+        from app.core.control import ControlStore, ControlFollower
+        from app.core.events import GraphEventStream, graph_events
+        from app.db.vector_store import VectorStore
+        from app.db.data_models import Node
+
+        print("\n--- Control store ---")
+        control = ControlStore(config.CONTROL_DB_PATH)
+        first = control.submit_job("test", {"n": 1})
+        second = control.submit_job("test", {"n": 2})
+        assert control.active_job("test")["id"] == first["id"] and control.active_job("other") is None
+        job, payload = control.claim_job("r1")
+        assert job["id"] == first["id"] and job["status"] == "running" and payload == {"n": 1}
+        control.update_job(first["id"], status="done", result={"ok": True}, progress=1.0)
+        assert control.get_job(first["id"])["result"] == {"ok": True}
+        assert control.active_job("test")["id"] == second["id"]
+        control.claim_job("r1")
+        control.fail_interrupted_jobs("r2")
+        assert control.get_job(second["id"])["status"] == "failed"
+        print("✓ Jobs are claimed in order, and jobs of a runner that died are failed")
+
+        buffer_size = config.EVENT_STREAM_BUFFER_SIZE
+        config.EVENT_STREAM_BUFFER_SIZE = 3
+        numbers = [control.append_event("cycle", {"cycle": n}) for n in range(5)]
+        assert [seq for seq, _, _ in control.events_since(0)] == numbers[-3:]
+        config.EVENT_STREAM_BUFFER_SIZE = buffer_size
+        print("✓ Only the latest events are kept")
+
+        print("\n--- Runner publishes, API worker follows ---")
+        # The runner process writes the run; the API worker's store only reads the graph store
+        writer = VectorStore()
+        writer.use_run_collection("coordinated")
+        runner_events = GraphEventStream(writer)
+        runner_events.add_listener(control.append_event)
+        runner_events.attach()
+        runner_module.control_store = control
+        runner_module.graph_events = runner_events
+        runner_module.vector_store_client = writer
+        archive_module.vector_store_client = writer
+        runner = runner_module.Runner(runner_id="test-runner")
+
+        writer.add_node(Node(trajectory_id="root", text="Root", score=0.5, cumulative_score=0.5, embedding=[1.0, 0.0]))
+        writer.flush()
+        runner.publish_status()
+
+        reader = VectorStore()
+        api_events = GraphEventStream(reader)
+        follower = ControlFollower(control, api_events, reader)
+        follower.poll()
+        assert reader.run == "run_coordinated" and reader._collection is None
+        print("✓ The API worker reads the runner's run without opening ChromaDB")
+
+        config.SERVER_MODE = "coordinated"
+        api.control_store = control
+        api.vector_store_client = reader
+        api.graph_events = api_events
+        api.archive_manager.archive_base_path = config.ARCHIVE_BASE_PATH
+        os.makedirs(config.ARCHIVE_BASE_PATH, exist_ok=True)
+        client = TestClient(api.app)
+
+        status = client.get("/api/status").json()
+        assert status["total_nodes"] == 1 and status["runner_alive"] and not status["is_running"]
+        assert [n["text"] for n in client.get("/api/graph_data").json()["nodes"]] == ["Root"]
+        assert client.get("/api/best").json()["best_trajectory"] is None
+        print("✓ Status and graph come from the shared stores")
+
+        stream_id = control.stream_id()
+        events, reset = api_events.events_since(f"{stream_id}-{numbers[-1]}")
+        assert not reset and [e["type"] for e in events][-1] == "node-added"
+        assert events[-1]["cursor"].startswith(stream_id)
+        other_worker = GraphEventStream(reader)
+        ControlFollower(control, other_worker, reader).poll()
+        assert other_worker.events_since(events[-1]["cursor"]) == ([], False)
+        print("✓ Runner events reach every API worker with the same cursors")
+
+        print("\n--- Commands ---")
+        response = client.post("/api/start", json={"hypothesis": "Test", "max_depth": 2, "max_nodes": 5})
+        assert response.status_code == 200
+        job, payload = control.claim_job("test-runner")
+        assert job["id"] == response.json()["job_id"] and job["kind"] == "start" and payload["hypothesis"] == "Test"
+        control.update_job(job["id"], status="done", finished_at=0)
+        print("✓ Start is queued for the runner")
+
+        saved_checkpoints = orchestrator_module.checkpoint_manager
+        orchestrator_module.checkpoint_manager = CheckpointManager(os.path.join(tmp_dir, "checkpoints"))
+        orchestrator_module.checkpoint_manager.save_checkpoint({
+            "run_id": "interrupted", "hypothesis": "Test", "cycle_count": 3, "max_depth": 2, "max_nodes": 5,
+            "status": "stopped"
+        })
+        # Until the runner publishes its checkpoint the API worker knows of nothing to resume
+        assert client.post("/api/resume").status_code == 404
+        runner.publish_status()
+        response = client.post("/api/resume")
+        assert response.status_code == 200 and response.json()["run_id"] == "interrupted"
+        assert response.json()["cycle_count"] == 3
+        job, _ = control.claim_job("test-runner")
+        assert job["id"] == response.json()["job_id"] and job["kind"] == "resume"
+        control.update_job(job["id"], status="done", finished_at=0)
+        print("✓ Resume answers from the checkpoint the runner published and is queued for the runner")
+
+        response = client.post("/api/stop", json={"run_name": "coordinated"})
+        job_id = response.json()["job_id"]
+        assert client.post("/api/stop", json={"run_name": "coordinated"}).json()["job_id"] == job_id
+        assert control.submit_unique("archive", {"run_name": "other"})["id"] == job_id
+        assert client.get("/api/status").json()["archive_job"]["id"] == job_id
+        assert client.post("/api/start", json={"hypothesis": "Test"}).status_code == 409
+        assert client.post("/api/clear").status_code == 409
+        print("✓ Stop queues one archive job, and start and clear wait for it")
+
+        runner.process_job(*control.claim_job(runner.runner_id))
+        job = client.get(f"/api/jobs/{job_id}").json()
+        assert job["status"] == "done" and job["result"]["nodes_archived"] == 1, job
+        assert client.get("/api/jobs/unknown").status_code == 404
+        print(f"✓ The runner archived the run as {job['result']['archive_name']}")
+
+        follower.poll()
+        assert reader.run == writer.run != "run_coordinated"
+        assert client.get("/api/status").json()["total_nodes"] == 0
+        events, _ = api_events.events_since(events[-1]["cursor"])
+        stages = [e["data"]["stage"] for e in events if e["type"] == "job" and e["data"]["id"] == job_id]
+        assert "copying database" in stages and stages[-1] == "done"
+        assert "reset" in [e["type"] for e in events]
+        print("✓ The API worker follows the fresh run and mirrors the archive job's progress")
+
+        config.SERVER_MODE = "embedded"
+        orchestrator_module.checkpoint_manager = saved_checkpoints
+        api.graph_events = runner_module.graph_events = graph_events
+        writer._reaper.join(timeout=30)
+        writer.close()
+
+    print("\n=== Test completed ===")
+
+if __name__ == "__main__":
+    test_coordinated_mode()
@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+Test semantic deduplication: thoughts at least DEDUP_SIMILARITY_THRESHOLD similar to a stored node are
+merged into it as an extra parent link, unless that link would make a node its own ancestor.
+"""
+import os
+import sys
+import tempfile
+import numpy as np
+
+# Add the backend directory to Python path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'backend'))
+
+from app import config
+
+def near_a(similarity):
+    """A unit vector with the given cosine similarity to node A's embedding, the first axis"""
+    return [similarity, float(np.sqrt(1 - similarity ** 2)), 0.0, 0.0]
+
+def test_dedup_merging():
+    print("=== Deduplication Test ===")
+    from app.core import orchestrator as orchestrator_module
+    from app.db.vector_store import VectorStore
+    from app.db.data_models import Node
+    from app.api import graph_links
+
+    saved_store = orchestrator_module.vector_store_client
+    saved_config = (config.VECTOR_DB_PATH, config.DEDUP_ENABLED, config.DEDUP_SIMILARITY_THRESHOLD)
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        config.VECTOR_DB_PATH = os.path.join(tmp_dir, "db_data")
+        store = VectorStore()
+        try:
+            store.use_run_collection("dedup-test")
+            orchestrator_module.vector_store_client = store
+            config.DEDUP_ENABLED = True
+            config.DEDUP_SIMILARITY_THRESHOLD = 0.92
+            orchestrator = orchestrator_module.Orchestrator()
+
+            root = Node(trajectory_id="root", text="Root", embedding=[0.0, 0.0, 0.0, 1.0])
+            a = Node(parent_id=root.id, trajectory_id="t", text="A", depth=1, embedding=[1.0, 0.0, 0.0, 0.0])
+            b = Node(parent_id=root.id, trajectory_id="t", text="B", depth=1, embedding=[0.0, 0.0, 1.0, 0.0])
+            c = Node(parent_id=a.id, trajectory_id="t", text="C", depth=2, embedding=[0.0, -1.0, 0.0, 0.0])
+            store.add_nodes([root, a, b, c])
+
+            print("\n--- Threshold ---")
+            assert store.find_duplicate(Node(trajectory_id="t", text="A'", embedding=near_a(0.93))).id == a.id
+            assert store.find_duplicate(Node(trajectory_id="t", text="A'", embedding=near_a(0.91))) is None
+            config.DEDUP_SIMILARITY_THRESHOLD = 0.9
+            assert store.find_duplicate(Node(trajectory_id="t", text="A'", embedding=near_a(0.91))).id == a.id
+            config.DEDUP_SIMILARITY_THRESHOLD = 0.92
+            print("✓ Thoughts are duplicates from DEDUP_SIMILARITY_THRESHOLD on, read when the lookup runs")
+
+            print("\n--- Merging ---")
+            from_b = Node(parent_id=b.id, trajectory_id="t", text="A again", depth=2, embedding=near_a(0.95))
+            fresh = Node(parent_id=b.id, trajectory_id="t", text="New", depth=2, embedding=near_a(0.5))
+            inserted = orchestrator._store_new_nodes([from_b, fresh])
+            assert [n.id for n in inserted] == [fresh.id]
+            assert store.get_node_by_id(a.id).extra_parent_ids == [b.id]
+            assert a.id in [n.id for n in store.get_children(b.id)]
+            links = graph_links([n.dict() for n in store.get_all_nodes_for_graph()])
+            assert {"source": b.id, "target": a.id, "value": 0.0} in links
+            assert {"source": root.id, "target": a.id, "value": 0.0} in links
+            print("✓ A duplicate from another parent becomes an extra parent link of the stored node")
+
+            same_parent = Node(parent_id=root.id, trajectory_id="t", text="A once more", depth=1,
+                               embedding=near_a(0.97))
+            assert orchestrator._store_new_nodes([same_parent]) == []
+            assert store.get_node_by_id(a.id).extra_parent_ids == [b.id]
+            print("✓ A duplicate from a parent already linked adds nothing")
+
+            print("\n--- Cycles ---")
+            assert orchestrator._is_ancestor(a.id, c.id, {})
+            assert not orchestrator._is_ancestor(c.id, a.id, {})
+            # C descends from A, so linking C as a parent of A would close a cycle
+            from_c = Node(parent_id=c.id, trajectory_id="t", text="A from below", depth=3,
+                          embedding=near_a(0.99))
+            assert orchestrator._store_new_nodes([from_c]) == []
+            assert store.get_node_by_id(a.id).extra_parent_ids == [b.id]
+            assert store.count_nodes() == 5
+            print("✓ A duplicate of its own ancestor is dropped instead of creating a cycle")
+        finally:
+            orchestrator_module.vector_store_client = saved_store
+            config.VECTOR_DB_PATH, config.DEDUP_ENABLED, config.DEDUP_SIMILARITY_THRESHOLD = saved_config
+            if store._reaper is not None:
+                store._reaper.join(timeout=30)
+            store.close()
+
+    print("\n=== Test completed ===")
+
+if __name__ == "__main__":
+    test_dedup_merging()
@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+"""
+Test the memory-mapped embedding cache: lookups, persistence, eviction and stale slots.
+"""
+import os
+import sys
+import tempfile
+import numpy as np
+
+# Add the backend directory to Python path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'backend'))
+
+from app.db.embedding_cache import EmbeddingCache
+
+def test_embedding_cache():
+    print("=== Embedding Cache Test ===")
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        vectors = np.random.default_rng(0).normal(size=(4, 8)).astype(np.float32)
+        texts = ["first", "second", "third", "fourth"]
+
+        print("\n--- Store and look up ---")
+        cache = EmbeddingCache(tmp_dir, "test-model", max_entries=3, dtype="float32")
+        assert cache.get_many(["first"]) == [None]
+        cache.put_many(texts[:2], vectors[:2].tolist())
+        hits = cache.get_many(["first", "unknown", "second"])
+        assert hits[1] is None
+        assert np.array_equal(hits[0], vectors[0]) and np.array_equal(hits[2], vectors[1])
+        print("✓ Cached vectors returned, unknown texts missed")
+
+        print("\n--- Persist across instances ---")
+        cache.flush()
+        index_mtime = os.stat(cache.index_file).st_mtime_ns
+        cache.get_many(["first", "second"])
+        cache.flush()
+        assert os.stat(cache.index_file).st_mtime_ns == index_mtime
+        print("✓ Lookups alone don't rewrite the index")
+        reopened = EmbeddingCache(tmp_dir, "test-model", max_entries=3, dtype="float32")
+        assert np.array_equal(reopened.get_many(["second"])[0], vectors[1])
+        assert EmbeddingCache(tmp_dir, "other-model", max_entries=3).get_many(["second"]) == [None]
+        print("✓ Vectors survive a restart and are scoped to the model")
+
+        print("\n--- Least recently used eviction ---")
+        reopened.get_many(["first"])
+        reopened.put_many(texts[2:], vectors[2:].tolist())
+        assert reopened.get_many(["second"]) == [None]
+        assert all(v is not None for v in reopened.get_many(["first", "third", "fourth"]))
+        print("✓ The least recently used vector was evicted")
+
+        print("\n--- Stale index entries ---")
+        reopened._keys[reopened._index[reopened.key_for("first")]] = b""
+        assert reopened.get_many(["first"]) == [None]
+        print("✓ A slot whose key doesn't match is a miss")
+
+        print("\n--- float16 storage ---")
+        half = EmbeddingCache(os.path.join(tmp_dir, "half"), "test-model", max_entries=3, dtype="float16")
+        half.put_many(["first"], vectors[:1].tolist())
+        assert np.allclose(half.get_many(["first"])[0], vectors[0], atol=1e-2)
+        print("✓ float16 vectors are close to the originals")
+
+    print("\n=== Test completed ===")
+
+if __name__ == "__main__":
+    test_embedding_cache()
@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+Test the graph event stream: node changes written by the vector store become events, clients resume from
+their cursor, and stale cursors get a reset.
+"""
+import os
+import sys
+import json
+import asyncio
+import tempfile
+
+# Add the backend directory to Python path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'backend'))
+
+from app import config
+
+def test_event_stream():
+    print("=== Event Stream Test ===")
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        # Keep the test away from the live database
+        config.VECTOR_DB_PATH = os.path.join(tmp_dir, "db_data")
+        from app.db.vector_store import VectorStore
+        from app.db.data_models import Node
+        from app.core.events import GraphEventStream, sse_events
+
+        store = VectorStore()
+        store.use_run_collection("events-1")
+        root = Node(trajectory_id="root", text="Root", embedding=[1.0, 0.0])
+        store.add_node(root)
+        store.flush()
+
+        stream = GraphEventStream(store, max_events=5)
+        stream.attach()
+        events, reset = stream.events_since(None)
+        assert reset and events == []
+        cursor = stream.cursor()
+        print("✓ A client without a cursor is told to load the graph first")
+
+        print("\n--- Node events ---")
+        child = Node(parent_id=root.id, trajectory_id="t", text="Child", depth=1, embedding=[0.0, 1.0])
+        store.add_node(child)
+        store.update_node_state([root.id], {"is_fully_explored": True})
+        store.update_node_state([child.id], {"is_pruned": True})
+        store.flush()
+        events, reset = stream.events_since(cursor)
+        assert not reset
+        assert [e["type"] for e in events] == ["node-added", "node-updated"]
+        assert [n["text"] for n in events[0]["data"]["nodes"]] == ["Child"]
+        assert events[0]["data"]["nodes"][0]["is_pruned"] and "embedding" not in events[0]["data"]["nodes"][0]
+        assert events[1]["data"]["nodes"][0]["is_fully_explored"]
+        print("✓ Each written batch becomes node-added and node-updated events")
+
+        store.update_node_state([root.id], {"is_pruned": True})
+        store.flush()
+        cursor = events[-1]["cursor"]
+        events, _ = stream.events_since(cursor)
+        assert [e["type"] for e in events] == ["pruned"]
+        stream.publish("cycle", {"cycle": 1})
+        assert [e["type"] for e in stream.events_since(cursor)[0]] == ["pruned", "cycle"]
+        print("✓ Pruning and run events follow in order, and a cursor resumes after its event")
+
+        print("\n--- Stale cursors ---")
+        assert stream.events_since("otherprocess-3") == ([], True)
+        for i in range(5):
+            stream.publish("cycle", {"cycle": i + 2})
+        assert stream.events_since(cursor) == ([], True)
+        print("✓ Cursors of another server process or older than the buffer get a reset")
+
+        before = stream.cursor()
+        store.use_run_collection("events-2")
+        events, _ = stream.events_since(before)
+        assert [e["type"] for e in events] == ["reset"] and events[0]["data"]["run"] == "run_events-2"
+        print("✓ Switching runs publishes a reset")
+
+        print("\n--- Server-Sent Events ---")
+        async def read_stream():
+            disconnected = False
+            async def is_disconnected():
+                return disconnected
+            messages = []
+            async for message in sse_events(stream, None, is_disconnected):
+                messages.append(message)
+                if len(messages) == 1:
+                    stream.publish("run-finished", {"stop_reason": "stopped"})
+                else:
+                    disconnected = True
+            return messages
+
+        messages = asyncio.run(asyncio.wait_for(read_stream(), 5))
+        assert messages[0].startswith(f"id: {stream.stream_id}-") and "event: reset" in messages[0]
+        lines = messages[1].strip().split("\n")
+        assert lines[1] == "event: run-finished" and json.loads(lines[2][len("data: "):]) == {"stop_reason": "stopped"}
+        print("✓ A waiting client is woken by the next event")
+        store._reaper.join(timeout=30)
+        store.close()
+
+    print("\n=== Test completed ===")
+
+if __name__ == "__main__":
+    test_event_stream()
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Test the SQLite graph store: indexed node queries, merged-parent edges, ancestor paths and importing
+nodes from a collection written before the graph store existed.
+"""
+import os
+import sys
+import tempfile
+
+# Add the backend directory to Python path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'backend'))
+
+from app import config
+
+def test_graph_store():
+    print("=== Graph Store Test ===")
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        from app.db.graph_store import GraphStore
+        from app.db.data_models import Node
+
+        graph = GraphStore(os.path.join(tmp_dir, "graph.sqlite3"))
+        root = Node(trajectory_id="root", text="Root", score=0.5, cumulative_score=0.5)
+        a = Node(parent_id=root.id, trajectory_id="a", text="A", depth=1, score=4.0, cumulative_score=4.5)
+        b = Node(parent_id=root.id, trajectory_id="b", text="B", depth=1, score=1.0, cumulative_score=1.5)
+        c = Node(parent_id=a.id, trajectory_id="a", text="C", depth=2, score=3.0, cumulative_score=7.5)
+        graph.upsert_nodes("run_1", [root, a, b, c])
+        graph.upsert_nodes("run_2", [Node(trajectory_id="root", text="Other run")])
+
+        print("\n--- Queries ---")
+        assert [n.text for n in graph.get_nodes("run_1")] == ["Root", "A", "B", "C"]
+        assert graph.count("run_1") == 4 and graph.count("run_2") == 1
+        assert [n.text for n in graph.get_nodes("run_1", order_by="cumulative_score DESC", limit=2)] == ["C", "A"]
+        assert [n.text for n in graph.get_nodes("run_1", order_by="depth desc, score")] == ["C", "B", "A", "Root"]
+        for order_by in ["score; DROP TABLE nodes", "embedding", "score DESC NULLS LAST", "score,"]:
+            try:
+                graph.get_nodes("run_1", order_by=order_by)
+                assert False, f"Expected {order_by!r} to be rejected"
+            except ValueError:
+                pass
+        frontier = graph.get_nodes("run_1", where={"$and": [{"is_pruned": False}, {"depth": {"$lt": 2}}]})
+        assert [n.text for n in frontier] == ["Root", "A", "B"]
+        assert graph.get_stats("run_1") == {"total_nodes": 4, "average_score": 2.125, "pruned_nodes": 0}
+        print("✓ Filters, ordering and statistics run in SQL, and orders other than node columns are rejected")
+
+        print("\n--- Updates and edges ---")
+        graph.update_nodes("run_1", [b.id, c.id], [{"is_pruned": True}, {"extra_parent_ids": [b.id]}])
+        assert graph.get_nodes("run_1", ids=[b.id])[0].is_pruned
+        assert graph.get_nodes("run_1", ids=[c.id])[0].extra_parent_ids == [b.id]
+        assert [n.text for n in graph.get_children("run_1", b.id)] == ["C"]
+        assert [n.text for n in graph.get_children("run_1", root.id)] == ["A", "B"]
+        print("✓ Merged parents are edges and count as children")
+
+        graph.upsert_nodes("run_1", [c.copy(update={"score": 5.0})])
+        assert [n.text for n in graph.get_nodes("run_1")][-1] == "C"
+        assert graph.get_nodes("run_1", ids=[c.id])[0].extra_parent_ids == []
+        print("✓ Replacing a node keeps its position and its given parents")
+
+        assert [n.text for n in graph.get_path("run_1", c.id)] == ["Root", "A", "C"]
+        assert graph.get_path("run_1", "missing") == []
+        print("✓ Ancestor paths come from one recursive query")
+
+        assert graph.delete_runs(["run_2"]) == 1 and graph.list_runs() == ["run_1"]
+        print("✓ Runs are deleted as a whole")
+
+    print("\n--- Collections written before the graph store ---")
+    saved_db_path = config.VECTOR_DB_PATH
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        config.VECTOR_DB_PATH = os.path.join(tmp_dir, "db_data")
+        from app.db.vector_store import VectorStore, get_chroma_client
+
+        try:
+            legacy = get_chroma_client(os.path.abspath(config.VECTOR_DB_PATH)).get_or_create_collection(config.COLLECTION_NAME)
+            legacy.upsert(ids=["n1", "n2"], embeddings=[[1.0, 0.0], [0.0, 1.0]], metadatas=[
+                {"id": "n1", "trajectory_id": "root", "text": "Old root", "score": 0.5, "cumulative_score": 0.5,
+                 "is_pruned": False, "is_fully_explored": True, "depth": 0},
+                {"id": "n2", "parent_id": "n1", "trajectory_id": "t", "text": "Old child", "score": 2.0,
+                 "cumulative_score": 2.5, "is_pruned": False, "is_fully_explored": False, "depth": 1,
+                 "extra_parent_ids": "x1,x2"}
+            ])
+            store = VectorStore()
+            nodes = store.get_all_nodes_for_graph()
+            assert [n.text for n in nodes] == ["Old root", "Old child"]
+            assert nodes[1].extra_parent_ids == ["x1", "x2"]
+            assert [n.text for n in store.get_path("n2")] == ["Old root", "Old child"]
+            print("✓ Nodes are imported from the collection metadata on first use")
+        finally:
+            config.VECTOR_DB_PATH = saved_db_path
+
+    print("\n=== Test completed ===")
+
+if __name__ == "__main__":
+    test_graph_store()
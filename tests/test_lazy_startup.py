@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+"""
+Test that importing the backend doesn't load the embedding model, open ChromaDB or create checkpoint and
+task queue files, and that resetting the vector store reuses the shared handles.
+"""
+import os
+import sys
+import subprocess
+import tempfile
+
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'backend')
+
+# Add the backend directory to Python path
+sys.path.append(BACKEND_DIR)
+
+def test_lazy_startup():
+    print("=== Lazy Startup Test ===")
+
+    print("\n--- Import the API ---")
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        # A fresh interpreter, so modules imported by other tests don't count. Its files go to tmp_dir.
+        output = subprocess.run(
+            [sys.executable, "-c",
+             "import os, sys, time; from app import config; "
+             f"config.CHECKPOINT_PATH = os.path.join({tmp_dir!r}, 'checkpoints'); "
+             f"config.TASK_QUEUE_PATH = os.path.join({tmp_dir!r}, 'task_queue', 'tasks.sqlite3'); "
+             "t = time.time(); import app.api; "
+             "print(round(time.time() - t, 2), 'sentence_transformers' in sys.modules, 'chromadb' in sys.modules)"],
+            cwd=BACKEND_DIR, capture_output=True, text=True, check=True
+        ).stdout.split()
+        print(f"Imported app.api in {output[0]}s")
+        assert output[1:] == ["False", "False"]
+        assert os.listdir(tmp_dir) == []
+    print("✓ Neither sentence_transformers nor chromadb imported, and no checkpoint or task queue files created")
+
+    print("\n--- Reset reuses shared handles ---")
+    from app import config
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        config.VECTOR_DB_PATH = os.path.join(tmp_dir, "db_data")
+        from app.db import vector_store
+
+        sentinel_model = object()
+        vector_store._embedding_models[config.EMBEDDING_MODEL_NAME] = sentinel_model
+        try:
+            store = vector_store.VectorStore()
+            assert store._client is None and store._collection is None
+            store.collection
+            fresh = vector_store.VectorStore()
+            assert fresh.client is store.client
+            assert fresh.embedding_model is sentinel_model
+            print("✓ New stores share the Chroma client and the loaded model")
+        finally:
+            del vector_store._embedding_models[config.EMBEDDING_MODEL_NAME]
+
+    print("\n=== Test completed ===")
+
+if __name__ == "__main__":
+    test_lazy_startup()
@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+Test node projection, filters and paging: fields= picks node fields, min/max depth and score filter nodes,
+limit= and cursor= page through them on the graph and archive endpoints, and /api/nodes?ids= looks up
+several nodes at once.
+"""
+import os
+import sys
+import json
+import tempfile
+
+# Add the backend directory to Python path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'backend'))
+
+from app import config
+
+def test_node_projection():
+    print("=== Node Projection Test ===")
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        # Keep the test away from the live database and archives
+        config.VECTOR_DB_PATH = os.path.join(tmp_dir, "db_data")
+        config.ARCHIVE_BASE_PATH = os.path.join(tmp_dir, "archive")
+        config.VECTOR_STORE_WARMUP_ENABLED = False
+        from fastapi.testclient import TestClient
+        from app import api
+        from app.db.vector_store import VectorStore
+        from app.db.data_models import Node
+
+        store = VectorStore()
+        store.use_run_collection("projection-test")
+        api.vector_store_client = store
+        api.archive_manager.archive_base_path = config.ARCHIVE_BASE_PATH
+        client = TestClient(api.app)
+
+        root = Node(trajectory_id="root", text="Root", score=0.5, cumulative_score=0.5, embedding=[1.0, 0.0])
+        nodes = [root] + [Node(parent_id=root.id, trajectory_id=f"t{i}", text=f"Child {i}", depth=1, score=float(i),
+                               cumulative_score=0.5 + i, embedding=[0.0, 1.0]) for i in range(5)]
+        for node in nodes:
+            store.add_node(node)
+        store.flush()
+
+        print("\n--- Graph data ---")
+        full = client.get("/api/graph_data").json()
+        assert len(full["nodes"]) == 6 and "embedding" not in full["nodes"][0] and full["next_cursor"] is None
+        print("✓ Nodes are sent without their embeddings")
+
+        graph = client.get("/api/graph_data", params={"fields": "score,parent_id"}).json()
+        assert all(set(n) == {"id", "score", "parent_id"} for n in graph["nodes"])
+        assert len(graph["links"]) == 5
+        assert client.get("/api/graph_data", params={"fields": "score,embedding"}).status_code == 400
+        print("✓ fields= sends only the named fields, with every link")
+
+        filtered = client.get("/api/graph_data", params={"min_depth": 1, "min_score": 2, "max_score": 3}).json()
+        assert sorted(n["text"] for n in filtered["nodes"]) == ["Child 2", "Child 3"]
+        print("✓ Depth and score filters are applied by the graph store")
+
+        ids, cursor = [], None
+        while True:
+            params = {"fields": "id", "limit": 4}
+            if cursor:
+                params["cursor"] = cursor
+            page = client.get("/api/graph_data", params=params).json()
+            ids += [n["id"] for n in page["nodes"]]
+            cursor = page["next_cursor"]
+            if cursor is None:
+                break
+        assert ids == [n.id for n in nodes]
+        assert client.get("/api/graph_data", params={"cursor": "abc"}).status_code == 400
+        assert client.get("/api/graph_data", params={"since": 0, "limit": 4}).status_code == 400
+        print("✓ limit= and cursor= page through every node once, in insertion order")
+
+        response = client.get("/api/graph_data", params={"fields": "id"})
+        etag = response.headers["etag"]
+        assert etag != client.get("/api/graph_data").headers["etag"]
+        assert client.get("/api/graph_data", params={"fields": "id"}, headers={"If-None-Match": etag}).status_code == 304
+        print("✓ Each query has its own ETag")
+
+        print("\n--- Batch lookup ---")
+        response = client.get("/api/nodes", params={"ids": f"{nodes[2].id},missing,{root.id}", "fields": "text"}).json()
+        assert response["nodes"] == [{"id": nodes[2].id, "text": "Child 1"}, {"id": root.id, "text": "Root"}]
+        assert response["missing"] == ["missing"]
+        too_many = ",".join(str(i) for i in range(config.NODE_BATCH_MAX_IDS + 1))
+        assert client.get("/api/nodes", params={"ids": too_many}).status_code == 400
+        print("✓ /api/nodes?ids= returns the nodes found and lists the missing ones")
+
+        print("\n--- Archives ---")
+        archive_path = os.path.join(config.ARCHIVE_BASE_PATH, "20250101_000000_test")
+        os.makedirs(archive_path)
+        for name, data in [("metadata.json", {"run_name": "test", "timestamp": "20250101_000000"}),
+                           ("nodes.json", [n.dict(exclude={'embedding'}) for n in nodes])]:
+            with open(os.path.join(archive_path, name), 'w', encoding='utf-8') as f:
+                json.dump(data, f)
+
+        archive = client.get("/api/archive/20250101_000000_test").json()
+        assert "graph_data" not in archive and len(archive["nodes"]) == 6 and len(archive["links"]) == 5
+        print("✓ An archive sends its nodes once, with their links")
+
+        page = client.get("/api/archive/20250101_000000_test",
+                          params={"fields": "score", "min_depth": 1, "limit": 3}).json()
+        assert [n["score"] for n in page["nodes"]] == [0.0, 1.0, 2.0] and set(page["nodes"][0]) == {"id", "score"}
+        assert page["total_nodes"] == 5 and page["next_cursor"] == "3"
+        page = client.get("/api/archive/20250101_000000_test",
+                          params={"fields": "score", "min_depth": 1, "limit": 3, "cursor": "3"}).json()
+        assert [n["score"] for n in page["nodes"]] == [3.0, 4.0] and page["next_cursor"] is None
+        print("✓ Archives take the same fields, filter and paging parameters")
+
+        store._reaper.join(timeout=30)
+        store.close()
+
+    print("\n=== Test completed ===")
+
+if __name__ == "__main__":
+    test_node_projection()
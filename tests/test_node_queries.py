@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""
+Test that frontier and pruning queries are answered by the store and that counting reads no nodes.
+"""
+import os
+import sys
+import tempfile
+
+# Add the backend directory to Python path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'backend'))
+
+from app import config
+
+def test_node_queries():
+    print("=== Node Query Test ===")
+
+    saved_config = (config.VECTOR_DB_PATH, config.VECTOR_BACKEND)
+    for backend in ["chroma", "memory"]:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            # Keep the test away from the live database
+            config.VECTOR_DB_PATH = os.path.join(tmp_dir, "db_data")
+            config.VECTOR_BACKEND = backend
+            from app.db.vector_store import VectorStore
+            from app.db.data_models import Node
+
+            print(f"\n--- {backend} backend ---")
+            store = VectorStore()
+            try:
+                root = Node(trajectory_id="root", text="Root", score=0.5, embedding=[1.0, 0.0, 0.0])
+                explored = Node(parent_id=root.id, trajectory_id="t1", text="Explored", depth=1, score=4.0,
+                                is_fully_explored=True, embedding=[0.0, 1.0, 0.0])
+                pruned = Node(parent_id=root.id, trajectory_id="t2", text="Pruned", depth=1, score=1.0,
+                              is_pruned=True, embedding=[0.0, 0.0, 1.0])
+                deep = Node(parent_id=explored.id, trajectory_id="t1", text="Too deep", depth=3, score=6.0,
+                            embedding=[1.0, 1.0, 0.0])
+                leaf = Node(parent_id=explored.id, trajectory_id="t1", text="Leaf", depth=2, score=2.0,
+                            embedding=[0.0, 1.0, 1.0])
+                store.add_nodes([root, explored, pruned, deep, leaf])
+
+                assert store.count_nodes() == 5 and store._written == 0
+                print("✓ Counting includes buffered nodes without writing them")
+
+                assert sorted(n.text for n in store.get_open_nodes(max_depth=3)) == ["Leaf", "Root"]
+                low = store.get_nodes(where={"$and": [{"is_pruned": False}, {"depth": {"$gt": 0}}, {"score": {"$lt": 3.0}}]})
+                assert [n.text for n in low] == ["Leaf"]
+                print("✓ Frontier and pruning candidates are filtered by the store")
+
+                store.flush()
+                store.count_nodes()
+                calls = []
+                original_count = store.graph.count
+                store.graph.count = lambda run, *args: calls.append(run) or original_count(run, *args)
+                store.update_node_state([leaf.id], {"is_pruned": True})
+                assert store.count_nodes() == 5 and store.count_nodes() == 5
+                assert calls == []
+                store.add_node(Node(parent_id=leaf.id, trajectory_id="t1", text="New", depth=3, embedding=[1.0, 0.0, 1.0]))
+                assert store.count_nodes() == 6 and len(calls) == 1
+                print("✓ The count is cached until the writer stores another batch")
+
+                assert [n.text for n in store.get_open_nodes(max_depth=3)] == ["Root"]
+                print("✓ Buffered state updates are visible to filtered queries")
+            finally:
+                config.VECTOR_DB_PATH, config.VECTOR_BACKEND = saved_config
+                store.close()
+
+    print("\n=== Test completed ===")
+
+if __name__ == "__main__":
+    test_node_queries()
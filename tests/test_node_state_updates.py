@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+Test that node state updates change only metadata and never run the embedding model,
+and that buffered writes are coalesced until flushed.
+"""
+import os
+import sys
+import tempfile
+
+# Add the backend directory to Python path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'backend'))
+
+from app import config
+
+def test_node_state_updates():
+    print("=== Node State Update Test ===")
+
+    saved_db_path = config.VECTOR_DB_PATH
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        # Keep the test away from the live database
+        config.VECTOR_DB_PATH = os.path.join(tmp_dir, "db_data")
+        from app.db.vector_store import VectorStore
+        from app.db.data_models import Node
+
+        store = VectorStore()
+        try:
+            root = Node(trajectory_id="t1", text="Root thought", embedding=[1.0, 0.0, 0.0])
+            child = Node(parent_id=root.id, trajectory_id="t1", text="Child thought", score=3.0,
+                         depth=1, embedding=[0.0, 1.0, 0.0])
+            store.add_nodes([root, child])
+            print("✓ Nodes stored with precomputed embeddings")
+
+            print("\n--- Update flags and parents ---")
+            store.update_node_state([root.id], {"is_fully_explored": True})
+            store.update_node_state([child.id], [{"is_pruned": True, "extra_parent_ids": ["p1", "p2"]}])
+
+            stored_root = store.get_node_by_id(root.id)
+            stored_child = store.get_node_by_id(child.id)
+            assert stored_root.is_fully_explored and stored_root.text == "Root thought"
+            assert stored_child.is_pruned and stored_child.score == 3.0
+            assert stored_child.extra_parent_ids == ["p1", "p2"]
+            print("✓ Only the given fields changed")
+
+            # The collection only holds what the writer has stored
+            store.flush()
+            embeddings = store.collection.get(ids=[child.id], include=["embeddings"])["embeddings"]
+            assert embeddings[0] == [0.0, 1.0, 0.0]
+            assert store._embedding_model is None
+            print("✓ Embeddings untouched and the embedding model never loaded")
+
+            print("\n--- Write-behind buffer ---")
+            store.add_node(child)
+            store.update_node_state([child.id], {"score": 1.0})
+            store.update_node_state([child.id], {"score": 2.0})
+            assert len(store._pending_nodes) == 1 and store._pending_state[child.id] == {"score": 2.0}
+            store.flush()
+            assert not store._pending_nodes and not store._pending_state
+            assert store.get_node_by_id(child.id).score == 2.0
+            print("✓ Repeated writes to one node are coalesced until flush")
+
+            try:
+                store.update_node_state([child.id], {"text": "Rewritten"})
+                assert False, "Expected text updates to be rejected"
+            except ValueError:
+                print("✓ Fields that would invalidate the embedding are rejected")
+        finally:
+            config.VECTOR_DB_PATH = saved_db_path
+            store.close()
+
+    print("\n=== Test completed ===")
+
+if __name__ == "__main__":
+    test_node_state_updates()
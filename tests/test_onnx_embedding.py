@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+Test the ONNX embedding backend against the torch SentenceTransformer it was exported from.
+Uses a tiny randomly initialised BERT so no model download is needed.
+"""
+import os
+import sys
+import string
+import tempfile
+
+# Add the backend directory to Python path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'backend'))
+
+from app.db.embedding_backends import ACCURACY_CHECK_SENTENCES, compare_embeddings
+
+def build_tiny_model(model_dir: str) -> str:
+    """Save a small SentenceTransformer (BERT, mean pooling, normalize) and return its path"""
+    from transformers import BertConfig, BertModel, BertTokenizerFast
+    from sentence_transformers import SentenceTransformer, models
+
+    bert_dir = os.path.join(model_dir, "bert")
+    os.makedirs(bert_dir)
+    words = {w for s in ACCURACY_CHECK_SENTENCES for w in s.lower().replace(".", " . ").replace(",", " , ").replace("?", " ? ").split()}
+    vocab = ["[PAD]", "[UNK]", "[CLS]", "[SEP]", "[MASK]"] + sorted(words) + list(string.ascii_lowercase)
+    with open(os.path.join(bert_dir, "vocab.txt"), 'w') as f:
+        f.write("\n".join(vocab))
+    BertTokenizerFast(os.path.join(bert_dir, "vocab.txt")).save_pretrained(bert_dir)
+    BertModel(BertConfig(vocab_size=len(vocab), hidden_size=32, num_hidden_layers=2,
+                         num_attention_heads=2, intermediate_size=64)).save_pretrained(bert_dir)
+
+    transformer = models.Transformer(bert_dir, max_seq_length=64)
+    st_model = SentenceTransformer(modules=[transformer, models.Pooling(32, "mean"), models.Normalize()])
+    st_path = os.path.join(model_dir, "sentence_model")
+    st_model.save(st_path)
+    return st_path
+
+def test_onnx_embedding():
+    print("=== ONNX Embedding Backend Test ===")
+    try:
+        import onnxruntime  # noqa: F401
+    except ImportError:
+        print("onnxruntime not installed - skipping")
+        return
+
+    from sentence_transformers import SentenceTransformer
+    from app.db.embedding_backends import OnnxEmbeddingModel, export_onnx_model
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        model_path = build_tiny_model(tmp_dir)
+        onnx_dir = os.path.join(tmp_dir, "onnx")
+
+        print("\n--- Export ---")
+        accuracy = export_onnx_model(model_path, onnx_dir, quantize=True)
+        assert set(accuracy) == {"model.onnx", "model_int8.onnx"}
+        print(f"✓ Exported fp32 and int8 graphs: {accuracy}")
+
+        print("\n--- Compare with torch ---")
+        reference = SentenceTransformer(model_path, device="cpu").encode(ACCURACY_CHECK_SENTENCES)
+        for quantized in (False, True):
+            model = OnnxEmbeddingModel(onnx_dir, quantized=quantized)
+            embeddings = model.encode(ACCURACY_CHECK_SENTENCES, batch_size=4)
+            assert embeddings.shape == reference.shape
+            assert compare_embeddings(reference, embeddings)["min_cosine"] > 0.99
+            assert model.encode(ACCURACY_CHECK_SENTENCES[0]).shape == (reference.shape[1],)
+        print("✓ Same dimensions and vectors as the torch backend")
+
+    print("\n=== Test completed ===")
+
+if __name__ == "__main__":
+    test_onnx_embedding()
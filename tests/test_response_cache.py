@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+Test the response cache: graph and analysis responses are read and encoded once per graph version,
+concurrent misses share one build, and large bodies get a gzip variant.
+"""
+import os
+import sys
+import gzip
+import json
+import time
+import tempfile
+import threading
+
+# Add the backend directory to Python path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'backend'))
+
+from app import config
+
+def test_response_cache():
+    print("=== Response Cache Test ===")
+
+    from app.response_cache import ResponseCache
+
+    print("\n--- Cache ---")
+    cache = ResponseCache(max_entries=2)
+    builds = []
+    def build():
+        builds.append(1)
+        time.sleep(0.2)
+        return {"nodes": ["x" * 2000]}, '"v1"'
+    threads = [threading.Thread(target=cache.get_or_build, args=("a", build)) for _ in range(5)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(builds) == 1 and cache.stats()["hits"] == 4
+    print("✓ Concurrent requests for a missing key share one build")
+
+    entry = cache.get_or_build("a", build)
+    assert json.loads(entry.body) == {"nodes": ["x" * 2000]}
+    assert gzip.decompress(entry.gzip_body) == entry.body and len(entry.gzip_body) < len(entry.body)
+    small = cache.get_or_build("b", lambda: ({"message": "small"}, '"v2"'))
+    assert small.gzip_body is None
+    print("✓ Bodies are encoded once, with a gzip copy above RESPONSE_GZIP_MIN_BYTES")
+
+    cache.get_or_build("c", lambda: ({}, '"v3"'))
+    assert cache.stats()["entries"] == 2
+    cache.get_or_build("a", build)
+    assert len(builds) == 2
+    unstable = []
+    for _ in range(2):
+        cache.get_or_build("d", lambda: (unstable.append(1) or {}, None))
+    assert len(unstable) == 2
+    print("✓ Least recently used entries are evicted and responses without an ETag are not kept")
+
+    print("\n--- Graph endpoints ---")
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        # Keep the test away from the live database
+        config.VECTOR_DB_PATH = os.path.join(tmp_dir, "db_data")
+        config.VECTOR_STORE_WARMUP_ENABLED = False
+        from fastapi.testclient import TestClient
+        from app import api
+        from app.db.vector_store import VectorStore
+        from app.db.data_models import Node
+
+        store = VectorStore()
+        store.use_run_collection("cache-test")
+        api.vector_store_client = store
+        api.response_cache.clear()
+        client = TestClient(api.app)
+        root = Node(trajectory_id="root", text="Root " + "words " * 300, score=0.5, cumulative_score=0.5,
+                    embedding=[1.0, 0.0])
+        store.add_node(root)
+        store.flush()
+
+        reads = []
+        read_graph_data = api.read_graph_data
+        def counting_read(*args):
+            reads.append(args)
+            return read_graph_data(*args)
+        api.read_graph_data = counting_read
+
+        first = client.get("/api/graph_data")
+        second = client.get("/api/graph_data")
+        assert len(reads) == 1 and first.content == second.content
+        assert first.headers["content-encoding"] == "gzip" and first.headers["etag"].endswith('-gzip"')
+        plain = client.get("/api/graph_data", headers={"Accept-Encoding": "identity"})
+        assert len(reads) == 1 and "content-encoding" not in plain.headers and plain.json() == first.json()
+        assert [n["text"] for n in plain.json()["nodes"]] == [root.text]
+        print("✓ Repeated graph reads of one version are served from the cache, compressed or not")
+
+        store.add_node(Node(parent_id=root.id, trajectory_id="t", text="Child", depth=1, score=1.0,
+                            cumulative_score=1.5, embedding=[0.0, 1.0]))
+        store.flush()
+        assert len(client.get("/api/graph_data").json()["nodes"]) == 2 and len(reads) == 2
+        print("✓ A write makes the next read build a new entry")
+
+        client.get("/api/analysis")
+        hits = api.response_cache.stats()["hits"]
+        assert client.get("/api/analysis").json()["best_trajectory"]["final_insight"] == "Child"
+        assert api.response_cache.stats()["hits"] == hits + 1
+        print("✓ The analysis is computed once per graph version")
+
+        api.read_graph_data = read_graph_data
+        store._reaper.join(timeout=30)
+        store.close()
+
+    print("\n=== Test completed ===")
+
+if __name__ == "__main__":
+    test_response_cache()
@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+Test retrieval-augmented expansion: related thoughts for the frontier come from one batched kNN query,
+are cached per node and end up in the agent prompt.
+"""
+import os
+import sys
+import tempfile
+
+# Add the backend directory to Python path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'backend'))
+
+from app import config
+
+def test_retrieval_context():
+    print("=== Retrieval Context Test ===")
+
+    for backend in ["chroma", "memory"]:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            # Keep the test away from the live database
+            config.VECTOR_DB_PATH = os.path.join(tmp_dir, "db_data")
+            config.VECTOR_BACKEND = backend
+            from app.db.vector_store import VectorStore
+            from app.db.data_models import Node
+
+            print(f"\n--- {backend} backend ---")
+            store = VectorStore()
+            store.use_run_collection(f"retrieval-{backend}")
+            solar = Node(trajectory_id="t1", text="Solar power gets cheaper", embedding=[1.0, 0.0, 0.0])
+            steel = Node(trajectory_id="t1", text="Steel moves to sunny regions", embedding=[0.9, 0.1, 0.0])
+            wind = Node(trajectory_id="t2", text="Wind power needs storage", embedding=[0.7, 0.7, 0.0])
+            rail = Node(trajectory_id="t3", text="Urban rail expands", embedding=[0.0, 0.0, 1.0])
+            store.add_nodes([solar, steel, wind, rail])
+
+            # Stored nodes share one kNN query; buffered ones are compared in memory
+            store.flush()
+            queries = []
+            query = store.collection.query
+            store.collection.query = lambda **kwargs: queries.append(kwargs) or query(**kwargs)
+
+            related = store.get_related_context([solar, rail], n_results=2)
+            assert related[solar.id] == ["Steel moves to sunny regions", "Wind power needs storage"]
+            assert solar.text not in related[solar.id] and len(related[rail.id]) == 2
+            assert len(queries) == 1 and len(queries[0]["query_embeddings"]) == 2
+            print("✓ The frontier is looked up with one query and a node is never its own context")
+
+            related = store.get_related_context([solar, steel], n_results=2)
+            assert len(queries) == 2 and len(queries[1]["query_embeddings"]) == 1
+            assert related[steel.id][0] == "Solar power gets cheaper"
+            print("✓ Nodes looked up before come from the cache")
+
+            saved_k = config.RETRIEVAL_CONTEXT_K
+            try:
+                config.RETRIEVAL_CONTEXT_K = 1
+                assert store.get_related_context([wind])[wind.id] == ["Steel moves to sunny regions"]
+            finally:
+                config.RETRIEVAL_CONTEXT_K = saved_k
+            print("✓ The number of related thoughts follows RETRIEVAL_CONTEXT_K when it is left out")
+
+            desert = Node(trajectory_id="t4", text="Solar farms cover deserts", embedding=[1.0, 0.05, 0.0])
+            store.add_node(desert)
+            assert store.get_related_context([desert], n_results=1)[desert.id] == ["Solar power gets cheaper"]
+            assert store._written == 1
+            print("✓ Buffered nodes are looked up without waiting for the writer")
+
+            store.close()
+
+    config.VECTOR_BACKEND = "chroma"
+
+    print("\n--- Agent prompt ---")
+    from app.core.agent import agent
+    from app.db.data_models import Node
+    node = Node(trajectory_id="t1", text="Solar power gets cheaper")
+    prompt = agent._build_prompt("Why is this the case?", node, ["Steel moves to sunny regions"])
+    assert "- Steel moves to sunny regions" in prompt and node.text in prompt
+    assert agent._build_prompt("Why is this the case?", node) == config.AGENT_PROMPT_TEMPLATE.format(
+        question="Why is this the case?", statement_text=node.text)
+    print("✓ Related thoughts are added to the prompt, which is unchanged without them")
+
+    print("\n=== Test completed ===")
+
+if __name__ == "__main__":
+    test_retrieval_context()
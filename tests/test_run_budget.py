@@ -0,0 +1,200 @@
+#!/usr/bin/env python3
+"""
+Test run budgets: exhaustion reasons, refused LLM calls, prompt tokens counted against the token budget,
+the wall-clock limit passed to Ollama as a timeout, and the best result reported by /api/best.
+The orchestrator runs are played back from a synthetic run journal.
+"""
+import os
+import sys
+import time
+import tempfile
+import numpy as np
+
+# Add the backend directory to Python path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'backend'))
+
+from app import config
+
+HYPOTHESIS = "Cheap solar power will reshape heavy industry"
+
+class FakeOllama:
+    """Records the calls that would have gone to Ollama"""
+
+    def __init__(self):
+        self.calls = []
+        self.timeouts = []
+
+    def Client(self, timeout=None):
+        self.timeouts.append(timeout)
+        return self
+
+    def generate(self, model, prompt, options):
+        self.calls.append(options)
+        return {"response": "An answer", "prompt_eval_count": 30, "eval_count": 10}
+
+def write_journal(path):
+    """Journal a run whose root gets one child per question of the battery"""
+    from app.llm.journal import RunJournal
+    from app.core.budget import estimate_tokens
+    rng = np.random.default_rng(1)
+    journal = RunJournal()
+    journal.start_recording(path, {"hypothesis": HYPOTHESIS, "max_depth": 1, "max_nodes": 100, "seed": 3})
+
+    def embedding():
+        vector = rng.normal(size=16)
+        return (vector / np.linalg.norm(vector)).tolist()
+
+    journal.record_embeddings([HYPOTHESIS], [embedding()])
+    for count, question in enumerate(config.INTERROGATIVE_BATTERY):
+        text = f"Outcome {count}: {question.lower()}"
+        prompt = config.AGENT_PROMPT_TEMPLATE.format(question=question, statement_text=HYPOTHESIS)
+        journal.record_llm(prompt, 100, text, estimate_tokens(prompt) + 20)
+        prompt = config.LOGIC_SCORING_PROMPT_TEMPLATE.format(text=text)
+        journal.record_llm(prompt, 10, f"0.{count + 3}", estimate_tokens(prompt) + 2)
+        journal.record_embeddings([text], [embedding()])
+    journal.close()
+
+def test_run_budget():
+    print("=== Run Budget Test ===")
+    from app.core.budget import RunBudget, estimate_tokens
+
+    print("\n--- Limits ---")
+    budget = RunBudget()
+    budget.start()
+    assert budget.exhausted_reason() is None and budget.can_afford(calls=100, tokens=10**6)
+    print("✓ Without limits every call is allowed")
+
+    budget = RunBudget(max_llm_calls=3)
+    budget.record_call(10, calls=2)
+    assert budget.can_afford() and not budget.can_afford(calls=2)
+    budget.record_call(10)
+    assert budget.exhausted_reason() == "max_llm_calls"
+    budget = RunBudget(max_tokens=100)
+    budget.record_call(100)
+    assert budget.exhausted_reason() == "max_tokens"
+    budget = RunBudget(max_seconds=0.05, max_tokens=100)
+    budget.start()
+    time.sleep(0.06)
+    assert budget.exhausted_reason() == "max_seconds" and not budget.can_afford()
+    print("✓ Each limit is reported by name once it is reached")
+
+    budget = RunBudget(max_tokens=100)
+    budget.record_call(40)
+    assert budget.clamp_tokens(100) == 60 and budget.clamp_tokens(100, prompt_tokens=45) == 15
+    assert budget.can_afford(tokens=50) and budget.exhausted_reason() is None
+    assert not budget.can_afford(tokens=61, min_tokens=20) and budget.exhausted_reason() is None
+    assert budget.can_afford(tokens=20, min_tokens=20)
+    assert not budget.can_afford(tokens=61, min_tokens=61) and budget.exhausted_reason() == "max_tokens"
+    print("✓ The prompt counts against the token budget, and only a budget too small for the cheapest call ends")
+
+    budget = RunBudget(60, 1000, 10)
+    budget.start()
+    budget.record_call(120, calls=2)
+    restored = RunBudget.from_dict(budget.to_dict())
+    assert (restored.max_seconds, restored.max_tokens, restored.max_llm_calls) == (60, 1000, 10)
+    assert (restored.used_tokens, restored.used_llm_calls) == (120, 2)
+    assert restored.elapsed_seconds() >= budget.elapsed_seconds() - 0.01
+    print("✓ A budget survives a checkpoint round trip")
+
+    print("\n--- LLM calls ---")
+    from app.llm import llm_interface
+    saved_ollama, saved_budget = llm_interface.ollama, llm_interface.llm_client.budget
+    fake = FakeOllama()
+    try:
+        llm_interface.ollama = fake
+        client = llm_interface.llm_client
+        client.budget = RunBudget(max_seconds=30, max_tokens=200, max_llm_calls=2)
+        client.budget.start()
+        prompt = "Is this sound?"
+        assert client.generate(prompt, max_tokens=500) == "An answer"
+        assert fake.calls[0]["num_predict"] == 200 - estimate_tokens(prompt)
+        assert 0 < fake.timeouts[0] <= 30
+        assert client.budget.used_tokens == 40 and client.budget.used_llm_calls == 1
+        print("✓ Generation is clamped to the tokens left after the prompt and timed out with the wall clock")
+
+        client.generate(prompt)
+        assert client.generate(prompt) == "Error: LLM budget exhausted." and len(fake.calls) == 2
+        print("✓ Calls past the budget are refused without reaching Ollama")
+
+        # Room for a scoring prompt but not for an agent prompt
+        agent_prompt = config.AGENT_PROMPT_TEMPLATE.format(question="Why?", statement_text="Cheap solar power")
+        scoring_prompt = config.LOGIC_SCORING_PROMPT_TEMPLATE.format(text="Cheap solar power")
+        client.budget = RunBudget(max_tokens=estimate_tokens(scoring_prompt) + 5)
+        assert estimate_tokens(agent_prompt) > client.budget.max_tokens
+        assert client.generate(agent_prompt) == "Error: LLM budget exhausted." and len(fake.calls) == 2
+        assert client.budget.exhausted_reason() is None
+        assert client.generate_short(scoring_prompt) == "An answer" and len(fake.calls) == 3
+        print("✓ An agent prompt that doesn't fit is refused while a scoring prompt still gets through")
+    finally:
+        llm_interface.ollama = saved_ollama
+        llm_interface.llm_client.budget = saved_budget
+
+    print("\n=== Test completed ===")
+
+def test_budgeted_runs():
+    print("\n=== Budgeted Runs Test ===")
+    from fastapi.testclient import TestClient
+    from app import api
+    from app.core import orchestrator as orchestrator_module
+    from app.core.checkpoint import CheckpointManager
+    from app.llm.journal import run_journal
+    from app.llm.llm_interface import llm_client
+    from app.db.vector_store import VectorStore
+
+    saved_globals = (orchestrator_module.vector_store_client, orchestrator_module.checkpoint_manager,
+                     api.orchestrator)
+    saved_config = (config.VECTOR_DB_PATH, config.CYCLE_PAUSE_SECONDS, config.EXPANSION_MODE)
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        config.VECTOR_DB_PATH = os.path.join(tmp_dir, "db_data")
+        store = VectorStore()
+        journal_path = os.path.join(tmp_dir, "run.jsonl.gz")
+        write_journal(journal_path)
+        try:
+            orchestrator_module.vector_store_client = store
+            orchestrator_module.checkpoint_manager = CheckpointManager(os.path.join(tmp_dir, "checkpoints"))
+            config.CYCLE_PAUSE_SECONDS = 0
+            config.EXPANSION_MODE = "local"
+            client = TestClient(api.app)
+
+            run_journal.start_replay(journal_path)
+            orchestrator = orchestrator_module.Orchestrator()
+            api.orchestrator = orchestrator
+            orchestrator.start_analysis(HYPOTHESIS, max_depth=1, max_nodes=100, seed=3, max_llm_calls=6,
+                                        background=False)
+            best = client.get("/api/best").json()
+            assert best["stop_reason"] == "max_llm_calls" and best["budget"]["used_llm_calls"] == 6
+            assert not best["is_running"] and best["run_id"] == orchestrator.run_id
+            # Three thoughts fit in six calls; the best of them and the root make up the trajectory
+            assert best["best_trajectory"]["path_length"] == 2 and store.count_nodes() == 4
+            assert best["best_trajectory"]["path"][0]["text"] == HYPOTHESIS
+            print("✓ A run stops at its call budget, and /api/best reports why and the best trajectory")
+
+            run_journal.start_replay(journal_path)
+            orchestrator = orchestrator_module.Orchestrator()
+            api.orchestrator = orchestrator
+            orchestrator.start_analysis(HYPOTHESIS, max_depth=1, max_nodes=100, seed=3, max_tokens=250,
+                                        background=False)
+            best = client.get("/api/best").json()
+            assert best["stop_reason"] == "max_tokens" and 0 < best["budget"]["used_tokens"] <= 250
+            print(f"✓ A run stops at its token budget without passing it ({best['budget']['used_tokens']} of 250)")
+
+            for field in ["max_seconds", "max_tokens", "max_llm_calls"]:
+                for value in [0, -1]:
+                    response = client.post("/api/start", json={"hypothesis": "Test", field: value})
+                    assert response.status_code == 422, (field, value)
+            print("✓ Zero and negative budgets are rejected")
+        finally:
+            run_journal.close()
+            llm_client.budget = None
+            (orchestrator_module.vector_store_client, orchestrator_module.checkpoint_manager,
+             api.orchestrator) = saved_globals
+            config.VECTOR_DB_PATH, config.CYCLE_PAUSE_SECONDS, config.EXPANSION_MODE = saved_config
+            if store._reaper is not None:
+                store._reaper.join(timeout=30)
+            store.close()
+
+    print("\n=== Test completed ===")
+
+if __name__ == "__main__":
+    test_run_budget()
+    test_budgeted_runs()
@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+"""
+Test that each run gets its own collection, that the reaper drops the collections of earlier runs, and that
+their disk space is only reclaimed when compaction is asked for.
+"""
+import os
+import sys
+import uuid
+import sqlite3
+import tempfile
+import threading
+
+# Add the backend directory to Python path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'backend'))
+
+from app import config
+
+def collection_names(store):
+    return sorted(c.name for c in store.client.list_collections())
+
+def test_run_collections():
+    print("=== Run Collections Test ===")
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        # Keep the test away from the live database
+        config.VECTOR_DB_PATH = os.path.join(tmp_dir, "db_data")
+        from app.db.vector_store import VectorStore, run_collection_name
+        from app.db.data_models import Node
+
+        store = VectorStore()
+        store.use_run_collection("first-run")
+        store.add_node(Node(trajectory_id="t1", text="First run thought", embedding=[1.0, 0.0, 0.0]))
+        store.flush()
+        store._reaper.join(timeout=30)
+        assert store.collection_name == run_collection_name("first-run")
+        print("✓ First run writes to its own collection")
+
+        print("\n--- Starting a second run ---")
+        store.use_run_collection("second-run")
+        store._reaper.join(timeout=30)
+        assert store.get_all_nodes_for_graph() == []
+        assert collection_names(store) == [run_collection_name("second-run")]
+        print("✓ Second run starts empty and the first run's collection was reaped")
+
+        segment_dirs = [d for d in os.listdir(config.VECTOR_DB_PATH)
+                        if os.path.isdir(os.path.join(config.VECTOR_DB_PATH, d))]
+        store.add_node(Node(trajectory_id="t1", text="Second run thought", embedding=[0.0, 1.0, 0.0]))
+        store.flush()
+        assert len(segment_dirs) <= 1
+        print("✓ No segment folders of dropped collections are left behind")
+
+        print("\n--- Reopening after a restart ---")
+        reopened = VectorStore()
+        assert [n.text for n in reopened.get_all_nodes_for_graph()] == ["Second run thought"]
+        assert reopened.collection_name == run_collection_name("second-run")
+        print("✓ A new store opens the latest run's collection")
+
+        reopened.use_run_collection("unknown-run", create=False)
+        assert reopened.collection_name == run_collection_name("second-run")
+        print("✓ Resuming a run without its own collection keeps the current one")
+
+        print("\n--- Compaction ---")
+        # Left behind by a collection dropped in another process
+        orphan = os.path.join(config.VECTOR_DB_PATH, str(uuid.uuid4()))
+        os.makedirs(orphan)
+        store.use_run_collection("third-run")
+        store._reaper.join(timeout=30)
+        assert os.path.isdir(orphan)
+        assert collection_names(store) == [run_collection_name("third-run")]
+        print("✓ Reaping during a run only drops collections through the client")
+
+        store.reap_collections_async(compact=True)
+        store._reaper.join(timeout=30)
+        assert not os.path.exists(orphan)
+        print("✓ Orphaned segment folders are removed when compaction is asked for")
+
+    print("\n=== Test completed ===")
+
+def test_archive_during_compaction():
+    print("\n=== Archive During Compaction Test ===")
+    from app.core import archive_manager as archive_module
+    from app.core.archive_manager import ArchiveManager
+    from app.core.checkpoint import CheckpointManager
+    from app.db.vector_store import VectorStore
+    from app.db.data_models import Node
+
+    saved_globals = (archive_module.vector_store_client, archive_module.checkpoint_manager)
+    saved_config = (config.VECTOR_DB_PATH, config.ARCHIVE_BASE_PATH)
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        # Keep the test away from the live database and archives
+        config.VECTOR_DB_PATH = os.path.join(tmp_dir, "db_data")
+        config.ARCHIVE_BASE_PATH = os.path.join(tmp_dir, "archive")
+        store = VectorStore()
+        entered, release = threading.Event(), threading.Event()
+        try:
+            archive_module.vector_store_client = store
+            archive_module.checkpoint_manager = CheckpointManager(os.path.join(tmp_dir, "checkpoints"))
+            manager = ArchiveManager()
+            store.use_run_collection("archived-run")
+            for i in range(5):
+                store.add_node(Node(trajectory_id=f"t{i}", text=f"Thought {i}", score=1.0, cumulative_score=float(i),
+                                    embedding=[1.0, float(i), 0.0]))
+            store.close()
+            store._reaper.join(timeout=30)
+
+            # The compaction a finished run asks for, held in the middle of rewriting the graph store
+            vacuum = store.graph.vacuum
+            def held_vacuum():
+                entered.set()
+                release.wait(10)
+                vacuum()
+            store.graph.vacuum = held_vacuum
+            store.reap_collections_async(compact=True)
+            assert entered.wait(10)
+
+            stages = []
+            archiver = threading.Thread(target=lambda: stages.append(
+                manager.stop_and_archive(lambda stage, fraction=None: stages.append(stage), "during compaction")))
+            archiver.start()
+            archiver.join(0.5)
+            assert archiver.is_alive() and "copying database" not in stages
+            print("✓ An archive waits for the compaction in progress before it copies the database")
+
+            release.set()
+            archiver.join(30)
+            result = stages[-1]
+            assert result["nodes_archived"] == 5
+            archived_graph = os.path.join(config.ARCHIVE_BASE_PATH, result["archive_name"], "database",
+                                          config.GRAPH_DB_FILENAME)
+            conn = sqlite3.connect(archived_graph)
+            try:
+                assert conn.execute("PRAGMA integrity_check").fetchone()[0] == "ok"
+                assert conn.execute("SELECT COUNT(*) FROM nodes").fetchone()[0] == 5
+            finally:
+                conn.close()
+            print("✓ The archived graph store is whole and holds every node of the run")
+        finally:
+            release.set()
+            archive_module.vector_store_client, archive_module.checkpoint_manager = saved_globals
+            config.VECTOR_DB_PATH, config.ARCHIVE_BASE_PATH = saved_config
+            if store._reaper is not None:
+                store._reaper.join(timeout=30)
+            store.close()
+
+    print("\n=== Test completed ===")
+
+if __name__ == "__main__":
+    test_run_collections()
+    test_archive_during_compaction()
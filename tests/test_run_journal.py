@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+"""
+Test that a recorded run journal replays LLM responses and embeddings exactly, and that replaying the
+journal of an orchestrator run rebuilds the same graph without any model.
+"""
+import os
+import sys
+import zlib
+import tempfile
+import numpy as np
+
+# Add the backend directory to Python path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'backend'))
+
+from app import config
+from app.llm.journal import RunJournal, JournalMissError
+
+class FakeOllama:
+    """Answers every prompt with a text or a score derived from the prompt"""
+
+    def generate(self, model, prompt, options):
+        key = zlib.crc32(prompt.encode())
+        if options["num_predict"] == 10:
+            return {"response": f"0.{key % 10}", "prompt_eval_count": 20, "eval_count": 2}
+        return {"response": f"Thought {key}", "prompt_eval_count": 30, "eval_count": 10}
+
+class FakeEmbeddingModel:
+    """Embeds a text as a random unit vector seeded by the text"""
+
+    def encode(self, texts, batch_size=None):
+        vectors = [np.random.default_rng(zlib.crc32(text.encode())).normal(size=16) for text in texts]
+        return np.array([v / np.linalg.norm(v) for v in vectors])
+
+class NoModel:
+    """Fails every call, standing in for a model that isn't there during a replay"""
+
+    def __getattr__(self, name):
+        raise AssertionError(f"Model called during replay: {name}")
+
+def test_run_journal_roundtrip():
+    print("=== Run Journal Test ===")
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, "run.jsonl.gz")
+        embedding = [0.1, -0.25, 0.3333333432674408]
+
+        print("\n--- Record ---")
+        journal = RunJournal()
+        journal.start_recording(path, {"hypothesis": "Test hypothesis", "max_depth": 2, "max_nodes": 10, "seed": 1})
+        journal.record_llm("prompt A", 100, "first answer", 42)
+        journal.record_llm("prompt A", 100, "second answer", 40)
+        journal.record_embeddings(["Test hypothesis"], [embedding])
+        journal.close()
+        print("✓ Journal written")
+
+        print("\n--- Replay ---")
+        run_info = journal.start_replay(path)
+        assert run_info["hypothesis"] == "Test hypothesis"
+        assert journal.replay_llm("prompt A")["response"] == "first answer"
+        assert journal.replay_llm("prompt A")["response"] == "second answer"
+        assert journal.replay_llm("prompt A")["tokens"] == 40
+        assert journal.replay_embedding("Test hypothesis") == np.asarray(embedding, dtype=np.float32).tolist()
+        print("✓ Responses replayed in recorded order")
+
+        try:
+            journal.replay_llm("unknown prompt")
+            assert False, "Expected a journal miss"
+        except JournalMissError:
+            assert journal.misses == 1
+        print("✓ Unknown prompts are reported as misses")
+        journal.close()
+
+    print("\n=== Test completed ===")
+
+def graph_signature(store):
+    """The graph of the current run, independent of the random node ids"""
+    nodes = store.get_all_nodes_for_graph()
+    texts = {n.id: n.text for n in nodes}
+    return sorted(
+        (n.text, texts.get(n.parent_id), sorted(texts[p] for p in n.extra_parent_ids), n.depth, n.score,
+         n.cumulative_score, n.is_pruned, n.is_fully_explored)
+        for n in nodes
+    )
+
+def test_orchestrator_replay():
+    print("\n=== Orchestrator Replay Test ===")
+    from app.core import orchestrator as orchestrator_module
+    from app.core.checkpoint import CheckpointManager
+    from app.llm import llm_interface
+    from app.llm.journal import run_journal
+    from app.db.vector_store import VectorStore
+
+    saved_globals = (orchestrator_module.vector_store_client, orchestrator_module.checkpoint_manager,
+                     llm_interface.ollama)
+    saved_config = (config.VECTOR_DB_PATH, config.JOURNAL_PATH, config.JOURNAL_RECORDING_ENABLED,
+                    config.EMBEDDING_CACHE_ENABLED, config.CYCLE_PAUSE_SECONDS, config.EXPANSION_MODE)
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        config.VECTOR_DB_PATH = os.path.join(tmp_dir, "db_data")
+        store = VectorStore()
+        try:
+            orchestrator_module.vector_store_client = store
+            orchestrator_module.checkpoint_manager = CheckpointManager(os.path.join(tmp_dir, "checkpoints"))
+            config.JOURNAL_PATH = os.path.join(tmp_dir, "journals")
+            config.EMBEDDING_CACHE_ENABLED = False
+            config.CYCLE_PAUSE_SECONDS = 0
+            config.EXPANSION_MODE = "local"
+
+            print("\n--- Record ---")
+            config.JOURNAL_RECORDING_ENABLED = True
+            llm_interface.ollama = FakeOllama()
+            store._embedding_model = FakeEmbeddingModel()
+            recorded = orchestrator_module.Orchestrator()
+            recorded.start_analysis("Remote work lowers city rents", max_depth=2, max_nodes=20, seed=11,
+                                    background=False)
+            expected = graph_signature(store)
+            journal_path = os.path.join(config.JOURNAL_PATH, f"{recorded.run_id}.jsonl.gz")
+            assert len(expected) > 1 and os.path.exists(journal_path) and not run_journal.is_recording
+            print(f"✓ Run of {len(expected)} nodes recorded to its journal")
+
+            print("\n--- Replay ---")
+            config.JOURNAL_RECORDING_ENABLED = False
+            llm_interface.ollama = NoModel()
+            store._embedding_model = NoModel()
+            run_info = run_journal.start_replay(journal_path)
+            replayed = orchestrator_module.Orchestrator()
+            replayed.start_analysis(run_info["hypothesis"], max_depth=run_info["max_depth"],
+                                    max_nodes=run_info["max_nodes"], seed=run_info["seed"], background=False)
+            assert replayed.run_id != recorded.run_id and run_journal.misses == 0
+            assert graph_signature(store) == expected
+            assert (replayed.stop_reason, replayed.cycle_count) == (recorded.stop_reason, recorded.cycle_count)
+            assert replayed.best_result["path_length"] == recorded.best_result["path_length"]
+            print("✓ The replayed run builds the same graph without calling a model")
+        finally:
+            run_journal.close()
+            llm_interface.llm_client.budget = None
+            (orchestrator_module.vector_store_client, orchestrator_module.checkpoint_manager,
+             llm_interface.ollama) = saved_globals
+            (config.VECTOR_DB_PATH, config.JOURNAL_PATH, config.JOURNAL_RECORDING_ENABLED,
+             config.EMBEDDING_CACHE_ENABLED, config.CYCLE_PAUSE_SECONDS, config.EXPANSION_MODE) = saved_config
+            if store._reaper is not None:
+                store._reaper.join(timeout=30)
+            store.close()
+
+    print("\n=== Test completed ===")
+
+if __name__ == "__main__":
+    test_run_journal_roundtrip()
+    test_orchestrator_replay()
@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+"""
+Test run budgets in queue mode: every queued expansion gets its own share of what is left of the budget,
+so the tasks in flight together never spend more than the run has, and a run whose tasks no worker claims
+stops instead of waiting out its budget. The LLM and the embedding model are played back from a synthetic
+run journal.
+"""
+import os
+import sys
+import time
+import tempfile
+import threading
+import numpy as np
+
+# Add the backend directory to Python path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'backend'))
+
+from app import config
+
+HYPOTHESIS = "Cheap solar power will reshape heavy industry"
+
+def write_journal(path, depth=2):
+    """Journal a run in which every node gets one child per question of the battery"""
+    from app.llm.journal import RunJournal
+    rng = np.random.default_rng(2)
+    journal = RunJournal()
+    journal.start_recording(path, {"hypothesis": HYPOTHESIS, "max_depth": depth, "max_nodes": 100, "seed": 5})
+
+    def embedding():
+        vector = rng.normal(size=16)
+        return (vector / np.linalg.norm(vector)).tolist()
+
+    journal.record_embeddings([HYPOTHESIS], [embedding()])
+    frontier, count = [HYPOTHESIS], 0
+    for _ in range(depth):
+        children = []
+        for statement in frontier:
+            for question in config.INTERROGATIVE_BATTERY:
+                count += 1
+                text = f"Outcome {count}: {question.lower()} for {statement[:30]}"
+                journal.record_llm(config.AGENT_PROMPT_TEMPLATE.format(question=question, statement_text=statement),
+                                   100, text, 50)
+                journal.record_llm(config.LOGIC_SCORING_PROMPT_TEMPLATE.format(text=text), 10, f"0.{(count * 37) % 10}", 5)
+                journal.record_embeddings([text], [embedding()])
+                children.append(text)
+        frontier = children
+    journal.close()
+
+def test_budget_reservations():
+    print("=== Budget Reservation Test ===")
+    from app.core.budget import RunBudget
+
+    budget = RunBudget(max_llm_calls=6, max_tokens=1000)
+    shares = [budget.reserve(4 - index, min_calls=2) for index in range(4)]
+    assert shares == [(333, 2), (333, 2), (334, 2), None]
+    assert budget.reserved_llm_calls == 6 and budget.reserved_tokens == 1000
+    print("✓ Shares never add up to more than the budget, and each is large enough for an expansion")
+
+    budget.record_call(120, calls=2)
+    budget.release(333, 2)
+    assert budget.reserved_llm_calls == 4 and budget.remaining_llm_calls() == 4
+    assert budget.reserve(1, min_calls=2) is None
+    budget.release(333, 2)
+    assert budget.reserve(1, min_calls=2) == (546, 2)
+    print("✓ A finished expansion hands back its share and is charged what it used")
+
+    restored = RunBudget.from_dict(budget.to_dict())
+    assert (restored.reserved_tokens, restored.reserved_llm_calls) == (budget.reserved_tokens, 4)
+    budget.clear_reservations()
+    assert budget.reserved_tokens == 0 and budget.reserved_llm_calls == 0
+    assert RunBudget().reserve(4) == (None, None)
+    print("✓ Reservations survive a checkpoint round trip; an unlimited budget reserves nothing")
+
+    print("\n=== Test completed ===")
+
+def test_queue_mode_budget():
+    print("\n=== Queue Mode Budget Test ===")
+    from app import worker as worker_module
+    from app.core import orchestrator as orchestrator_module
+    from app.core.checkpoint import CheckpointManager
+    from app.core.task_queue import TaskQueue
+    from app.llm.journal import run_journal
+    from app.llm.llm_interface import llm_client
+    from app.db.vector_store import VectorStore
+
+    saved_globals = (orchestrator_module.vector_store_client, orchestrator_module.checkpoint_manager,
+                     orchestrator_module.task_queue, worker_module.task_queue)
+    saved_config = (config.VECTOR_DB_PATH, config.EXPANSION_MODE, config.TASK_QUEUE_POLL_SECONDS,
+                    config.TASK_QUEUE_CLAIM_TIMEOUT_SECONDS)
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        config.VECTOR_DB_PATH = os.path.join(tmp_dir, "db_data")
+        store = VectorStore()
+        checkpoints = CheckpointManager(os.path.join(tmp_dir, "checkpoints"))
+        queue = TaskQueue(os.path.join(tmp_dir, "tasks.sqlite3"))
+        journal_path = os.path.join(tmp_dir, "run.jsonl.gz")
+        write_journal(journal_path)
+        worker = worker_module.ExpansionWorker("test-worker", lease_seconds=30, poll_seconds=0.05)
+        worker_thread = None
+        try:
+            orchestrator_module.vector_store_client = store
+            orchestrator_module.checkpoint_manager = checkpoints
+            orchestrator_module.task_queue = queue
+            worker_module.task_queue = queue
+            config.EXPANSION_MODE = "queue"
+            config.TASK_QUEUE_POLL_SECONDS = 0.05
+
+            print("\n--- Shares of the budget ---")
+            run_journal.start_replay(journal_path)
+            orchestrator = orchestrator_module.Orchestrator()
+            committed, shares = [], []
+            enqueue = queue.enqueue
+
+            def checked_enqueue(run_id, node_id, payload, **kwargs):
+                budget = orchestrator.budget
+                committed.append(budget.used_llm_calls + budget.reserved_llm_calls)
+                shares.append(payload["max_llm_calls"])
+                assert committed[-1] <= 24 and payload["max_llm_calls"] >= 2, budget.to_dict()
+                return enqueue(run_id, node_id, payload, **kwargs)
+
+            queue.enqueue = checked_enqueue
+            worker_thread = threading.Thread(target=worker.run, daemon=True)
+            worker_thread.start()
+            orchestrator.start_analysis(HYPOTHESIS, max_depth=2, max_nodes=100, seed=5, max_llm_calls=24,
+                                        background=False)
+            # Six calls give the root three children, which split the 18 calls left with the fourth, free slot
+            assert shares == [6, 4, 4, 5] and committed[-1] == 19
+            assert orchestrator.budget.used_llm_calls <= 24 and orchestrator.budget.reserved_llm_calls == 0
+            assert store.count_nodes() > 1
+            print(f"✓ {len(shares)} expansions shared 24 LLM calls and used {orchestrator.budget.used_llm_calls}")
+
+            worker.is_running = False
+            worker_thread.join(timeout=10)
+            worker_thread = None
+
+            print("\n--- No workers ---")
+            config.TASK_QUEUE_CLAIM_TIMEOUT_SECONDS = 0.3
+            orchestrator = orchestrator_module.Orchestrator()
+            started = time.monotonic()
+            orchestrator.start_analysis(HYPOTHESIS, max_depth=2, max_nodes=100, seed=5, max_llm_calls=24,
+                                        background=False)
+            assert orchestrator.stop_reason == "no_workers" and time.monotonic() - started < 10
+            assert orchestrator.get_resumable_checkpoint()["run_id"] == orchestrator.run_id
+            assert queue.claim("late-worker") is None
+            print("✓ A run whose tasks nobody claims stops with reason no_workers and can be resumed")
+        finally:
+            worker.is_running = False
+            if worker_thread is not None:
+                worker_thread.join(timeout=10)
+            run_journal.close()
+            llm_client.budget = None
+            (orchestrator_module.vector_store_client, orchestrator_module.checkpoint_manager,
+             orchestrator_module.task_queue, worker_module.task_queue) = saved_globals
+            (config.VECTOR_DB_PATH, config.EXPANSION_MODE, config.TASK_QUEUE_POLL_SECONDS,
+             config.TASK_QUEUE_CLAIM_TIMEOUT_SECONDS) = saved_config
+            if store._reaper is not None:
+                store._reaper.join(timeout=30)
+            store.close()
+
+    print("\n=== Test completed ===")
+
+if __name__ == "__main__":
+    test_budget_reservations()
+    test_queue_mode_budget()
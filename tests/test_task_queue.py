@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+"""
+Test the SQLite task queue used by expansion workers: claiming, leases, retries and cancellation.
+"""
+import os
+import sys
+import time
+import tempfile
+
+# Add the backend directory to Python path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'backend'))
+
+from app.core.task_queue import TaskQueue
+
+def test_task_queue():
+    print("=== Task Queue Test ===")
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        queue = TaskQueue(os.path.join(tmp_dir, "tasks.sqlite3"))
+
+        print("\n--- Claim and complete ---")
+        task_id = queue.enqueue("run_1", "node_1", {"node": {"id": "node_1"}}, max_attempts=2)
+        task = queue.claim("worker_a", lease_seconds=30)
+        assert task["id"] == task_id and task["attempts"] == 1
+        assert queue.claim("worker_b", lease_seconds=30) is None
+        assert queue.complete(task_id, "worker_a", {"nodes": []})
+        finished = queue.get_finished([task_id])
+        assert finished[0]["status"] == "done" and finished[0]["result"] == {"nodes": []}
+        print("✓ Task claimed once and completed")
+
+        print("\n--- Expired lease is reclaimed ---")
+        task_id = queue.enqueue("run_1", "node_2", {}, max_attempts=2)
+        queue.claim("worker_a", lease_seconds=0.1)
+        time.sleep(0.2)
+        task = queue.claim("worker_b", lease_seconds=30)
+        assert task["id"] == task_id and task["attempts"] == 2
+        assert not queue.complete(task_id, "worker_a", {"nodes": []})
+        print("✓ Stale worker cannot complete a reclaimed task")
+
+        print("\n--- Failures are retried until max_attempts ---")
+        queue.fail(task_id, "worker_b", "LLM unavailable")
+        assert queue.get_finished([task_id])[0]["status"] == "failed"
+        print("✓ Task failed after its final attempt")
+
+        print("\n--- Cancelling a run ---")
+        task_id = queue.enqueue("run_2", "node_3", {})
+        assert queue.cancel_run("run_2") == 1
+        assert queue.claim("worker_a") is None
+        assert queue.get_finished([task_id])[0]["status"] == "cancelled"
+        print("✓ Cancelled tasks are not handed out")
+
+    print("\n=== Test completed ===")
+
+if __name__ == "__main__":
+    test_task_queue()
@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+"""
+Test the in-memory vector backend: search, metadata updates, HNSW search and persisting to ChromaDB,
+which checkpoints only do every MEMORY_BACKEND_PERSIST_INTERVAL_CYCLES cycles.
+"""
+import os
+import sys
+import tempfile
+import numpy as np
+
+# Add the backend directory to Python path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'backend'))
+
+from app import config
+from app.db.vector_backends import VectorBackend, InMemoryBackend, ChromaBackend
+
+class FakeEmbeddingModel:
+    """Embeds texts of the same length alike"""
+
+    def encode(self, texts, batch_size=None):
+        return np.array([[1.0, float(len(text)), 0.0] for text in texts]) / 10
+
+def test_in_memory_backend():
+    print("=== In-Memory Vector Backend Test ===")
+    import chromadb
+
+    rng = np.random.default_rng(0)
+    vectors = rng.normal(size=(200, 16)).astype(np.float32)
+    ids = [f"node_{i}" for i in range(len(vectors))]
+    metadatas = [{"text": f"Thought {i}", "score": float(i)} for i in range(len(vectors))]
+
+    collection = chromadb.EphemeralClient().get_or_create_collection("memory_backend_test")
+    backend = InMemoryBackend(collection)
+
+    print("\n--- Search ---")
+    backend.upsert(ids, vectors.tolist(), metadatas)
+    assert backend.count() == len(ids)
+    results = backend.query([vectors[7].tolist(), (-vectors[3]).tolist()], n_results=3,
+                            include=["metadatas", "distances"])
+    assert results["ids"][0][0] == "node_7" and abs(results["distances"][0][0]) < 1e-5
+    assert results["metadatas"][0][0]["text"] == "Thought 7"
+    assert results["distances"][1][0] <= results["distances"][1][1] <= results["distances"][1][2]
+    print("✓ Nearest neighbours come back in cosine order")
+
+    print("\n--- Metadata updates ---")
+    backend.update(["node_1"], [{"is_pruned": True}])
+    stored = backend.get(ids=["node_1"], include=["metadatas", "embeddings"])
+    assert stored["metadatas"][0] == {"text": "Thought 1", "score": 1.0, "is_pruned": True}
+    assert np.allclose(stored["embeddings"][0], vectors[1])
+    print("✓ Updates merge into metadata and keep the embedding")
+
+    print("\n--- Where filters ---")
+    where = {"$and": [{"score": {"$lt": 10.0}}, {"is_pruned": False}]}
+    backend.update(["node_2", "node_3"], [{"is_pruned": False}, {"is_pruned": False}])
+    assert backend.get(where=where)["ids"] == ["node_2", "node_3"]
+    assert backend.get(where={"score": {"$gte": 198.0}})["ids"] == ["node_198", "node_199"]
+    assert backend.get(ids=["node_1", "node_2"], where={"is_pruned": True})["ids"] == ["node_1"]
+    print("✓ Filters follow ChromaDB semantics, including skipping entries without the key")
+
+    print("\n--- HNSW search ---")
+    config.MEMORY_BACKEND_HNSW_THRESHOLD = 100
+    try:
+        results = backend.query([vectors[42].tolist()], n_results=1)
+        assert backend._hnsw is not None and results["ids"][0][0] == "node_42"
+    finally:
+        config.MEMORY_BACKEND_HNSW_THRESHOLD = 20000
+    print("✓ Large runs are searched through an HNSW index")
+
+    print("\n--- Persist and reload ---")
+    assert collection.count() == 0
+    backend.persist()
+    assert collection.count() == len(ids)
+    reloaded = InMemoryBackend(collection)
+    assert reloaded.count() == len(ids)
+    assert reloaded.get(ids=["node_1"])["metadatas"][0]["is_pruned"] is True
+    assert ChromaBackend(collection).query([vectors[5].tolist()], n_results=1)["ids"][0][0] == "node_5"
+    print("✓ Nothing reaches ChromaDB until persist, and a new backend loads it back")
+
+    try:
+        VectorBackend()
+        assert False, "Expected VectorBackend to be abstract"
+    except TypeError:
+        pass
+    print("✓ Backends must implement every collection operation")
+
+    print("\n=== Test completed ===")
+
+def test_memory_backend_checkpoints():
+    print("\n=== Memory Backend Checkpoint Test ===")
+    from app.core import orchestrator as orchestrator_module
+    from app.core.checkpoint import CheckpointManager
+    from app.db.vector_store import VectorStore
+    from app.db.data_models import Node
+
+    saved_globals = (orchestrator_module.vector_store_client, orchestrator_module.checkpoint_manager)
+    saved_config = (config.VECTOR_DB_PATH, config.VECTOR_BACKEND, config.MEMORY_BACKEND_PERSIST_INTERVAL_CYCLES,
+                    config.EMBEDDING_CACHE_ENABLED)
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        config.VECTOR_DB_PATH = os.path.join(tmp_dir, "db_data")
+        store = VectorStore()
+        resumed = None
+        try:
+            config.VECTOR_BACKEND = "memory"
+            config.MEMORY_BACKEND_PERSIST_INTERVAL_CYCLES = 3
+            config.EMBEDDING_CACHE_ENABLED = False
+            store.use_run_collection("memory-run")
+            store._embedding_model = FakeEmbeddingModel()
+            orchestrator_module.vector_store_client = store
+            orchestrator_module.checkpoint_manager = CheckpointManager(os.path.join(tmp_dir, "checkpoints"))
+            persisted = []
+            persist = store.persist
+            store.persist = lambda: (persisted.append(orchestrator.cycle_count), persist())
+
+            orchestrator = orchestrator_module.Orchestrator()
+            orchestrator.run_id = "memory-run"
+            store.add_nodes([Node(trajectory_id="root", text="Root")])
+            for cycle in range(1, 8):
+                orchestrator.cycle_count = cycle
+                orchestrator._save_checkpoint("running")
+                if cycle == 4:
+                    store.add_nodes([Node(trajectory_id="t", text=f"Thought {i}", depth=1) for i in range(3)])
+            assert persisted == [3, 6]
+            orchestrator._save_checkpoint("stopped")
+            assert persisted == [3, 6, 7]
+            print("✓ Running checkpoints persist every third cycle, and a stopped run is persisted")
+
+            # A node added after the last persist only reaches the graph store before the process dies
+            store.add_nodes([Node(trajectory_id="t", text="Late thought", depth=1)])
+            store.flush()
+            assert store.client.get_collection(store.collection_name).count() == 4
+            resumed = VectorStore()
+            resumed.use_run_collection("memory-run", create=False)
+            resumed._embedding_model = FakeEmbeddingModel()
+            assert resumed.collection.count() == 4
+            resumed.restore_missing_vectors()
+            assert resumed.collection.count() == 5 and resumed.count_nodes() == 5
+            assert resumed.find_duplicate(Node(trajectory_id="t", text="Late thinker")).text == "Late thought"
+            print("✓ Vectors added after the last persist are restored from the graph store on resume")
+        finally:
+            orchestrator_module.vector_store_client, orchestrator_module.checkpoint_manager = saved_globals
+            (config.VECTOR_DB_PATH, config.VECTOR_BACKEND, config.MEMORY_BACKEND_PERSIST_INTERVAL_CYCLES,
+             config.EMBEDDING_CACHE_ENABLED) = saved_config
+            for vector_store in (store, resumed):
+                if vector_store is not None:
+                    if vector_store._reaper is not None:
+                        vector_store._reaper.join(timeout=30)
+                    vector_store.close()
+
+    print("\n=== Test completed ===")
+
+if __name__ == "__main__":
+    test_in_memory_backend()
+    test_memory_backend_checkpoints()